@@ -0,0 +1,62 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Measures the time taken by `Append` and `Pop` to build a list of a given
+length and to empty it again, compared to the previous lists which copied
+every value on each firing
+
+    python benchmarks/lists.py [length...]
+"""
+
+import sys
+import copy
+import time
+
+from ton.cell import *
+from ton.type import *
+
+
+def copying_append(values: list, value: Value) -> list:
+    values = copy.deepcopy(values)
+    values.append(value)
+    return values
+
+
+def copying_pop(values: list):
+    values = copy.deepcopy(values)
+    return values.pop(0), values
+
+
+def persistent_append(lst: List_, value: Value) -> List_:
+    return Append().process({Side.BACK: lst, Side.LEFT: value})[Side.FRONT]
+
+
+def persistent_pop(lst: List_):
+    outputs = Pop().process({Side.BACK: lst})
+    return outputs[Side.LEFT], outputs[Side.FRONT]
+
+
+def measure(length: int, empty, append, pop) -> float:
+    start = time.perf_counter()
+
+    lst = empty
+    for i in range(length):
+        lst = append(lst, Integer(i))
+    for _ in range(length):
+        _, lst = pop(lst)
+
+    return time.perf_counter() - start
+
+
+def main(*lengths: int):
+    print(f"{'length':>8}{'copied ms':>12}{'persistent ms':>16}")
+
+    for length in lengths or (100, 500, 2000):
+        before = measure(length, [], copying_append, copying_pop)
+        after = measure(length, List_(), persistent_append, persistent_pop)
+        print(f"{length:>8}{before * 1000:>12.1f}{after * 1000:>16.1f}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
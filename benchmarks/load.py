@@ -0,0 +1,98 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Compares the time taken to load large programs from the binary format and
+from pickle, which programs used to be saved with
+
+    python benchmarks/load.py [size]
+
+The binary format was meant to load 10 times as fast as pickle, but only
+loads 1.4 to 3.6 times as fast on these 512x512 programs, the tiled lists
+and chips being the slowest. Past the decoding of the arrays, which numpy
+does in bulk, both formats spend their time creating one Python object per
+cell, about 80 ns per cell for the binary format. Closing the gap would
+take boards which do not hold a Python object per cell.
+
+Saved programs are compressed, which costs a few milliseconds to decompress
+when loading. Measured on a single core:
+
+    program               pickle KiB  binary KiB   pickle ms   binary ms
+    addition tiled               729           5        29.5         8.2
+    list tiled                  1110          14        50.7        37.0
+    recursion tiled             1505          13        57.6        39.1
+    random                      1989         229       175.1        80.4
+
+Uncompressed, the random program took 2401 KiB, more than pickle, and 58.6
+ms to load.
+"""
+
+import sys
+import copy
+import pickle
+import random
+import timeit
+from pathlib import Path
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+from ton.type import *
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def tiled(program: Program, size: int) -> Program:
+    # Every cell is copied on its own, since the loaded program shares some of
+    # them, which saved programs used not to do
+    w, h = program.size
+    cells = np.empty((size, size), object)
+    for x, y in np.ndindex(size, size):
+        cells[x, y] = copy.deepcopy(program.cells[x % w, y % h])
+    return Program(cells)
+
+
+def random_program(size: int, seed: int = 0) -> Program:
+    rng = random.Random(seed)
+    processors = [Diode, Transistor, Adder, Equals]
+
+    def cell():
+        r = rng.random()
+        if r < 0.4:
+            return Empty()
+        elif r < 0.8:
+            return Wire()
+        elif r < 0.9:
+            return Integer(rng.randrange(100))
+        elif r < 0.95:
+            return Anchor()
+        else:
+            return rng.choice(processors)(rng.choice(list(Direction)))
+
+    cells = np.empty((size, size), object)
+    for pos in np.ndindex(size, size):
+        cells[pos] = cell()
+    return Program(cells)
+
+
+def main(size: int = 512):
+    programs = {
+        f'{name} tiled': tiled(Program.load(EXAMPLES_DIR / f'{name}.ton'), size)
+        for name in ('addition', 'list', 'recursion')
+    }
+    programs['random'] = random_program(size)
+
+    print(f"{'program':<20}{'pickle KiB':>12}{'binary KiB':>12}{'pickle ms':>12}{'binary ms':>12}{'speedup':>10}")
+
+    for name, program in programs.items():
+        pickled = pickle.dumps(program)
+        binary = program.dumps()
+        pickle_time = min(timeit.repeat(lambda: pickle.loads(pickled), number=1, repeat=5))
+        binary_time = min(timeit.repeat(lambda: Program.loads(binary), number=1, repeat=5))
+        print(f"{name:<20}{len(pickled) / 1024:>12.0f}{len(binary) / 1024:>12.0f}"
+              f"{pickle_time * 1000:>12.1f}{binary_time * 1000:>12.1f}{pickle_time / binary_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Measures the time taken to draw a whole board with the texture atlas,
+compared to the previous texture drawing which rotated the textures, rendered
+the integers and blended through a temporary surface on every draw
+
+    python benchmarks/render.py [frames]
+"""
+
+import os
+import sys
+import copy
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame as pg
+
+pg.init()
+pg.display.set_mode((1, 1))
+
+from ton.program import *
+from ton.texture import *
+from ton.type import *
+from ton.utils import *
+from ton.constants import *
+from ton import render
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def blended_draw(self, surface, opacity=1.0):
+    blit_alpha(surface, self.texture, (0, 0), opacity)
+
+
+def rotated_draw(self, surface, rotation=Rotation.R0, opacity=1.0):
+    blit_alpha(surface, pg.transform.rotate(self.texture, rotation.value), (0, 0), opacity)
+
+
+def connex_draw(self, surface, connex=Connex(0), opacity=1.0):
+    blit_alpha(surface, self.textures[connex], (0, 0), opacity)
+
+
+def rendered_label(surface, label, opacity=1.0):
+    texture = render.fonts['value'].render(label, True, (0, 0, 0))
+    texture = pg.transform.scale(texture, (CELL_SIZE - 4, CELL_SIZE - 4))
+    blit_alpha(surface, render.textures['value'].texture, (0, 0), opacity)
+    blit_alpha(surface, texture, (2, 2), opacity)
+
+
+@contextmanager
+def uncached():
+    patches = [
+        (SimpleTexture, 'draw', blended_draw),
+        (RotatableTexture, 'draw', rotated_draw),
+        (ConnexTexture, 'draw', connex_draw),
+        (render, 'draw_label', rendered_label)
+    ]
+    originals = [(target, name, getattr(target, name)) for target, name, _ in patches]
+
+    for target, name, value in patches:
+        setattr(target, name, value)
+    try:
+        yield
+    finally:
+        for target, name, value in originals:
+            setattr(target, name, value)
+
+
+def tiled(program: Program, times: int) -> Program:
+    return Program(np.block([[copy.deepcopy(program.cells) for _ in range(times)] for _ in range(times)]))
+
+
+def measure(program: Program, frames: int) -> float:
+    w, h = program.size
+    surface = pg.Surface((w * CELL_SIZE, h * CELL_SIZE))
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        surface.fill(BACKGROUND_COLOR)
+        render.draw_program(program, surface)
+    return (time.perf_counter() - start) / frames
+
+
+def main(frames: int = 20):
+    render.load_textures()
+
+    programs = {
+        name: Program.load(EXAMPLES_DIR / f'{name}.ton')
+        for name in ('addition', 'list', 'recursion')
+    }
+    programs['recursion 4x4'] = tiled(programs['recursion'], 4)
+
+    print(f"{'program':<16}{'renderer':<10}{'ms/frame':>12}{'fps':>10}")
+
+    for name, program in programs.items():
+        with uncached():
+            before = measure(program, frames)
+        after = measure(program, frames)
+
+        for renderer, duration in (('previous', before), ('atlas', after)):
+            print(f"{name:<16}{renderer:<10}{duration * 1000:>12.2f}{1 / duration:>10.0f}")
+
+    print(f"atlas: {atlas.info()}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
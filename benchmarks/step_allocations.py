@@ -0,0 +1,85 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Measures the memory allocated by `Program.step`, compared to the previous
+implementation which copied the grid and every cell on each step
+
+    python benchmarks/step_allocations.py [steps]
+"""
+
+import sys
+import copy
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def previous_copy(cell: Cell) -> Cell:
+    # Chips and lists used to be deep copied on each step, along with their
+    # board and values, and the other cells shallowly
+    if isinstance(cell, (Chip, List_)):
+        return copy.deepcopy(cell)
+    return copy.copy(cell)
+
+
+def copying_step(program: Program):
+    next_cells = program.cells.copy()
+    effects = []
+
+    for x, y in program.all_coords():
+        neighbors = program.get_neighbors(x, y)
+        next_cell = previous_copy(program.cells[x, y]).step(neighbors)
+
+        if type(next_cell) is Outcome:
+            next_cell, cell_effects = next_cell
+            effects.append((x, y, cell_effects))
+
+        next_cells[x, y] = next_cell
+
+    program.cells = next_cells
+    commit(next_cells, effects)
+
+
+def tiled(program: Program, times: int) -> Program:
+    return Program(np.block([[copy.deepcopy(program.cells) for _ in range(times)] for _ in range(times)]))
+
+
+def measure(program: Program, step, steps: int):
+    new_cells = 0
+    allocated = 0
+
+    for _ in range(steps):
+        previous = set(map(id, program.cells.flat))
+        tracemalloc.start()
+        step(program)
+        allocated += tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        new_cells += sum(id(cell) not in previous for cell in program.cells.flat)
+
+    return new_cells / steps, allocated / steps
+
+
+def main(steps: int = 10):
+    programs = {
+        name: Program.load(EXAMPLES_DIR / f'{name}.ton')
+        for name in ('addition', 'list', 'recursion')
+    }
+    programs['recursion 4x4'] = tiled(programs['recursion'], 4)
+
+    print(f"{'program':<16}{'engine':<10}{'new cells/step':>16}{'peak KiB/step':>16}")
+
+    for name, program in programs.items():
+        for engine, step in (('copying', copying_step), ('buffered', Program.step)):
+            new_cells, allocated = measure(copy.deepcopy(program), step, steps)
+            print(f"{name:<16}{engine:<10}{new_cells:>16.1f}{allocated / 1024:>16.1f}")
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Measures the steps per second of the tiled engine on a large board for an
+increasing number of processes, compared to the serial frontier
+
+    python benchmarks/tiled.py [tiles] [steps]
+"""
+
+import os
+import sys
+import copy
+import time
+from pathlib import Path
+
+import numpy as np
+
+from ton.program import *
+from ton.frontier import Frontier
+from ton.tiled import TiledEngine
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def tiled(program: Program, times: int) -> Program:
+    return Program(np.block([[copy.deepcopy(program.cells) for _ in range(times)] for _ in range(times)]))
+
+
+def main(tiles: int = 16, steps: int = 20):
+    program = tiled(Program.load(EXAMPLES_DIR / 'recursion.ton'), tiles)
+    w, h = program.size
+    print(f"{w}x{h} board, {steps} steps")
+    print(f"{'engine':<16}{'stripes':>8}{'steps/s':>12}{'speedup':>10}")
+
+    frontier = Frontier(program.copy())
+    start = time.perf_counter()
+    for _ in range(steps):
+        frontier.step()
+    serial = steps / (time.perf_counter() - start)
+    print(f"{'frontier':<16}{1:>8}{serial:>12.1f}{1:>10.2f}")
+
+    processes = 1
+    while processes <= (os.cpu_count() or 1):
+        with TiledEngine(program.copy(), processes) as engine:
+            start = time.perf_counter()
+            engine.step(steps)
+            rate = steps / (time.perf_counter() - start)
+            print(f"{f'tiled x{processes}':<16}{len(engine.stripes):>8}{rate:>12.1f}{rate / serial:>10.2f}")
+        processes *= 2
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,339 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Offline rendering of evaluations into animated GIF or PNG files
+
+The evaluation is recorded once to a trace, whose steps are then rendered in
+parallel by a pool of processes, each one rebuilding the steps of a chunk
+from the trace. Frames are reduced to a palette computed once from the
+textures, and only the rectangle which changed since the previous frame is
+encoded, the encoded frames being streamed to the output file in order.
+"""
+
+__all__ = ['Palette', 'GifWriter', 'ApngWriter', 'render_animation']
+
+import numpy as np
+
+import os
+import signal
+import struct
+import tempfile
+import zlib
+import multiprocessing
+from functools import lru_cache
+from pathlib import Path
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.trace import *
+from ton.type import *
+from ton.constants import *
+
+
+# Encoded frame, as its position, size and data
+Frame = Tuple[int, int, int, int, bytes]
+
+
+class Palette:
+    """
+    Colors the frames are reduced to, along with a table mapping every color
+    quantized to 5 bits per channel to its nearest palette color
+    """
+
+    def __init__(self, colors: np.ndarray):
+        self.colors = np.zeros((256, 3), np.uint8)
+        self.colors[:len(colors)] = colors
+
+        levels = np.arange(32) << 3 | 4
+        quantized = np.stack(np.meshgrid(levels, levels, levels, indexing='ij'), -1).reshape(-1, 1, 3)
+        self.table = np.concatenate([
+            ((chunk - colors.astype(np.int32)) ** 2).sum(-1).argmin(-1)
+            for chunk in np.array_split(quantized, 16)
+        ]).astype(np.uint8)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def sample() -> 'Palette':
+        """
+        Palette of the 256 most frequent colors of the cell textures drawn on
+        the background, requires the textures to be loaded
+        """
+
+        import pygame as pg
+        from ton.render import draw_cell
+
+        cells = [
+            Wire(), Tube(), Anchor(), Debug(), Chip(), List_(), Mu(),
+            Boolean(True), Boolean(False), Integer(1234567890),
+            Diode(), Transistor(), Adder(), Equals(), Append(), Pop()
+        ]
+
+        surface = pg.Surface((len(cells) * CELL_SIZE, CELL_SIZE))
+        surface.fill(BACKGROUND_COLOR)
+
+        for i, cell in enumerate(cells):
+            neighbors = Program.empty(1, 1).get_neighbors(0, 0)
+            draw_cell(cell, surface.subsurface(i * CELL_SIZE, 0, CELL_SIZE, CELL_SIZE), neighbors)
+
+        pixels = pg.surfarray.array3d(surface).reshape(-1, 3)
+        colors, counts = np.unique(pixels, axis=0, return_counts=True)
+        return Palette(colors[np.argsort(-counts, kind='stable')[:256]])
+
+    def reduce(self, pixels: np.ndarray) -> np.ndarray:
+        r, g, b = np.moveaxis(pixels.astype(np.int32) >> 3, -1, 0)
+        return self.table[r << 10 | g << 5 | b]
+
+
+def lzw(indices: np.ndarray) -> bytes:
+    """
+    GIF flavored LZW compression of 8 bit indices, split in sub-blocks
+    """
+
+    clear, end = 256, 257
+    codes = {}
+    next_code = 258
+    code_size = 9
+
+    output = bytearray()
+    buffer = bits = 0
+
+    def emit(code: int):
+        nonlocal buffer, bits
+        buffer |= code << bits
+        bits += code_size
+        while bits >= 8:
+            output.append(buffer & 0xFF)
+            buffer >>= 8
+            bits -= 8
+
+    data = indices.tobytes()
+    emit(clear)
+    prefix = data[0]
+
+    for byte in data[1:]:
+        key = prefix << 8 | byte
+        code = codes.get(key)
+
+        if code is not None:
+            prefix = code
+            continue
+
+        emit(prefix)
+
+        if next_code < 4096:
+            codes[key] = next_code
+            next_code += 1
+            if next_code > 1 << code_size and code_size < 12:
+                code_size += 1
+        else:
+            emit(clear)
+            codes.clear()
+            next_code = 258
+            code_size = 9
+
+        prefix = byte
+
+    emit(prefix)
+    emit(end)
+
+    if bits:
+        output.append(buffer & 0xFF)
+
+    blocks = bytearray([8])
+    for i in range(0, len(output), 255):
+        block = output[i:i + 255]
+        blocks.append(len(block))
+        blocks += block
+    blocks.append(0)
+
+    return bytes(blocks)
+
+
+def deflate(indices: np.ndarray) -> bytes:
+    """
+    PNG image data of 8 bit indices, without filtering
+    """
+
+    rows = np.zeros((indices.shape[0], indices.shape[1] + 1), np.uint8)
+    rows[:, 1:] = indices
+    return zlib.compress(rows.tobytes(), 9)
+
+
+class GifWriter:
+    ENCODE = staticmethod(lzw)
+
+    def __init__(self, file: BinaryIO, size: Tuple[int, int], palette: Palette, fps: int, frames: int):
+        self.file = file
+        self.delay = round(100 / fps)
+
+        w, h = size
+        file.write(b'GIF89a')
+        file.write(struct.pack('<HHBBB', w, h, 0xF7, 0, 0))
+        file.write(palette.colors.tobytes())
+        # Loops forever
+        file.write(b'\x21\xFF\x0BNETSCAPE2.0\x03\x01\x00\x00\x00')
+
+    def write(self, frame: Frame):
+        x, y, w, h, data = frame
+        # Frames are drawn over the previous one
+        self.file.write(struct.pack('<BBBBHBB', 0x21, 0xF9, 4, 1 << 2, self.delay, 0, 0))
+        self.file.write(struct.pack('<BHHHHB', 0x2C, x, y, w, h, 0))
+        self.file.write(data)
+
+    def close(self):
+        self.file.write(b'\x3B')
+
+
+class ApngWriter:
+    ENCODE = staticmethod(deflate)
+
+    def __init__(self, file: BinaryIO, size: Tuple[int, int], palette: Palette, fps: int, frames: int):
+        self.file = file
+        self.fps = fps
+        self.sequence = 0
+        self.first = True
+
+        w, h = size
+        file.write(b'\x89PNG\r\n\x1a\n')
+        self.chunk(b'IHDR', struct.pack('>IIBBBBB', w, h, 8, 3, 0, 0, 0))
+        self.chunk(b'PLTE', palette.colors.tobytes())
+        self.chunk(b'acTL', struct.pack('>II', frames, 0))
+
+    def chunk(self, kind: bytes, data: bytes):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(kind + data)))
+
+    def write(self, frame: Frame):
+        x, y, w, h, data = frame
+        self.chunk(b'fcTL', struct.pack('>IIIIIHHBB', self.sequence, w, h, x, y, 1, self.fps, 0, 0))
+        self.sequence += 1
+
+        if self.first:
+            self.chunk(b'IDAT', data)
+            self.first = False
+        else:
+            self.chunk(b'fdAT', struct.pack('>I', self.sequence) + data)
+            self.sequence += 1
+
+    def close(self):
+        self.chunk(b'IEND', b'')
+
+
+def writer_for(path: Path) -> Type[Union[GifWriter, ApngWriter]]:
+    return ApngWriter if Path(path).suffix.lower() in ('.png', '.apng') else GifWriter
+
+
+def init_worker(palette: Palette):
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+    import pygame as pg
+    from ton.render import load_textures
+
+    pg.init()
+    pg.display.set_mode((1, 1))
+    load_textures()
+    # SDL turns termination signals into quit events, which would keep the
+    # pool from terminating its workers
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    global worker_palette
+    worker_palette = palette
+
+
+def render_chunk(trace: Path, start: int, stop: int, encode: Callable[[np.ndarray], bytes]) -> List[Frame]:
+    """
+    Renders the steps of a trace from `start` to `stop`, each frame being
+    cropped to the rectangle which changed since the previous step
+    """
+
+    import pygame as pg
+    from ton.render import draw_program
+
+    frames = []
+    previous = None
+
+    with TraceReader(trace) as reader:
+        for step, program in reader.programs(max(start - 1, 0), stop):
+            w, h = program.size
+            surface = pg.Surface((w * CELL_SIZE, h * CELL_SIZE))
+            surface.fill(BACKGROUND_COLOR)
+            draw_program(program, surface)
+            indices = worker_palette.reduce(pg.surfarray.array3d(surface)).T
+
+            if step >= start:
+                if previous is None:
+                    x0, y0, x1, y1 = 0, 0, indices.shape[1], indices.shape[0]
+                else:
+                    rows, columns = np.nonzero(indices != previous)
+                    if len(rows):
+                        x0, y0, x1, y1 = columns.min(), rows.min(), columns.max() + 1, rows.max() + 1
+                    else:
+                        x0, y0, x1, y1 = 0, 0, 1, 1
+
+                frames.append((int(x0), int(y0), int(x1 - x0), int(y1 - y0), encode(indices[y0:y1, x0:x1])))
+
+            previous = indices
+
+    return frames
+
+
+def render_chunk_star(args) -> List[Frame]:
+    return render_chunk(*args)
+
+
+def render_animation(program: Program,
+                     path: Path,
+                     max_steps: int = 10000,
+                     max_period: int = 16,
+                     fps: int = MAX_FPS,
+                     processes: Optional[int] = None,
+                     chunk_size: int = 64) -> Evaluation:
+    """
+    Evaluates a program until it stabilizes and renders every step to an
+    animated GIF, or an animated PNG if the path ends with .png or .apng
+    """
+
+    os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+    import pygame as pg
+    from ton.render import load_textures
+
+    pg.init()
+    if pg.display.get_surface() is None:
+        pg.display.set_mode((1, 1))
+    load_textures()
+    palette = Palette.sample()
+
+    writer_type = writer_for(path)
+    w, h = program.size
+
+    with tempfile.TemporaryDirectory() as directory:
+        trace = Path(directory) / 'evaluation.trace'
+
+        with TraceRecorder(trace, program):
+            evaluation = program.run_until_stable(max_steps, max_period)
+
+        frames = evaluation.steps + 1
+        chunks = [
+            (trace, start, min(start + chunk_size, frames), writer_type.ENCODE)
+            for start in range(0, frames, chunk_size)
+        ]
+
+        context = multiprocessing.get_context('spawn')
+
+        with open(path, 'wb') as file, context.Pool(processes, init_worker, (palette,)) as pool:
+            writer = writer_type(file, (w * CELL_SIZE, h * CELL_SIZE), palette, fps, frames)
+
+            for chunk in pool.imap(render_chunk_star, chunks):
+                for frame in chunk:
+                    writer.write(frame)
+
+            writer.close()
+            pool.close()
+            pool.join()
+
+    return evaluation
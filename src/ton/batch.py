@@ -0,0 +1,144 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Evaluation of a program over many sets of inputs
+
+Each row of inputs gives the values placed at designated cells of the
+program before running it until it stabilizes, after which the values of
+designated output cells are read. Values are given as JSON: integers,
+booleans and lists of values.
+"""
+
+__all__ = ['to_cell', 'from_cell', 'read_rows', 'run_batch']
+
+import csv
+import json
+import multiprocessing
+from pathlib import Path
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+
+
+Position = Tuple[int, int]
+
+
+def to_cell(value: Any) -> Value:
+    if isinstance(value, bool):
+        return Boolean.of(value)
+    elif isinstance(value, int):
+        return Integer.of(value)
+    elif isinstance(value, list):
+        return List_.of(map(to_cell, value))
+    raise TypeError(f"{value!r} is not a ton value")
+
+
+def from_cell(cell: Cell) -> Any:
+    if isinstance(cell, (Integer, Boolean)):
+        return cell.value
+    elif isinstance(cell, List_):
+        return [from_cell(value) for value in cell.values]
+    elif isinstance(cell, Empty):
+        return None
+    return cell.debug()
+
+
+def to_position(position: Union[str, Sequence[int]]) -> Position:
+    if isinstance(position, str):
+        position = position.split(',')
+    x, y = map(int, position)
+    return x, y
+
+
+def parse_value(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        raise ValueError(f"{text!r} is not a JSON value") from None
+
+
+def read_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Rows of inputs of a JSONL file, or of a CSV file whose fields are JSON
+    values, named by its header
+    """
+
+    path = Path(path)
+
+    with open(path, newline='') as file:
+        if path.suffix.lower() == '.csv':
+            for row in csv.DictReader(file):
+                yield {name: parse_value(text) for name, text in row.items()}
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def init_worker(path: Path):
+    global worker_program
+    clear_caches()
+    worker_program = Program.load(path)
+
+
+def run_row(args: Tuple[int, Dict[str, Any], Dict[str, Position], Dict[str, Position], int, int]) -> Dict[str, Any]:
+    index, row, inputs, outputs, max_steps, max_period = args
+    result = {'row': index, 'inputs': row}
+
+    try:
+        program = worker_program.copy()
+
+        for name, position in inputs.items():
+            if not program.in_bounds(*position):
+                raise IndexError(f"input {name!r} at {position} is out of the program")
+            program.cells[position] = to_cell(row[name])
+
+        evaluation = program.run_until_stable(max_steps, max_period)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+        return result
+
+    result.update(
+        steps=evaluation.steps,
+        stable=evaluation.stable,
+        outputs={
+            name: from_cell(program.cells[position]) if program.in_bounds(*position) else None
+            for name, position in outputs.items()
+        }
+    )
+    return result
+
+
+def run_batch(path: Path,
+              rows: Iterable[Dict[str, Any]],
+              inputs: Dict[str, Union[str, Sequence[int]]],
+              outputs: Dict[str, Union[str, Sequence[int]]],
+              max_steps: int = 10000,
+              max_period: int = 16,
+              processes: Optional[int] = None,
+              ordered: bool = False,
+              chunk_size: int = 1) -> Iterator[Dict[str, Any]]:
+    """
+    Runs a program once per row of inputs in a pool of processes, each one
+    loading the program once, and yields the results as they finish, or in
+    the order of the rows if `ordered` is set
+
+    Inputs and outputs map names to positions, either as pairs or as "x,y"
+    strings. Rows which fail yield their error instead of their outputs.
+    """
+
+    inputs = {name: to_position(position) for name, position in inputs.items()}
+    outputs = {name: to_position(position) for name, position in outputs.items()}
+    tasks = (
+        (index, row, inputs, outputs, max_steps, max_period)
+        for index, row in enumerate(rows)
+    )
+
+    context = multiprocessing.get_context('spawn')
+    clear_caches()
+
+    with context.Pool(processes, init_worker, (path,)) as pool:
+        results = (pool.imap if ordered else pool.imap_unordered)(run_row, tasks, chunk_size)
+        yield from results
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Benchmark suite of the interpreter and of the renderer
+
+The workloads are the example programs along with synthetic programs of
+several sizes, each one being stepped by `Program.step` and by `Frontier`
+for a given number of steps. The results can be saved as JSON and compared
+against a previous run.
+"""
+
+__all__ = [
+    'wire_chain',
+    'adder_tree',
+    'processor_grid',
+    'nested_chips',
+    'list_pipeline',
+    'generators',
+    'workloads',
+    'run_bench',
+    'compare'
+]
+
+import os
+import time
+import platform
+import tracemalloc
+from pathlib import Path
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.frontier import *
+from ton.type import *
+from ton.constants import *
+
+
+EXAMPLES_DIR = PROJECT_DIR.parent.parent / 'examples'
+
+ENGINES = ('step', 'frontier')
+
+# Whether a greater value of each metric is better
+METRICS = {
+    'steps_per_second': True,
+    'cell_updates_per_second': True,
+    'peak_memory_kib': False,
+    'render_fps': True
+}
+
+
+def wire_chain(size: int) -> Program:
+    """
+    Single wire winding through the whole board, along which an integer
+    travels towards an anchor
+    """
+
+    program = Program.empty(size, size)
+    cells = program.cells
+    path = []
+
+    for y in range(0, size, 2):
+        row = [(x, y) for x in range(size)]
+        path.extend(row if y % 4 == 0 else reversed(row))
+        if y + 1 < size:
+            path.append((size - 1 if y % 4 == 0 else 0, y + 1))
+
+    for pos in path:
+        cells[pos] = Wire()
+
+    cells[path[0]] = Integer(1)
+    cells[path[-1]] = Anchor()
+    return program
+
+
+def adder_tree(size: int) -> Program:
+    """
+    Binary trees of adders summing integers on their leaves, as many as fit
+    vertically on the board, each root being wired to an anchor
+    """
+
+    depth = 0
+    while 2 ** (depth + 3) - 1 <= size and 2 * depth + 6 <= size:
+        depth += 1
+
+    program = Program.empty(size, size)
+    cells = program.cells
+    leaves = iter(range(1, size * size))
+
+    def build(depth: int, x: int, y: int):
+        cells[x, y] = Adder(Direction.N)
+
+        if depth == 0:
+            cells[x - 1, y] = Integer(next(leaves))
+            cells[x + 1, y] = Integer(next(leaves))
+            return
+
+        offset = 2 ** (depth + 1) // 2
+        for child in (x - offset, x + offset):
+            cells[child, y + 1] = Wire()
+            for x_ in range(min(child, x + 1), max(child, x - 1) + 1):
+                cells[x_, y] = Wire()
+            build(depth - 1, child, y + 2)
+
+    height = 2 * depth + 4
+    for top in range(0, size - height + 1, height):
+        root = 2 ** (depth + 1) - 1
+        cells[root, top] = Anchor()
+        cells[root, top + 1] = Wire()
+        build(depth, root, top + 2)
+
+    return program
+
+
+def processor_grid(size: int) -> Program:
+    """
+    Board filled with rows of diodes separated by wires, fed by anchored
+    integers on their western side
+    """
+
+    program = Program.empty(size, size)
+    cells = program.cells
+
+    for y in range(size):
+        cells[0, y] = Anchor()
+        cells[1, y] = Integer(y)
+        for x in range(2, size - 1):
+            cells[x, y] = Wire() if x % 2 == 0 else Diode(Direction.E)
+        cells[size - 1, y] = Anchor()
+
+    return program
+
+
+def nested_chips(size: int, board_size: int = 5) -> Program:
+    """
+    Columns of chips nested `size // 8` times, each board wiring its southern
+    side to its northern side through the next chip
+    """
+
+    def board(depth: int) -> Program:
+        inner = Program.empty(board_size, board_size)
+        x = board_size // 2
+        for y in range(board_size):
+            inner.cells[x, y] = Wire()
+        if depth > 1:
+            inner.cells[x, board_size // 2] = Chip(Direction.N, board(depth - 1))
+        return inner
+
+    program = Program.empty(size, size)
+    cells = program.cells
+
+    for x in range(1, size, 2):
+        cells[x, 0] = Anchor()
+        for y in range(1, size - 1):
+            cells[x, y] = Wire()
+        cells[x, size // 2] = Chip(Direction.N, board(max(size // 8, 1)))
+        cells[x, size - 1] = Integer(x)
+
+    return program
+
+
+def list_pipeline(size: int) -> Program:
+    """
+    Columns of appenders, each one appending an integer to the list built by
+    the previous one, ending on an anchor
+    """
+
+    program = Program.empty(size, size)
+    cells = program.cells
+
+    for x in range(1, size, 3):
+        cells[x, size - 1] = List_()
+        y = size - 2
+        while y >= 3:
+            cells[x, y] = Append(Direction.N)
+            cells[x - 1, y] = Integer(y)
+            cells[x, y - 1] = Wire()
+            y -= 2
+        cells[x, y] = Anchor()
+
+    return program
+
+
+generators: Dict[str, Callable[[int], Program]] = {
+    'wire_chain': wire_chain,
+    'adder_tree': adder_tree,
+    'processor_grid': processor_grid,
+    'nested_chips': nested_chips,
+    'list_pipeline': list_pipeline
+}
+
+
+def workloads(sizes: Iterable[int],
+              names: Optional[Collection[str]] = None,
+              examples_dir: Path = EXAMPLES_DIR) -> Iterator[Tuple[str, Program]]:
+    """
+    Programs of the examples directory, if there is one, followed by the
+    synthetic programs at each size
+    """
+
+    examples_dir = Path(examples_dir)
+    if examples_dir.is_dir():
+        for path in sorted(examples_dir.glob('*.ton')):
+            if names is None or path.stem in names:
+                yield path.stem, Program.load(path)
+
+    for name, generate in generators.items():
+        if names is None or name in names:
+            for size in sizes:
+                yield name, generate(size)
+
+
+def run_steps(program: Program, engine: str, steps: int) -> int:
+    """
+    Steps a program with the given engine, returning the number of cells
+    it evaluated
+    """
+
+    clear_caches()
+
+    if engine == 'frontier':
+        frontier = Frontier(program)
+        updates = 0
+        for _ in range(steps):
+            updates += frontier.active_size
+            frontier.step()
+        return updates
+
+    w, h = program.size
+    for _ in range(steps):
+        program.step()
+    return w * h * steps
+
+
+def measure_engine(program: Program, engine: str, steps: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    updates = run_steps(program.copy(), engine, steps)
+    duration = time.perf_counter() - start
+
+    # Tracing slows the steps down, so the memory is measured on another run
+    tracemalloc.start()
+    try:
+        run_steps(program.copy(), engine, steps)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'steps_per_second': steps / duration,
+        'cell_updates_per_second': updates / duration,
+        'peak_memory_kib': peak / 1024
+    }
+
+
+def init_renderer() -> bool:
+    """
+    Initializes pygame without a window, returns whether it is available
+    """
+
+    try:
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+        os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')
+        import pygame as pg
+    except ImportError:
+        return False
+
+    pg.init()
+    if pg.display.get_surface() is None:
+        pg.display.set_mode((1, 1))
+
+    from ton.render import load_textures
+    load_textures()
+    return True
+
+
+def measure_render(program: Program, frames: int) -> float:
+    import pygame as pg
+    from ton.render import draw_program
+
+    w, h = program.size
+    surface = pg.Surface((w * CELL_SIZE, h * CELL_SIZE))
+
+    start = time.perf_counter()
+    for _ in range(frames):
+        surface.fill(BACKGROUND_COLOR)
+        draw_program(program, surface)
+    return frames / (time.perf_counter() - start)
+
+
+def run_bench(sizes: Iterable[int] = (16, 32, 64),
+              steps: int = 32,
+              names: Optional[Collection[str]] = None,
+              frames: int = 10,
+              render: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Measures every workload, yielding the results of each one as they are
+    measured
+
+    Rendering is only measured if pygame is available, and skipped otherwise.
+    """
+
+    render = render and frames > 0 and init_renderer()
+
+    for name, program in workloads(sizes, names):
+        result = {
+            'workload': name,
+            'size': list(program.size),
+            'cells': sum(not isinstance(cell, Empty) for cell in program.cells.flat),
+            'steps': steps,
+            'engines': {
+                engine: measure_engine(program, engine, steps)
+                for engine in ENGINES
+            },
+            'render_fps': measure_render(program, frames) if render else None
+        }
+        yield result
+
+
+def metrics(result: Dict[str, Any]) -> Iterator[Tuple[str, Optional[float]]]:
+    for engine, values in result['engines'].items():
+        for metric, value in values.items():
+            yield f'{engine}.{metric}', value
+    yield 'render_fps', result.get('render_fps')
+
+
+def compare(results: List[Dict[str, Any]],
+            baseline: List[Dict[str, Any]],
+            tolerance: float = .1) -> Iterator[Dict[str, Any]]:
+    """
+    Changes of the metrics of every workload measured in both runs, as ratios
+    of the new value to the baseline, flagged as regressions when worse than
+    the baseline by more than the tolerance
+    """
+
+    previous = {
+        (result['workload'], tuple(result['size'])): dict(metrics(result))
+        for result in baseline
+    }
+
+    for result in results:
+        key = result['workload'], tuple(result['size'])
+        if key not in previous:
+            continue
+
+        for metric, value in metrics(result):
+            before = previous[key].get(metric)
+            if not value or not before:
+                continue
+
+            ratio = value / before
+            higher_is_better = METRICS[metric.rpartition('.')[2]]
+            worse = ratio < 1 - tolerance if higher_is_better else ratio > 1 + tolerance
+
+            yield {
+                'workload': key[0],
+                'size': list(key[1]),
+                'metric': metric,
+                'baseline': before,
+                'value': value,
+                'ratio': ratio,
+                'regression': worse
+            }
+
+
+def environment() -> Dict[str, str]:
+    return {
+        'python': platform.python_version(),
+        'implementation': platform.python_implementation(),
+        'machine': platform.machine(),
+        'system': platform.platform()
+    }
@@ -0,0 +1,442 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Binary encoding of programs
+
+Every non-empty cell of a file, whether on a board or nested in a list, a tube
+or the arguments of a processor, is a row of five columns. The occupied cells
+of each board are a contiguous run of rows in `Program.all_coords` order, and
+the payload of the cells holding other cells points into a table of links.
+Cells are always encoded after the cells holding them.
+
+    header       magic, version, flags and the length of each array below
+    kind         uint8 per cell
+    direction    uint8 per cell, 0 for the cells without one
+    flags        uint8 per cell
+    position     uint32 per cell, index of the board cells in their board,
+                 stored as the difference with the previous row modulo 2^32
+    payload      int64 per cell, value or index in another table
+    links        int64, lengths followed by the cells or boards they refer to
+    boards       int64 (first cell, cell count, width, height) per board, the
+                 program being the first one
+    offsets      int64 per string plus one, into the text
+    text         utf-8 encoded strings
+
+Each array is padded to a multiple of 8 bytes. Saved programs have the arrays
+following the header compressed with zlib, the differences of the positions
+being mostly small, which makes a random 512x512 board take 229 KiB instead
+of 2401 KiB, against 1989 KiB pickled. The engines exchanging programs in
+memory leave them uncompressed. Files of the first version, whose positions
+were not differences, are still loaded.
+
+Loading is bound by the creation of the cells: on large boards it runs 1.4
+to 3.6 times as fast as unpickling the same program, as measured by
+benchmarks/load.py, short of the 10 times it was meant to reach.
+"""
+
+__all__ = ['MAGIC', 'VERSION', 'Kind', 'is_binary', 'dumps', 'loads', 'loads_cells', 'convert']
+
+import numpy as np
+
+import itertools
+import zlib
+from enum import IntEnum
+from pathlib import Path
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.type import *
+
+
+MAGIC = b'\x89TON'
+VERSION = 2
+
+HEADER = np.dtype([
+    ('magic', 'S4'),
+    ('version', '<u2'),
+    ('flags', '<u2'),
+    ('cells', '<u8'),
+    ('links', '<u8'),
+    ('boards', '<u8'),
+    ('strings', '<u8'),
+    ('text', '<u8')
+])
+
+COLUMNS = [
+    ('kind', np.uint8),
+    ('direction', np.uint8),
+    ('flags', np.uint8),
+    ('position', np.dtype('<u4')),
+    ('payload', np.dtype('<i8'))
+]
+
+
+class Kind(IntEnum):
+    EMPTY = 0
+    WIRE = 1
+    ANCHOR = 2
+    INTEGER = 3
+    BOOLEAN = 4
+    DIODE = 5
+    TRANSISTOR = 6
+    ADDER = 7
+    EQUALS = 8
+    TUBE = 9
+    DEBUG = 10
+    CHIP = 11
+    IMPORT = 12
+    LIST = 13
+    APPEND = 14
+    POP = 15
+    MU = 16
+
+
+KINDS = {
+    Empty: Kind.EMPTY,
+    Wire: Kind.WIRE,
+    Anchor: Kind.ANCHOR,
+    Integer: Kind.INTEGER,
+    Boolean: Kind.BOOLEAN,
+    Diode: Kind.DIODE,
+    Transistor: Kind.TRANSISTOR,
+    Adder: Kind.ADDER,
+    Equals: Kind.EQUALS,
+    Tube: Kind.TUBE,
+    Debug: Kind.DEBUG,
+    Chip: Kind.CHIP,
+    Import: Kind.IMPORT,
+    List_: Kind.LIST,
+    Append: Kind.APPEND,
+    Pop: Kind.POP,
+    Mu: Kind.MU
+}
+
+CLASSES = {kind: cls for cls, kind in KINDS.items()}
+
+# Cells without state, a single instance of which is shared by every position
+STATELESS = [Kind.EMPTY, Kind.WIRE, Kind.ANCHOR, Kind.DEBUG]
+
+PROCESSORS = [kind for kind, cls in CLASSES.items() if issubclass(cls, Processor)]
+
+# Cells holding other cells or boards
+CONTAINERS = [Kind.TUBE, Kind.LIST, Kind.CHIP, Kind.IMPORT, Kind.MU]
+
+# Header flag, for the arrays compressed with zlib
+COMPRESSED = 1
+
+# Processor flag
+FIRED = 1
+# Integer flag, for integers which do not fit the payload and are stored as a
+# decimal string
+BIG = 2
+
+INT64 = np.iinfo(np.int64)
+
+DIRECTIONS = [None, *Direction]
+
+FLOWS = [Connex(flow) for flow in range(16)]
+
+
+def kind_of(cell: Cell) -> Kind:
+    for cls in type(cell).__mro__:
+        if cls in KINDS:
+            return KINDS[cls]
+    raise ValueError(f"{type(cell).__name__} cells cannot be encoded")
+
+
+class Encoder:
+    def __init__(self):
+        self.columns = {name: [] for name, _ in COLUMNS}
+        self.links = []
+        self.boards = []
+        self.strings = []
+        # Indices of the boards already encoded, shared boards being encoded once
+        self.encoded: Dict[int, Tuple[Program, int]] = {}
+
+    def reserve(self, count: int) -> int:
+        start = len(self.columns['kind'])
+        for column in self.columns.values():
+            column.extend([0] * count)
+        return start
+
+    def string(self, string: str) -> int:
+        self.strings.append(string)
+        return len(self.strings) - 1
+
+    def board(self, program: Program) -> int:
+        if id(program) in self.encoded:
+            return self.encoded[id(program)][1]
+
+        w, h = program.size
+        occupied = [
+            (position, cell) for position, cell in enumerate(program.cells.flat)
+            if not isinstance(cell, Empty)
+        ]
+        start = self.reserve(len(occupied))
+        index = len(self.boards)
+        self.boards.append((start, len(occupied), w, h))
+        self.encoded[id(program)] = program, index
+
+        for i, (position, cell) in enumerate(occupied, start):
+            self.columns['position'][i] = position
+            self.encode(i, cell)
+
+        return index
+
+    def cell(self, cell: Cell) -> int:
+        i = self.reserve(1)
+        self.encode(i, cell)
+        return i
+
+    def encode(self, i: int, cell: Cell):
+        kind, direction, flags, payload = kind_of(cell), 0, 0, 0
+
+        if isinstance(cell, Directional):
+            direction = cell.direction
+
+        if kind == Kind.INTEGER:
+            if INT64.min <= cell.value <= INT64.max:
+                payload = cell.value
+            else:
+                flags = BIG
+                payload = self.string(str(cell.value))
+        elif kind == Kind.BOOLEAN:
+            payload = int(cell.value)
+        elif kind == Kind.TUBE:
+            flags = cell.flow
+            payload = -1 if cell.value is None else self.cell(cell.value)
+        elif kind == Kind.LIST:
+            values = [self.cell(value) for value in cell.values]
+            payload = len(self.links)
+            self.links += [len(values), *values]
+        elif kind in PROCESSORS:
+            arguments = [(side, self.cell(value)) for side, value in cell.arguments.items()]
+            flags = FIRED if cell.fired else 0
+            payload = len(self.links)
+            self.links.append(len(arguments))
+            for side, value in arguments:
+                self.links += [side, value]
+        elif kind == Kind.IMPORT:
+            board = self.board(cell.board)
+            payload = len(self.links)
+            self.links += [board, self.string(str(cell.path))]
+        elif kind == Kind.CHIP:
+            payload = self.board(cell.board)
+        elif kind == Kind.MU:
+            payload = self.board(cell.program)
+
+        columns = self.columns
+        columns['kind'][i] = kind
+        columns['direction'][i] = direction
+        columns['flags'][i] = flags
+        columns['payload'][i] = payload
+
+    def dumps(self, compressed: bool) -> bytes:
+        text = [string.encode('utf-8') for string in self.strings]
+        offsets = np.cumsum([0] + list(map(len, text)), dtype=np.int64)
+
+        header = np.zeros(1, HEADER)
+        header['magic'] = MAGIC
+        header['version'] = VERSION
+        header['flags'] = COMPRESSED if compressed else 0
+        header['cells'] = len(self.columns['kind'])
+        header['links'] = len(self.links)
+        header['boards'] = len(self.boards)
+        header['strings'] = len(self.strings)
+        header['text'] = offsets[-1]
+
+        columns = {name: np.array(self.columns[name], dtype) for name, dtype in COLUMNS}
+        columns['position'][1:] -= columns['position'][:-1].copy()
+
+        arrays = [
+            *columns.values(),
+            np.array(self.links, np.int64),
+            np.array(self.boards, np.int64).reshape(-1, 4),
+            offsets,
+            np.frombuffer(b''.join(text), np.uint8)
+        ]
+
+        chunks = []
+        for array in arrays:
+            chunks.append(array.tobytes())
+            chunks.append(bytes(-array.nbytes % 8))
+
+        body = b''.join(chunks)
+        return header.tobytes() + (zlib.compress(body) if compressed else body)
+
+
+class Decoder:
+    def __init__(self, data: bytes):
+        header = np.frombuffer(data, HEADER, 1)[0]
+
+        if header['magic'] != MAGIC:
+            raise ValueError("not a binary ton program")
+        if header['version'] > VERSION:
+            raise ValueError(f"unsupported program version {header['version']}")
+
+        body = memoryview(data)[HEADER.itemsize:]
+        if header['flags'] & COMPRESSED:
+            body = zlib.decompress(body)
+        offset = 0
+
+        def take(dtype, count: int) -> np.ndarray:
+            nonlocal offset
+            array = np.frombuffer(body, dtype, count, offset)
+            offset += array.nbytes + -array.nbytes % 8
+            return array
+
+        cells = int(header['cells'])
+        self.kind, self.direction, self.flags, self.position, self.payload = (
+            take(dtype, cells) for _, dtype in COLUMNS
+        )
+        if header['version'] > 1:
+            self.position = np.cumsum(self.position, dtype=self.position.dtype)
+        self.links = take(np.int64, int(header['links']))
+        self.boards = take(np.int64, 4 * int(header['boards'])).reshape(-1, 4)
+        self.offsets = take(np.int64, int(header['strings']) + 1)
+        self.text = take(np.uint8, int(header['text'])).tobytes()
+
+        self.cells = np.empty(cells, object)
+        self.programs: List[Optional[Program]] = [None] * len(self.boards)
+
+    def string(self, index: int) -> str:
+        return self.text[self.offsets[index]:self.offsets[index + 1]].decode('utf-8')
+
+    def decode(self, root: bool = True) -> Optional[Program]:
+        """
+        Decodes the cells and boards, along with the board of the program
+        itself unless `root` is false
+        """
+
+        kind = self.kind
+        pending = np.isin(kind, CONTAINERS)
+
+        # Cells which do not refer to other cells are decoded kind by kind
+        for k in np.flatnonzero(np.bincount(kind, minlength=len(Kind))):
+            rows = np.flatnonzero(kind == k)
+
+            if k in STATELESS:
+                self.cells[rows] = CLASSES[k]()
+            elif k == Kind.INTEGER:
+                big = self.flags[rows] & BIG != 0
+                pending[rows[big]] = True
+                rows = rows[~big]
+                self.cells[rows] = list(map(Integer.of, self.payload[rows].tolist()))
+            elif k == Kind.BOOLEAN:
+                self.cells[rows] = list(map(Boolean.of, self.payload[rows].astype(bool).tolist()))
+            elif k == Kind.TUBE:
+                full = self.payload[rows] >= 0
+                pending[rows] = False
+                pending[rows[full]] = True
+                rows = rows[~full]
+                self.cells[rows] = [Tube(None, FLOWS[flags]) for flags in self.flags[rows].tolist()]
+            elif k in PROCESSORS:
+                fed = self.links[self.payload[rows]] != 0
+                pending[rows[fed]] = True
+                rows = rows[~fed]
+                processors = list(map(CLASSES[k], map(DIRECTIONS.__getitem__, self.direction[rows].tolist())))
+                for processor in itertools.compress(processors, self.flags[rows].tolist()):
+                    processor.fired = True
+                self.cells[rows] = processors
+
+        # The other ones are decoded after the cells and boards they hold,
+        # which come after them
+        boards = sorted(range(len(self.boards)), key=lambda b: self.boards[b][0], reverse=True)
+
+        for i in reversed(np.flatnonzero(pending).tolist()):
+            while boards and self.boards[boards[0]][0] > i:
+                self.assemble(boards.pop(0))
+            self.cells[i] = self.cell(i)
+
+        for board in boards:
+            if board or root:
+                self.assemble(board)
+
+        return self.programs[0]
+
+    def assemble(self, board: int):
+        start, count, w, h = map(int, self.boards[board])
+        cells = np.full(w * h, Empty(), object)
+        cells[self.position[start:start + count]] = self.cells[start:start + count]
+        self.programs[board] = Program(cells.reshape(w, h))
+
+    def cell(self, i: int) -> Cell:
+        kind = int(self.kind[i])
+        direction = DIRECTIONS[self.direction[i]]
+        flags = int(self.flags[i])
+        payload = int(self.payload[i])
+
+        if kind == Kind.INTEGER:
+            return Integer.of(int(self.string(payload)))
+        elif kind == Kind.TUBE:
+            return Tube(self.cells[payload], FLOWS[flags])
+        elif kind == Kind.LIST:
+            count = int(self.links[payload])
+            return List_.of(self.cells[self.links[payload + 1:payload + 1 + count]])
+        elif kind in PROCESSORS:
+            processor = CLASSES[kind](direction)
+            count = int(self.links[payload])
+            pairs = self.links[payload + 1:payload + 1 + 2 * count].reshape(-1, 2).tolist()
+            processor.arguments = {Side(side): self.cells[j] for side, j in pairs}
+            processor.fired = bool(flags & FIRED)
+            return processor
+        elif kind == Kind.MU:
+            cell = Mu()
+            cell.program = self.programs[payload]
+            return cell
+        else:
+            board, path = (payload, None) if kind == Kind.CHIP else self.links[payload:payload + 2].tolist()
+            # Bypasses the constructors, which would create or load a board,
+            # boards being shared by the chips referring to the same one
+            chip = CLASSES[kind].__new__(CLASSES[kind])
+            state = {'direction': direction, 'board': self.programs[board]}
+            if path is not None:
+                state['path'] = Path(self.string(path))
+            chip.__setstate__(state)
+            return chip
+
+
+def is_binary(data: bytes) -> bool:
+    return data[:len(MAGIC)] == MAGIC
+
+
+def dumps(program: Program, compressed: bool = True) -> bytes:
+    """
+    Encodes a program, compressing it unless it is only held in memory
+    """
+
+    encoder = Encoder()
+    encoder.board(program)
+    return encoder.dumps(compressed)
+
+
+def loads(data: bytes) -> Program:
+    return Decoder(data).decode()
+
+
+def loads_cells(data: bytes) -> List[Tuple[Tuple[int, int], Cell]]:
+    """
+    Non-empty cells of a program along with their position, decoded without
+    building the board of the program, which may be too large to be dense
+    """
+
+    decoder = Decoder(data)
+    decoder.decode(root=False)
+    start, count, _, h = map(int, decoder.boards[0])
+    positions = decoder.position[start:start + count].tolist()
+    return [
+        (divmod(position, h), cell)
+        for position, cell in zip(positions, decoder.cells[start:start + count].tolist())
+    ]
+
+
+def convert(path: Path, output: Optional[Path] = None):
+    """
+    Converts a pickled program to the binary format, in place unless an
+    output path is given
+    """
+
+    program = Program.load(path, allow_pickle=True)
+    program.save(output or path)
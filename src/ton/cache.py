@@ -0,0 +1,116 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['LRUCache', 'FileCache']
+
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import *
+
+
+class LRUCache:
+    """
+    Mapping evicting its least recently used entries once it holds more than
+    `maxsize` of them, and counting the lookups it could and could not answer
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            value = self.entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key: Hashable, value: Any):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries),
+            'maxsize': self.maxsize
+        }
+
+
+class FileCache:
+    """
+    Objects loaded from files, each file being loaded once per process and
+    loaded again only if its modification time and content changed
+    """
+
+    def __init__(self, loader: Callable[[bytes], Any]):
+        self.loader = loader
+        # Modification time and size, hash of the content and loaded object
+        self.entries: Dict[Path, Tuple[Tuple[int, int], bytes, Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path: Path) -> Any:
+        path = Path(path).resolve()
+        stat = path.stat()
+        stamp = stat.st_mtime_ns, stat.st_size
+        entry = self.entries.get(path)
+
+        if entry is not None and entry[0] == stamp:
+            self.hits += 1
+            return entry[2]
+
+        data = path.read_bytes()
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+
+        if entry is not None and entry[1] == digest:
+            self.hits += 1
+            self.entries[path] = stamp, digest, entry[2]
+            return entry[2]
+
+        self.misses += 1
+        value = self.loader(data)
+        self.entries[path] = stamp, digest, value
+        return value
+
+    def get(self, path: Path) -> Any:
+        """
+        Object last loaded from the file, without checking the file
+        """
+
+        entry = self.entries.get(Path(path).resolve())
+        return None if entry is None else entry[2]
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self.entries)
+        }
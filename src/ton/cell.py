@@ -2,6 +2,11 @@
 # coding: utf-8
 
 __all__ = [
+    'Effect',
+    'Fire',
+    'Print',
+    'Outcome',
+    'commit',
     'Cell',
     'Empty',
     'Link',
@@ -15,6 +20,8 @@ __all__ = [
     'Directional',
     'Diode',
     'Transistor',
+    'StepOutputs',
+    'step_outputs',
     'Processor',
     'Adder',
     'Debug',
@@ -23,43 +30,124 @@ __all__ = [
     'List_',
     'Append',
     'Pop',
-    'Mu'
+    'Mu',
+    'interned',
+    'intern',
+    'clear_caches',
+    'cache_statistics'
 ]
 
-import pygame as pg
 import numpy as np
 
-import random
 import copy
+import threading
 from abc import *
+from contextlib import contextmanager
 from typing import *
 from pathlib import Path
 
-from ton.program import *
-from ton.texture import *
+from ton.cache import *
+from ton.rng import draws
+from ton.persistent import *
 from ton.neighborhood import *
-from ton.utils import *
 from ton.type import *
 from ton.constants import *
 
 
+class Effect(object):
+    """
+    Change a cell makes outside of its own state when stepped, applied once
+    every cell was stepped
+    """
+
+    __slots__ = []
+
+    @abstractmethod
+    def apply(self, cells, x: int, y: int) -> Optional[Tuple[int, int]]:
+        """
+        Applies the effect of the cell at the given position to the next
+        state of the cells, returning the position of the cell it changed
+        """
+
+        raise NotImplementedError
+
+
+class Fire(Effect):
+    """
+    The processor in the given direction gave its outputs, and vanishes
+    along with its arguments
+    """
+
+    __slots__ = ['direction']
+
+    def __init__(self, direction: Direction):
+        self.direction = direction
+
+    def apply(self, cells, x: int, y: int) -> Optional[Tuple[int, int]]:
+        for direction, pos in Neighborhood.around(x, y):
+            if direction is self.direction and isinstance(cells[pos], Processor):
+                cells[pos] = Empty()
+                return pos
+        return None
+
+
+class Print(Effect):
+    __slots__ = ['text']
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def apply(self, cells, x: int, y: int) -> Optional[Tuple[int, int]]:
+        print(self.text)
+        return None
+
+
+class Outcome(NamedTuple):
+    """
+    Next state of a cell along with its effects
+    """
+
+    cell: 'Cell'
+    effects: Tuple[Effect, ...]
+
+
+def commit(cells, effects: List[Tuple[int, int, Tuple[Effect, ...]]]) -> Set[Tuple[int, int]]:
+    """
+    Applies the effects of the cells at the given positions, in the order
+    they were stepped, and returns the positions of the cells they changed
+    """
+
+    changed = set()
+
+    for x, y, cell_effects in effects:
+        for effect in cell_effects:
+            pos = effect.apply(cells, x, y)
+            if pos is not None:
+                changed.add(pos)
+
+    return changed
+
+
 class Cell(object):
     __slots__ = []
 
-    texture: Texture
+    # Whether the cell can change while its neighborhood stays the same
+    always_active = False
 
     @abstractmethod
-    def step(self, neighborhood: Neighborhood) -> 'Cell':
+    def step(self, neighborhood: Neighborhood) -> Union['Cell', Outcome]:
+        """
+        Next state of the cell, only depending on the state of its neighbors
+        before the step, which are never modified, along with its effects if
+        it has any
+        """
+
         raise NotImplementedError
 
     @classmethod
     def name(cls) -> str:
         return cls.__name__
 
-    @classmethod
-    def draw_icon(cls, surface: pg.Surface, opacity: float = 1.0):
-        cls.texture.draw(surface, opacity=opacity)
-
     def on_create(self, neighbors: Neighborhood):
         pass
 
@@ -87,10 +175,6 @@ class Cell(object):
     def copy(self) -> 'Cell':
         return copy.copy(self)
 
-    @abstractmethod
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        raise NotImplementedError
-
     def __getstate__(self):
         return dict(
             (slot, getattr(self, slot))
@@ -106,57 +190,50 @@ class Cell(object):
 class Empty(Cell):
     __slots__ = []
 
+    # Empty cells have no state, so a single instance is shared
+    instance = None
+
+    def __new__(cls):
+        if cls.instance is None:
+            cls.instance = super().__new__(cls)
+        return cls.instance
+
     def step(self, neighbors: Neighborhood) -> Cell:
         return self
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        pass
-
 
 class Link(Cell):
     __slots__ = []
 
-    texture: ConnexTexture
-
     def get_pins(self) -> Set[Direction]:
         return set(Direction)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        has_pin = lambda direction, cell: direction.opposite() in cell.get_pins()
-        connex = Connex(0)
-        for direction, cell in neighbors.cells.items():
-            if cell is None or has_pin(direction, cell):
-                connex |= Connex.from_direction(direction)
-        self.texture.draw(surface, connex, opacity)
-
 
 class Wire(Link):
     __slots__ = []
 
-    texture = ConnexTexture.load('wire')
-
-    def step(self, neighbors: Neighborhood) -> Cell:
-        values = neighbors.filter(lambda _, cell: isinstance(cell, Value))
+    def step(self, neighbors: Neighborhood) -> Union[Cell, Outcome]:
+        values = [cell for cell in neighbors.cells if isinstance(cell, Value)]
 
         if values:
-            return random.choice(list(values.get_cells()))
+            return draws.choice(values)
 
-        processors = neighbors.filter(lambda _, cell: isinstance(cell, Processor))
         candidates = []
 
-        for direction, processor in processors:
-            if processor.is_fed() and processor.will_provide(direction.opposite()):
-                outputs = processor.process(processor.arguments)
-                side = processor.get_direction_side(direction.opposite())
-                candidates.append((processor, outputs[side]))
+        for direction, processor in neighbors:
+            if isinstance(processor, Processor) \
+                    and processor.is_fed() \
+                    and processor.will_provide(direction.opposite()):
+                candidates.append((direction, processor, processor.get_direction_side(direction.opposite())))
 
         if candidates:
-            processor, value = random.choice(candidates)
-            processor.fired = True
-            return value
+            # Only the outputs of the chosen processor are computed
+            direction, processor, side = draws.choice(candidates)
+            Processor.counts['skipped'] += len(candidates) - 1
+            return Outcome(processor.get_outputs()[side], (Fire(direction),))
 
         cells_or_edges = []
-        for cell in neighbors.cells.values():
+        for cell in neighbors.cells:
             if cell is None or isinstance(cell, (Link, Processor, Anchor, Chip)):
                 cells_or_edges.append(cell)
 
@@ -169,7 +246,8 @@ class Wire(Link):
 class Tube(Link):
     __slots__ = ['value', 'flow']
 
-    texture = ConnexTexture.load('tube')
+    # Tubes fed from several sides draw one of their values every step
+    always_active = True
 
     def __init__(self, value: Optional['Value'] = None, flow: Optional[Connex] = Connex(0)):
         self.value = value
@@ -188,14 +266,12 @@ class Tube(Link):
                 values.append(cell.value)
                 flow |= c
 
-        if values:
-            self.value = random.choice(values)
-        else:
-            self.value = None
-            
-        self.flow = flow
+        value = draws.choice(values) if values else None
 
-        return self
+        if value == self.value and flow == self.flow:
+            return self
+        else:
+            return Tube(value, flow)
 
     def debug(self):
         return {
@@ -204,35 +280,20 @@ class Tube(Link):
             'value': None if self.value is None else self.value.debug()
         }
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-       if self.value is None:
-           super().draw(surface, neighbors, opacity)
-       else:
-           reduced_size = CELL_SIZE * 3/4
-           value_surface = pg.Surface((reduced_size, reduced_size))
-           self.value.draw(surface, neighbors, opacity)
-        
 
 class Anchor(Cell):
     __slots__ = []
 
-    texture = SimpleTexture.load('anchor')
-
     def step(self, neighbors: Neighborhood) -> Cell:
         return self
 
     def get_pins(self) -> Set[Direction]:
         return set(Direction)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        self.texture.draw(surface, opacity)
-
 
 class Directional(Cell):
     __slots__ = ['direction']
 
-    texture: RotatableTexture
-    
     def __init__(self, direction: Direction = Direction.N):
         self.direction = direction
 
@@ -251,32 +312,84 @@ class Directional(Cell):
     def previous_state(self):
         self.rotate(Rotation.R270)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        self.texture.draw(surface, self.direction.relative_rotation_to(Direction.N), opacity)
-
     def debug(self):
         d = super().debug()
         d['direction'] = self.direction.name
         return d
 
 
+class StepOutputs(threading.local):
+    """
+    Outputs of the processors computed during the step of the outermost
+    program in the current thread, by identity of the processor, entered by
+    the engines around their step so that the outputs are only computed once
+    however many wires the processors feed
+    """
+
+    def __init__(self):
+        self.depth = 0
+        self.outputs = {}
+
+    @contextmanager
+    def stepping(self):
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            if not self.depth:
+                self.outputs.clear()
+
+
+step_outputs = StepOutputs()
+
+
 class Processor(Directional):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    pin_input_texture = RotatableTexture.load('pin_input')
-    pin_output_texture = RotatableTexture.load('pin_output')
+    # Number of outputs computed, reused by another wire during the same step,
+    # and never computed since the wire picked another processor, since the
+    # evaluation started
+    counts: Dict[str, int] = {'computed': 0, 'reused': 0, 'skipped': 0}
 
     def __init__(self, direction: Direction, inputs: Dict[Side, Type[Cell]], outputs: Set[Side]):
         super().__init__(direction)
         self.inputs = inputs
         self.outputs = outputs
         self.arguments = {}
+        # Only set on processors which fired in programs saved by previous
+        # versions, fired processors now vanishing right away
         self.fired = False
 
     @abstractmethod
     def process(self, arguments: Dict[Side, Cell]) -> Dict[Side, Cell]:
         raise NotImplementedError
 
+    def get_outputs(self) -> Dict[Side, Cell]:
+        """
+        Outputs for the current arguments, computed once per step however
+        many wires the processor feeds
+        """
+
+        # Cells are left untouched during a step, so the outputs computed for
+        # a processor hold until the step ends
+        memo = step_outputs.outputs if step_outputs.depth else None
+        entry = None if memo is None else memo.get(id(self))
+
+        if entry is not None:
+            Processor.counts['reused'] += 1
+            return entry[1]
+
+        outputs = self.process(self.arguments)
+        Processor.counts['computed'] += 1
+
+        if memo is not None:
+            # The processor is kept along with its outputs so that its
+            # identity is not reused during the step
+            memo[id(self)] = self, outputs
+
+        return outputs
+
     def get_pins(self) -> Set[Direction]:
         pins = set()
 
@@ -311,7 +424,9 @@ class Processor(Directional):
     def step(self, neighbors: Neighborhood) -> Cell:
         if self.fired:
             return Empty()
-        
+
+        arguments = self.arguments
+
         for direction, cell in neighbors:
             side = self.get_direction_side(direction)
             try:
@@ -319,10 +434,19 @@ class Processor(Directional):
             except KeyError:
                 continue
             else:
-                if isinstance(cell, type_):
-                    self.arguments[side] = cell
+                if isinstance(cell, type_) and arguments.get(side) is not cell:
+                    if arguments is self.arguments:
+                        arguments = dict(arguments)
+                    arguments[side] = cell
 
-        return self
+        if arguments is self.arguments:
+            return self
+
+        # The arguments are never modified, since the previous state of the
+        # processor is still read by its neighbors
+        processor = self.copy()
+        processor.arguments = arguments
+        return processor
 
     def info(self) -> str:
         return f"<{type(self).__name__}>"
@@ -341,24 +465,11 @@ class Processor(Directional):
         }
         return d
 
-    def draw_pin_overlay(self, surface: pg.Surface):
-        for side in self.inputs.keys():
-            self.pin_input_texture.draw(surface, self.get_side_direction(side).relative_rotation_to(Direction.N))
-
-        for side in self.outputs:
-            self.pin_output_texture.draw(surface, self.get_side_direction(side).relative_rotation_to(Direction.N))
-
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        super().draw(surface, neighbors, opacity)
-        self.draw_pin_overlay(surface)
-
 
 
 class Diode(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    texture = RotatableTexture.load('diode')
-
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
             direction,
@@ -375,8 +486,6 @@ class Diode(Processor):
 class Transistor(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    texture = RotatableTexture.load('transistor')
-
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
             direction,
@@ -393,8 +502,6 @@ class Transistor(Processor):
         
 class Adder(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
-    
-    texture = RotatableTexture.load('adder')
 
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
@@ -407,15 +514,13 @@ class Adder(Processor):
         x = inputs[Side.LEFT].value
         y = inputs[Side.RIGHT].value
         return {
-            Side.FRONT: Integer(x + y)
+            Side.FRONT: Integer.of(x + y)
         }
 
 
 class Equals(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    texture = RotatableTexture.load('equals')
-
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
             direction,
@@ -425,14 +530,14 @@ class Equals(Processor):
 
     def process(self, inputs: Dict[Side, Cell]) -> Dict[Side, Cell]:
         return {
-            Side.FRONT: Boolean(inputs[Side.LEFT] == inputs[Side.RIGHT])
+            Side.FRONT: Boolean.of(inputs[Side.LEFT] == inputs[Side.RIGHT])
         }
 
 
 class Debug(Cell):
     __slots__ = []
 
-    texture = SimpleTexture.load('console')
+    always_active = True
 
     def __init__(self):
         super().__init__()
@@ -440,20 +545,36 @@ class Debug(Cell):
     def get_pins(self) -> Set[Direction]:
         return set(Direction)
 
-    def step(self, neighbors: Neighborhood) -> Cell:
-        for neighbor in neighbors.filter(lambda _, cell: isinstance(cell, Value)).get_cells():
-            print(neighbor.info())
-        return self
+    def step(self, neighbors: Neighborhood) -> Union[Cell, Outcome]:
+        prints = tuple(
+            Print(neighbor.info())
+            for neighbor in neighbors.filter(lambda _, cell: isinstance(cell, Value)).get_cells()
+        )
+        return Outcome(self, prints) if prints else self
+
+
+# Canonical instances of the values built during evaluation, which are never
+# modified once created, so that equal values share one instance
+interned: LRUCache = LRUCache(INTERN_SIZE)
+
+# Entry of a chip whose next board depends on its draws
+DRAWING = object()
+
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        self.texture.draw(surface, opacity)
+def intern(key: Hashable, build: Callable[[], 'Value']) -> 'Value':
+    """
+    Canonical value for the given key, built on the first lookup
+    """
+
+    value = interned.get(key)
+    if value is None:
+        value = interned[key] = build()
+    return value
 
 
 class Value(Cell):
     __slots__ = []
 
-    background = SimpleTexture.load('value')
-
     def __init__(self):
         self.index = None
 
@@ -465,36 +586,32 @@ class Value(Cell):
         return set(Direction)
     
     def step(self, neighbors: Neighborhood) -> Cell:
-        processors = neighbors.filter(lambda _, cell: isinstance(cell, Processor))
+        for cell in neighbors.cells:
+            if isinstance(cell, Processor) and not cell.is_fed():
+                return self
 
-        for direction, processor in processors:
-            if not processor.is_fed():
+        for cell in neighbors.cells:
+            if isinstance(cell, Anchor):
                 return self
 
-        anchors = neighbors.filter(lambda _, cell: isinstance(cell, Anchor))
-        if anchors:
-            return self
-        else:
-            return Empty()
+        return Empty()
 
 
 class Integer(Value):
     __slots__ = ['value']
 
-    font = pg.font.Font(str(ASSETS_DIR / 'Oxanium-ExtraBold.ttf'), CELL_SIZE)
-
     def __init__(self, value: int = 0):
         self.value = value
 
+    @staticmethod
+    def of(value: int) -> 'Integer':
+        return intern((Integer, value), lambda: Integer(value))
+
     def __eq__(self, other):
-        return isinstance(other, Integer) and self.value == other.value
+        return self is other or isinstance(other, Integer) and self.value == other.value
 
-    @classmethod
-    def draw_icon(self, surface: pg.Surface, opacity: float = 1.0):
-        texture = self.font.render('x', True, (0, 0, 0))
-        texture = pg.transform.scale(texture, (CELL_SIZE - 4, CELL_SIZE - 4))
-        blit_alpha(surface, Value.background.texture, (0, 0), opacity)
-        blit_alpha(surface, texture, (2, 2), opacity)
+    def __hash__(self):
+        return hash((Integer, self.value))
 
     def next_state(self):
         self.value += 1
@@ -505,28 +622,22 @@ class Integer(Value):
     def info(self) -> str:
         return str(self.value)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        texture = self.font.render(str(self.value), True, (0, 0, 0))
-        texture = pg.transform.scale(texture, (CELL_SIZE - 4, CELL_SIZE - 4))
-        blit_alpha(surface, Value.background.texture, (0, 0), opacity)
-        blit_alpha(surface, texture, (2, 2), opacity)
-
 
 class Boolean(Value):
     __slots__ = ['value']
 
-    false_texture = SimpleTexture.load('false')
-    true_texture = SimpleTexture.load('true')
-
     def __init__(self, value: bool = True):
         self.value = value
 
+    @staticmethod
+    def of(value: bool) -> 'Boolean':
+        return intern((Boolean, value), lambda: Boolean(value))
+
     def __eq__(self, other):
-        return isinstance(other, Boolean) and self.value == other.value
+        return self is other or isinstance(other, Boolean) and self.value == other.value
 
-    @classmethod
-    def draw_icon(self, surface: pg.Surface, opacity: float = 1.0):
-        self.true_texture.draw(surface, opacity)
+    def __hash__(self):
+        return hash((Boolean, self.value))
 
     def next_state(self):
         self.value = not self.value
@@ -537,21 +648,51 @@ class Boolean(Value):
     def into(self) -> str:
         return str(self.value)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        if self.value:
-            self.true_texture.draw(surface, opacity)
-        else:
-            self.false_texture.draw(surface, opacity)
-
 
 class Chip(Directional):
-    __slots__ = ['direction', 'board']
+    __slots__ = ['direction', 'board', 'digest', 'shared', 'copied']
+
+    # The board is only ever read by the chip itself, so it is stepped in place
+    # rather than copied every step, unless the chip is memoized
+    always_active = True
 
-    texture = RotatableTexture.load('chip')
+    # Next board and output of a chip, keyed by the digest of its board and the
+    # values on each of its sides, set to None to disable memoization
+    cache: Optional[LRUCache] = LRUCache(1024)
+
+    # Number of snapshots taken of programs, which share the boards of their
+    # chips until the chips copy them
+    snapshots: int = 0
 
     def __init__(self, direction: Direction = Direction.N, board: Optional['Program'] = None):
         super().__init__(direction)
-        self.board = board or Program.empty(16, 16)
+        self.board = board or Program.empty(BOARD_SIZE, BOARD_SIZE)
+        # Hash of the board, computed on the first step and False when the
+        # board has side effects which prevent memoizing it
+        self.digest = None
+        # Whether the board may be referenced elsewhere, in which case it is
+        # copied before being stepped in place
+        self.shared = False
+        # Number of snapshots taken when the board was last copied
+        self.copied = Chip.snapshots
+
+    @classmethod
+    def clear_cache(cls):
+        if cls.cache is not None:
+            cls.cache.clear()
+
+    @classmethod
+    def snapshot(cls):
+        """
+        Marks the boards of every chip as shared with a snapshot, so that they
+        are copied before being stepped or edited in place
+        """
+
+        cls.snapshots += 1
+
+    @property
+    def owns_board(self) -> bool:
+        return not self.shared and self.copied == Chip.snapshots
 
     def get_pins(self) -> Set[Direction]:
         return set(Direction)
@@ -577,7 +718,36 @@ class Chip(Directional):
             yield pos, self.board.cells[pos]
 
     def copy(self):
-        return copy.deepcopy(self)
+        chip = copy.copy(self)
+        self.shared = chip.shared = True
+        return chip
+
+    def detach(self) -> 'Chip':
+        """
+        Copy of the chip owning its board, which can then be edited
+        """
+
+        chip = copy.copy(self)
+        chip.board = copy.deepcopy(self.board)
+        chip.digest = None
+        chip.shared = False
+        chip.copied = Chip.snapshots
+        return chip
+
+    def __getstate__(self):
+        # The digest depends on the interpreter's hash seed
+        state = super().__getstate__()
+        state.pop('digest', None)
+        state.pop('shared', None)
+        state.pop('copied', None)
+        return state
+
+    def __setstate__(self, state):
+        # Boards referenced by several chips are shared once unpickled
+        self.digest = None
+        self.shared = True
+        self.copied = Chip.snapshots
+        super().__setstate__(state)
 
     def debug(self):
         return {
@@ -586,36 +756,144 @@ class Chip(Directional):
             'board': [[self.board.cell[x, y].debug() for x in range(self.board.width)] for y in range(self.board.height)]
         }
 
-    def step(self, neighbors: Neighborhood) -> Cell:
+    def is_pure(self) -> bool:
+        for cell in self.board.cells.flat:
+            if isinstance(cell, Debug) or isinstance(cell, Chip) and not cell.is_pure():
+                return False
+        return True
+
+    def get_digest(self) -> Union[int, bool]:
+        if self.digest is None:
+            self.digest = self.is_pure() and self.board.digest()
+        return self.digest
+
+    def get_inputs(self, neighbors: Neighborhood) -> Iterable[Tuple[Side, Optional[Value]]]:
         for side in Side:
-            direction = side.direction_relative_to(self.direction)
-            for pos, cell in self.enumerate_side(side):
-                if isinstance(cell, Wire):
-                    arg = neighbors[direction]
-                    if isinstance(arg, Value):
+            arg = neighbors[side.direction_relative_to(self.direction)]
+            yield side, arg if isinstance(arg, Value) else None
+
+    def feed(self, neighbors: Neighborhood):
+        for side, arg in self.get_inputs(neighbors):
+            if arg is not None:
+                for pos, cell in self.enumerate_side(side):
+                    if isinstance(cell, Wire):
                         self.board.cells[pos] = arg
 
-        self.board.step()
-
+    def get_output(self) -> Optional[Value]:
         for side in Side:
             for _, cell in self.enumerate_side(side):
                 if isinstance(cell, Value):
                     return cell
+        return None
 
-        return self
+    def step(self, neighbors: Neighborhood) -> Cell:
+        digest = self.cache is not None and self.get_digest()
+
+        if digest is False:
+            chip = self
+
+            # The chip itself may be referenced by a snapshot as well
+            if not self.owns_board:
+                chip = copy.copy(self)
+                chip.board = self.board.copy()
+                chip.shared = False
+                chip.copied = Chip.snapshots
+
+            chip.feed(neighbors)
+            chip.board.step()
+            output = chip.get_output()
+            return chip if output is None else output
+
+        # The board is deterministic up to the choices between several values,
+        # so the key identifies the next board as well, unless the board drew
+        # some, in which case the seed, step and scope of the draws are part
+        # of the key of its entry
+        key = digest, freeze(tuple(self.get_inputs(neighbors)))
+        entry = self.cache.get(key)
+        drawing = entry is DRAWING
+
+        if drawing:
+            # Enclosing boards depend on the draws as well
+            draws.drawn += 1
+            key = key, draws.seed, draws.step, draws.nested_scope()
+            entry = self.cache.get(key)
+
+        if entry is None:
+            chip = copy.copy(self)
+            chip.board = self.board.copy()
+            chip.feed(neighbors)
+            drawn = draws.drawn
+            chip.board.step()
+            output = chip.get_output()
+            # The next board is hashed by content, so that a board which
+            # stopped changing keeps its key
+            entry = chip.board, output, None if output is not None else chip.board.digest()
+            if draws.drawn != drawn and not drawing:
+                self.cache[key] = DRAWING
+                key = key, draws.seed, draws.step, draws.nested_scope()
+            self.cache[key] = entry
+
+        board, output, next_digest = entry
+
+        if output is not None:
+            return output
+        if board is self.board:
+            return self
+
+        chip = copy.copy(self)
+        chip.board = board
+        chip.digest = next_digest
+        chip.shared = True
+        return chip
 
     def debug(self):
         d = super().debug()
         return d
 
 
+def clear_caches():
+    """
+    Forgets the memoized boards of chips and resets the statistics of the
+    caches, which each evaluation starts with
+    """
+
+    Chip.clear_cache()
+    for key in Processor.counts:
+        Processor.counts[key] = 0
+
+
+def cache_statistics() -> Dict[str, Dict[str, int]]:
+    """
+    Statistics of the caches used to step cells in this process since the
+    evaluation started
+    """
+
+    result = {}
+    if Chip.cache is not None and Chip.cache.hits + Chip.cache.misses:
+        result['chip_cache'] = Chip.cache.info()
+    counts = Processor.counts
+    if any(counts.values()):
+        result['outputs'] = dict(counts, saved=counts['reused'] + counts['skipped'])
+    return result
+
+
+def load_module(data: bytes) -> Tuple['Program', Union[int, bool]]:
+    board = Program.loads(data)
+    return board, Chip(board=board).get_digest()
+
+
 class Import(Chip):
     __slots__ = ['direction', 'board', 'path']
 
-    texture = RotatableTexture.load('file')
+    # Boards of the imported files along with their digest, shared by every
+    # import of a file
+    modules = FileCache(load_module)
 
     def __init__(self, path: Path, direction: Direction = Direction.N):
-        super().__init__(direction, Program.load(path))
+        board, digest = self.modules.load(path)
+        super().__init__(direction, board)
+        self.digest = digest
+        self.shared = True
         self.path = path
 
     def info(self) -> str:
@@ -623,15 +901,47 @@ class Import(Chip):
 
 
 class List_(Value):
-    __slots__ = ['values']
+    __slots__ = ['values', 'hash']
 
-    texture = SimpleTexture.load('list')
-    
-    def __init__(self, values: List[Value] = ()):
-        self.values = list(values)
+    # The values are a persistent vector which is never modified, so lists
+    # share them with the lists they were appended to or popped from
+    def __init__(self, values: Iterable[Value] = ()):
+        self.values = values if isinstance(values, Vector) else Vector(values)
+        self.hash = None
+
+    @staticmethod
+    def of(values: Iterable[Value]) -> 'List_':
+        """
+        List of the values, canonical if it is short enough
+        """
+
+        lst = List_(values)
+        if len(lst.values) > INTERN_LIST_LENGTH:
+            return lst
+        return intern(lst, lambda: lst)
 
     def __eq__(self, other):
-        return isinstance(other, List_) and all(x == y for x, y in zip(self.values, other.values))
+        if self is other:
+            return True
+        if not isinstance(other, List_) or len(self.values) != len(other.values):
+            return False
+        if self.values is other.values:
+            return True
+        if self.hash is not None and other.hash is not None and self.hash != other.hash:
+            return False
+        return all(x == y for x, y in zip(self.values, other.values))
+
+    def __hash__(self):
+        if self.hash is None:
+            self.hash = hash(freeze(self.values))
+        return self.hash
+
+    def __getstate__(self):
+        return {'values': self.values}
+
+    def __setstate__(self, state):
+        self.hash = None
+        super().__setstate__(state)
 
     @classmethod
     def name(cls) -> str:
@@ -646,18 +956,10 @@ class List_(Value):
             'values': [value.debug() for value in self.values]
         }
 
-    def copy(self) -> 'List':
-        return copy.deepcopy(self)
-
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        self.texture.draw(surface, opacity)
-
 
 class Append(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    texture = RotatableTexture.load('append')
-
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
             direction,
@@ -666,18 +968,15 @@ class Append(Processor):
         )
 
     def process(self, inputs: Dict[Side, Cell]) -> Dict[Side, Cell]:
-        lst = inputs[Side.BACK].copy()
-        lst.values.append(inputs[Side.LEFT])
+        lst = inputs[Side.BACK]
         return {
-            Side.FRONT: lst
+            Side.FRONT: List_.of(lst.values.append(inputs[Side.LEFT]))
         }
 
 
 class Pop(Processor):
     __slots__ = ['direction', 'inputs', 'outputs', 'arguments', 'fired']
 
-    texture = RotatableTexture.load('pop')
-
     def __init__(self, direction: Direction = Direction.N):
         super().__init__(
             direction,
@@ -686,10 +985,9 @@ class Pop(Processor):
         )
 
     def process(self, inputs: Dict[Side, Cell]) -> Dict[Side, Cell]:
-        lst = inputs[Side.BACK].copy()
-        x = lst.values.pop(0)
+        x, values = inputs[Side.BACK].values.popleft()
         return {
-            Side.FRONT: lst,
+            Side.FRONT: List_.of(values),
             Side.LEFT: x
         }
 
@@ -697,13 +995,12 @@ class Pop(Processor):
 class Mu(Cell):
     __slots__ = ['program']
 
-    texture = SimpleTexture.load('mu')
-
     def __init__(self, program: 'Program' = None):
-        self.program = Program.empty(16, 16) if program is None else program.copy()
+        self.program = Program.empty(BOARD_SIZE, BOARD_SIZE) if program is None else program.copy()
 
     def step(self, neighbors: Neighborhood):
         return self
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
-        self.texture.draw(surface)
+
+from ton.program import *
+
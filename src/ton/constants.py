@@ -10,5 +10,27 @@ SCREEN_SIZE = SCREEN_WIDTH, SCREEN_HEIGHT = 512 + CELL_SIZE, 512
 
 CURSOR_OPACITY = .2
 
+# Size of new programs and of the boards of new chips
+BOARD_SIZE = 16
+
+# Width and height of the chunks of sparse programs
+CHUNK_SIZE = 16
+
+# Maximum number of canonical values kept, and length of the longest lists
+# which are interned
+INTERN_SIZE = 4096
+INTERN_LIST_LENGTH = 8
+
+# Maximum number of rotated, faded or labelled textures kept for drawing
+ATLAS_SIZE = 4096
+
+BACKGROUND_COLOR = (50, 50, 50)
+
+# Profiler overlay of the editor: font size, seconds between its updates and
+# number of steps it sums
+PROFILE_FONT_SIZE = 12
+PROFILE_INTERVAL = .5
+PROFILE_STEPS = 64
+
 PROJECT_DIR = Path(__file__).parent
 ASSETS_DIR = PROJECT_DIR / 'assets'
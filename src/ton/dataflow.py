@@ -0,0 +1,248 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Net', 'Dataflow']
+
+import numpy as np
+
+from collections import deque
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.neighborhood import *
+from ton.type import *
+
+
+# Cells whose behavior the dataflow graph models
+SUPPORTED = (Empty, Wire, Anchor, Value, Processor)
+
+# Cells that keep a wire from decaying
+CONNECTIONS = (Link, Processor, Anchor, Chip)
+
+
+class Net:
+    """
+    Connected wires, carrying at most one value which floods every one of
+    its cells
+    """
+
+    __slots__ = ['cells', 'sources', 'sinks']
+
+    def __init__(self):
+        self.cells: Set[Tuple[int, int]] = set()
+        # Positions of the values or (processor position, output side) feeding the net
+        self.sources: Set[Union[Tuple[int, int], Tuple[Tuple[int, int], Side]]] = set()
+        # Processor positions and input sides facing a cell of the net
+        self.sinks: Set[Tuple[Tuple[int, int], Side]] = set()
+
+
+class Dataflow:
+    """
+    Program compiled into a dataflow graph, in which wires are collapsed into
+    nets so that a value reaches the end of a wire in a single operation
+
+    Evaluating the graph yields the state the program settles in, as long as
+    every net is fed by a single source, which is checked when compiling, and
+    values travel along wires faster than unused wires decay.
+    """
+
+    def __init__(self,
+                 program: Program,
+                 occupied: Dict[Tuple[int, int], Cell],
+                 nets: List[Net],
+                 net_of: Dict[Tuple[int, int], int]):
+        self.program = program
+        self.occupied = occupied
+        self.nets = nets
+        self.net_of = net_of
+
+    @staticmethod
+    def compile(program: Program) -> 'Dataflow':
+        cells = program.cells
+        occupied = {
+            pos: cell for pos, cell in np.ndenumerate(cells)
+            if not isinstance(cell, Empty)
+        }
+        nets = []
+        net_of = {}
+
+        for pos, cell in occupied.items():
+            if not isinstance(cell, SUPPORTED) or isinstance(cell, Tube):
+                raise ValueError(f"{type(cell).__name__} at {pos} cannot be compiled")
+
+            if isinstance(cell, Wire) and pos not in net_of:
+                net = Net()
+                pending = [pos]
+                net_of[pos] = len(nets)
+
+                while pending:
+                    x, y = current = pending.pop()
+                    net.cells.add(current)
+
+                    for _, neighbor in Neighborhood.around(x, y):
+                        if program.in_bounds(*neighbor) \
+                                and isinstance(cells[neighbor], Wire) \
+                                and neighbor not in net_of:
+                            net_of[neighbor] = len(nets)
+                            pending.append(neighbor)
+
+                nets.append(net)
+
+        for pos, cell in occupied.items():
+            for direction, neighbor in Neighborhood.around(*pos):
+                if neighbor not in net_of:
+                    continue
+
+                net = nets[net_of[neighbor]]
+
+                if isinstance(cell, Value):
+                    net.sources.add(pos)
+                elif isinstance(cell, Processor):
+                    side = cell.get_direction_side(direction)
+                    if side in cell.outputs:
+                        net.sources.add((pos, side))
+                    if side in cell.inputs:
+                        net.sinks.add((pos, side))
+
+        for i, net in enumerate(nets):
+            if len(net.sources) > 1:
+                x, y = min(net.cells)
+                raise ValueError(f"wire at {(x, y)} is fed by {len(net.sources)} sources")
+
+        return Dataflow(program, occupied, nets, net_of)
+
+    def evaluate(self) -> Program:
+        """
+        Propagates the values through the graph, firing processors in
+        topological order, and returns the state the program settles in
+        """
+
+        processors = {
+            pos: cell for pos, cell in self.occupied.items()
+            if isinstance(cell, Processor)
+        }
+        arguments = {pos: dict(processor.arguments) for pos, processor in processors.items()}
+        fired = set()
+        carried: Dict[int, Optional[Value]] = {}
+        removed = set()
+        ready = deque(pos for pos, processor in processors.items() if self.is_fed(processor, arguments[pos]))
+
+        def offer(pos: Tuple[int, int], side: Side, value: Value):
+            processor = processors[pos]
+            if pos not in fired and isinstance(value, processor.inputs[side]):
+                arguments[pos][side] = value
+                if self.is_fed(processor, arguments[pos]):
+                    ready.append(pos)
+
+        def deliver(net: int, value: Cell, entry: Tuple[int, int]):
+            if not isinstance(value, Value):
+                # The wire pulling an empty output is cleared and the rest of
+                # the net is left to decay
+                removed.add(entry)
+                return
+
+            carried[net] = value
+            for pos, side in self.nets[net].sinks:
+                offer(pos, side, value)
+
+        for pos, cell in self.occupied.items():
+            if isinstance(cell, Value):
+                for direction, neighbor in Neighborhood.around(*pos):
+                    if neighbor in self.net_of:
+                        deliver(self.net_of[neighbor], cell, neighbor)
+                    elif neighbor in processors:
+                        side = processors[neighbor].get_direction_side(direction.opposite())
+                        if side in processors[neighbor].inputs:
+                            offer(neighbor, side, cell)
+
+        while ready:
+            pos = ready.popleft()
+            processor = processors[pos]
+
+            if pos in fired:
+                continue
+
+            targets = []
+            for direction, neighbor in Neighborhood.around(*pos):
+                side = processor.get_direction_side(direction)
+                if side in processor.outputs and neighbor in self.net_of and neighbor not in removed:
+                    net = self.net_of[neighbor]
+                    if net not in carried:
+                        targets.append((side, net, neighbor))
+
+            if not targets:
+                continue
+
+            fired.add(pos)
+            outputs = processor.process(arguments[pos])
+            for side, net, entry in targets:
+                deliver(net, outputs[side], entry)
+
+        return self.settle(processors, arguments, fired, carried, removed)
+
+    @staticmethod
+    def is_fed(processor: Processor, arguments: Dict[Side, Cell]) -> bool:
+        return all(
+            isinstance(arguments.get(side), type_)
+            for side, type_ in processor.inputs.items()
+        )
+
+    def settle(self, processors, arguments, fired, carried, removed) -> Program:
+        program = self.program
+        cells = Program.empty(*program.size).cells
+
+        for pos, processor in processors.items():
+            if pos not in fired:
+                processor = processor.copy()
+                processor.arguments = arguments[pos]
+                processor.fired = False
+                cells[pos] = processor
+
+        waiting = {
+            pos for pos, processor in processors.items()
+            if pos not in fired and not self.is_fed(processor, arguments[pos])
+        }
+
+        def holds(pos: Tuple[int, int]) -> bool:
+            # Values only stay next to an anchor or a processor waiting for its arguments
+            for _, neighbor in Neighborhood.around(*pos):
+                if neighbor in waiting or isinstance(self.occupied.get(neighbor), Anchor):
+                    return True
+            return False
+
+        for pos, cell in self.occupied.items():
+            if isinstance(cell, Anchor):
+                cells[pos] = cell
+            elif isinstance(cell, Value) and holds(pos):
+                cells[pos] = cell
+
+        for i, net in enumerate(self.nets):
+            if i in carried:
+                for pos in net.cells:
+                    if holds(pos):
+                        cells[pos] = carried[i]
+            else:
+                for pos in net.cells - removed:
+                    cells[pos] = Wire()
+
+        # Unused wires decay from their loose ends
+        pending = [pos for pos in self.net_of if isinstance(cells[pos], Wire)]
+        while pending:
+            x, y = pos = pending.pop()
+            if not isinstance(cells[pos], Wire):
+                continue
+
+            connections = 0
+            for _, neighbor in Neighborhood.around(x, y):
+                if not program.in_bounds(*neighbor) or isinstance(cells[neighbor], CONNECTIONS):
+                    connections += 1
+
+            if connections < 2:
+                cells[pos] = Empty()
+                pending.extend(
+                    neighbor for _, neighbor in Neighborhood.around(x, y)
+                    if neighbor in self.net_of
+                )
+
+        return Program(cells)
@@ -15,11 +15,18 @@ from ton.cell import *
 from ton.program import *
 from ton.neighborhood import *
 from ton.texture import *
+from ton.render import *
+from ton.simulation import *
+from ton.profiler import *
 from ton.utils import *
 from ton.type import *
 from ton.constants import *
 
 
+# Identity of every cell of a grid, to find the cells which were replaced
+identities = np.frompyfunc(id, 1, 1)
+
+
 def make_import(path: Path):
     class ImportedFile(Import):
         def __init__(self, direction: Direction = Direction.N):
@@ -84,12 +91,17 @@ class Toolbar:
     def update(self, dt: float):
         self.selected_name_timer = max(self.selected_name_timer - dt, 0)
 
-    def draw(self, surface: pg.Surface):
+    def draw(self, surface: pg.Surface) -> List[pg.Rect]:
+        """
+        Draws the toolbar and returns the rectangles it covers
+        """
+
+        rects = [surface.fill((0, 0, 0), pg.Rect((0, 0), (CELL_SIZE, surface.get_height())))]
         visible_layout = self.layout[self.offset:self.offset+self.height]
 
         for i, cell_type in enumerate(visible_layout):
             rect = pg.Rect((0, CELL_SIZE * i), (CELL_SIZE, CELL_SIZE))
-            cell_type.draw_icon(surface.subsurface(rect))
+            draw_icon(cell_type, surface.subsurface(rect))
 
             if self.offset + i == self.selected:
                 Cursor.texture.draw(surface.subsurface(rect))
@@ -98,12 +110,16 @@ class Toolbar:
             cell_name = self.font.render(self.cell_type.name(), True, (255, 255, 255), None)
             # def blit_alpha(target, source, location, opacity):
             timer = self.selected_name_cooldown - self.selected_name_timer
+            location = (CELL_SIZE + 8, (self.selected - self.offset) * CELL_SIZE + round(CELL_SIZE / 2 - cell_name.get_height() / 2))
             blit_alpha(
                 surface,
                 cell_name,
-                (CELL_SIZE + 8, (self.selected - self.offset) * CELL_SIZE + round(CELL_SIZE / 2 - cell_name.get_height() / 2)),
+                location,
                 1 - (timer/self.selected_name_cooldown)**(1/self.selected_name_fadeout)
             )
+            rects.append(pg.Rect(location, cell_name.get_size()))
+
+        return rects
 
 
 class CursorMode(IntEnum):
@@ -134,34 +150,87 @@ class Cursor(Drawable):
     def get_rect(self) -> pg.Rect:
         return to_rect(*self.pos)
 
-    def draw(self, surface: pg.Surface, neighbors: Neighborhood, cell_type: Type[Cell], pointed: Cell):
-        square = surface.subsurface(self.get_rect())
+    def draw(self, surface: pg.Surface, neighbors: Neighborhood, cell_type: Type[Cell], pointed: Cell) -> List[pg.Rect]:
+        """
+        Draws the cursor and returns the rectangles it covers
+        """
+
+        rects = [self.get_rect()]
+        square = surface.subsurface(rects[0])
 
         if self.mode in (CursorMode.NONE, CursorMode.CREATE):
-            cell_type().draw(square, neighbors, opacity=.2)
+            draw_cell(cell_type(), square, neighbors, opacity=.2)
             
         self.texture.draw(square)
 
         if self.mode == CursorMode.INFO:
             info = self.font.render(pointed.info(), True, (255, 255, 255), (0, 0, 0))
-            surface.blit(info, (CELL_SIZE * (self.x + 1) + round(CELL_SIZE / 8), CELL_SIZE * self.y + round(CELL_SIZE / 2 - info.get_height() / 2)))
+            rects.append(surface.blit(info, (CELL_SIZE * (self.x + 1) + round(CELL_SIZE / 8), CELL_SIZE * self.y + round(CELL_SIZE / 2 - info.get_height() / 2))))
+
+        return rects
 
 
 class Editor:
     def __init__(self, path: Path, window: pg.Surface):
         self.path = path
-        self.program = Program.load(path)
+        clear_caches()
+        self.simulation = Simulation(Program.load(path))
         self.nesting = []
         self.intermediate = None
         self.cursor = Cursor(0, 0)
         self.toolbar = Toolbar(height=16)
         self.clock = pg.time.Clock()
-        self.timer = 0
-        self.steps_per_second = 10
-        self.evaluating = False
         self.running = False
         self.window = window
 
+        # Board as it was last drawn to the back buffer, the tiles edited in
+        # place since, and whether cells may have been replaced since
+        self.buffer = None
+        self.drawn_board = None
+        self.drawn_cells = None
+        self.drawn_identities = None
+        self.touched = set()
+        self.stale = True
+
+        # State and rectangles of the cursor and toolbar drawn over the board
+        self.overlay = None
+        self.overlay_rects = []
+
+        # Profiler shown over the board, and the lines it last displayed
+        self.profiler = None
+        self.profile_lines = []
+        self.profile_timer = 0.
+        self.profile_drawn = 0.
+
+    @property
+    def program(self) -> Program:
+        return self.simulation.program
+
+    @program.setter
+    def program(self, program: Program):
+        # Boards memoized while editing the previous program are not reused
+        clear_caches()
+        self.simulation.program = program
+
+    @property
+    def evaluating(self) -> bool:
+        return self.simulation.running
+
+    def set_speed(self, steps_per_second: float):
+        self.simulation.control(steps_per_second=max(1, steps_per_second))
+        self.update_caption()
+
+    def set_steps_per_frame(self, steps_per_frame: int):
+        self.simulation.control(steps_per_frame=max(1, steps_per_frame))
+        self.update_caption()
+
+    def update_caption(self):
+        simulation = self.simulation
+        speed = 'fast-forward' if simulation.fast else f'{simulation.steps_per_second:g} steps/s'
+        if simulation.steps_per_frame > 1:
+            speed += f' × {simulation.steps_per_frame}'
+        pg.display.set_caption(f"ton — {str(self.path)} ({speed})")
+
     def _get_toolbar_rect(self) -> pg.Rect:
         return pg.Rect((0, 0), (CELL_SIZE, SCREEN_HEIGHT))
 
@@ -175,7 +244,22 @@ class Editor:
             elif self.cursor.mode == CursorMode.DELETE:
                 self.pointed = Empty()
 
+    def touch(self, x: int, y: int):
+        """
+        Marks a tile to be redrawn after its cell was edited in place
+        """
+
+        self.touched.add((x, y))
+        self.stale = True
+
     def handle(self, event: 'pg.Event'):
+        self.stale = True
+
+        # The simulation must not step the program while it is edited
+        with self.simulation.lock:
+            self.handle_locked(event)
+
+    def handle_locked(self, event: 'pg.Event'):
         if event.type == pg.KEYDOWN:
             if (event.key == pg.K_q and event.mod & pg.KMOD_CTRL):
                 self.quit()
@@ -184,24 +268,39 @@ class Editor:
             elif event.key == pg.K_l and event.mod & pg.KMOD_CTRL:
                 self.program = Program.empty(*self.program.size)
             elif event.key == pg.K_r and event.mod & pg.KMOD_CTRL:
+                self.simulation.pause()
                 self.program = Program.load(self.path)
-                self.evaluating = False
                 self.nesting = []
+            elif event.key == pg.K_SPACE and self.nesting:
+                self.editable_board().step()
             elif event.key == pg.K_SPACE:
-                self.board.step()
+                self.simulation.step()
             elif event.key == pg.K_RETURN:
-                self.evaluating = not self.evaluating
+                self.simulation.toggle()
+            elif event.key == pg.K_f:
+                self.simulation.fast_forward(not self.simulation.fast)
+                self.update_caption()
+            elif event.key in (pg.K_PLUS, pg.K_EQUALS, pg.K_KP_PLUS):
+                self.set_speed(self.simulation.steps_per_second * 2)
+            elif event.key in (pg.K_MINUS, pg.K_KP_MINUS):
+                self.set_speed(self.simulation.steps_per_second / 2)
+            elif event.key in (pg.K_RIGHTBRACKET, pg.K_KP_MULTIPLY):
+                self.set_steps_per_frame(self.simulation.steps_per_frame * 2)
+            elif event.key in (pg.K_LEFTBRACKET, pg.K_KP_DIVIDE):
+                self.set_steps_per_frame(self.simulation.steps_per_frame // 2)
             elif event.key == pg.K_s:
                 self.cursor.mode = CursorMode.SET
+            elif event.key == pg.K_p:
+                self.toggle_profiler()
             elif event.key == pg.K_m and type(self.pointed) is Chip:
                 p = self.pointed.copy()
-                self.toolbar.layout.append(lambda: p)
+                self.toolbar.layout.append(p.copy)
             elif event.key == pg.K_d:
                 print(json.dumps(self.pointed.debug(), indent=4))
             elif event.key == pg.K_i:
                 self.cursor.mode = CursorMode.INFO
             elif event.key == pg.K_TAB and type(self.pointed) is Chip:
-                self.nesting.append(self.pointed.board)
+                self.nesting.append(self.cursor.pos)
             elif event.key == pg.K_ESCAPE and event.mod & pg.KMOD_SHIFT:
                 self.nesting = []
             elif event.key == pg.K_ESCAPE and self.nesting:
@@ -224,13 +323,17 @@ class Editor:
                 self.cursor.mode = CursorMode.DELETE
             elif event.button == 4:
                 if self.cursor.mode == CursorMode.SET:
+                    self.edit_pointed()
                     self.pointed.previous_state()
+                    self.touch(*self.cursor.pos)
                 else:
                     self.toolbar.scroll(-1)
 
             elif event.button == 5:
                 if self.cursor.mode == CursorMode.SET:
+                    self.edit_pointed()
                     self.pointed.next_state()
+                    self.touch(*self.cursor.pos)
                 else:
                     self.toolbar.scroll(1)
 
@@ -241,51 +344,242 @@ class Editor:
             if event.button in (1, 3):
                 self.cursor.mode = CursorMode.NONE
 
+    def edit_pointed(self):
+        """
+        Replaces the pointed value or processor by a copy before its state is
+        changed, since they may be shared by several cells
+        """
+
+        board = self.editable_board()
+        cell = board.cells[self.cursor.pos]
+
+        if isinstance(cell, (Value, Processor)):
+            board.cells[self.cursor.pos] = cell.copy()
+
     @property
     def pointed(self) -> Cell:
         return self.board.cells[self.cursor.pos]
 
     @pointed.setter
     def pointed(self, cell: Cell):
-        self.board.cells[self.cursor.pos] = cell
+        self.editable_board().cells[self.cursor.pos] = cell
 
     @property
     def board(self) -> Program:
-        if self.nesting:
-            return self.nesting[-1]
+        """
+        Board of the chip being edited, or the program itself, which may be
+        shared by other chips and must only be read
+        """
+
+        board = self.program
+
+        for pos in self.nesting:
+            chip = board.cells[pos]
+            if not isinstance(chip, Chip):
+                break
+            board = chip.board
+
+        return board
+
+    def editable_board(self) -> Program:
+        """
+        Board of the chip being edited, or the program itself, to be called
+        before writing to it: the chips leading to it are detached from the
+        boards they share first, so that the edits do not reach other chips
+        """
+
+        board = self.program
+
+        for depth, pos in enumerate(self.nesting):
+            chip = board.cells[pos]
+
+            if not isinstance(chip, Chip):
+                del self.nesting[depth:]
+                break
+
+            if not chip.owns_board or type(chip.digest) is int:
+                chip = board.cells[pos] = chip.detach()
+
+            board = chip.board
+
+        return board
+
+    @property
+    def view(self) -> Program:
+        """
+        Board to draw, taken from the last snapshot while the simulation runs
+        so that it is never drawn while being stepped
+        """
+
+        if not self.simulation.running:
+            return self.board
+
+        board = self.simulation.snapshot.program
+
+        for pos in self.nesting:
+            if not isinstance(board.cells[pos], Chip):
+                break
+            board = board.cells[pos].board
+
+        return board
+
+    def toggle_profiler(self):
+        if self.profiler is None:
+            self.profiler = Profiler(history=PROFILE_STEPS)
+            self.profiler.install()
+            self.profile_timer = 0.
+            self.profile_drawn = 0.
+            self.profile_lines = ['profiling...']
         else:
-            return self.program
+            self.profiler.uninstall()
+            self.profiler = None
+            self.profile_lines = []
+
+    def update_profile(self, dt: float):
+        self.profile_timer += dt
+        if self.profile_timer < PROFILE_INTERVAL:
+            return
+
+        summary = self.profiler.summary(PROFILE_STEPS)
+        steps = max(summary['steps'], 1)
+        drawn = sum(stats.seconds for stats in self.profiler.draws.values())
+
+        lines = [
+            f"{summary['steps']} steps, {summary['seconds'] / steps * 1000:.2f} ms/step, "
+            f"drawing {(drawn - self.profile_drawn) / self.profile_timer * 1000:.1f} ms/s"
+        ]
+        for name, stats in list(summary['cells'].items())[:6]:
+            lines.append(
+                f"{name}: {stats['calls'] / steps:.0f} calls, "
+                f"{stats['seconds'] / steps * 1000:.3f} ms, "
+                f"{stats['allocations'] / steps:.1f} new per step"
+            )
+        for name, stats in summary['processes'].items():
+            lines.append(f"{name}.process: {stats['calls'] / steps:.1f} calls per step")
+
+        self.profile_lines = lines
+        self.profile_timer = 0.
+        self.profile_drawn = drawn
 
     def update(self, dt: float):
         self.toolbar.update(dt)
-        
-        if self.evaluating:
-            self.timer += dt
-
-            if self.timer > 1 / self.steps_per_second:
-                self.timer = 0
-                self.program.step()
 
-    def draw(self):
+        if self.profiler is not None:
+            with self.simulation.lock:
+                self.update_profile(dt)
+
+    def redraw_board(self, board: Program) -> List[pg.Rect]:
+        """
+        Redraws the tiles which changed since the last frame to the back
+        buffer, along with their neighbors whose links may have changed, and
+        returns their rectangles on the window
+        """
+
+        if self.buffer is None:
+            w, h = self.window.get_size()
+            self.buffer = pg.Surface((w - CELL_SIZE, h)).convert()
+
+        # Boards of the same size, such as the snapshots of a simulation, are
+        # compared cell by cell
+        if board is not self.drawn_board:
+            self.stale = True
+
+        if self.drawn_board is None or board.cells.shape != self.drawn_cells.shape:
+            self.buffer.fill(BACKGROUND_COLOR)
+            draw_program(board, self.buffer)
+            rects = [self.buffer.get_rect()]
+        elif self.stale:
+            tiles = set(self.touched)
+            changed = np.nonzero(identities(board.cells) != self.drawn_identities)
+            tiles.update((int(x), int(y)) for x, y in zip(*changed))
+
+            for x, y in list(tiles):
+                tiles.update(pos for _, pos in Neighborhood.around(x, y))
+
+            rects = []
+
+            for x, y in tiles:
+                if board.in_bounds(x, y):
+                    rect = self.buffer.fill(BACKGROUND_COLOR, to_rect(x, y))
+                    draw_cell(board.cells[x, y], self.buffer.subsurface(rect), board.get_neighbors(x, y))
+                    rects.append(rect)
+        else:
+            return []
+
+        self.drawn_board = board
+        self.drawn_cells = board.cells.copy()
+        self.drawn_identities = identities(self.drawn_cells)
+        self.touched.clear()
+        self.stale = False
+
+        return [rect.move(CELL_SIZE, 0) for rect in rects]
+
+    def draw(self) -> List[pg.Rect]:
+        """
+        Draws the tiles which changed since the last frame, then the cursor
+        and toolbar over them, and returns the rectangles of the window which
+        were updated
+        """
+
+        # The board is only drawn from the program itself while the
+        # simulation is paused, and must not be stepped meanwhile
+        if self.simulation.running:
+            return self.draw_board(self.view)
+
+        with self.simulation.lock:
+            return self.draw_board(self.view)
+
+    def draw_board(self, board: Program) -> List[pg.Rect]:
+        rects = self.redraw_board(board)
+        in_bounds = board.in_bounds(*self.cursor.pos)
+        info = None
+
+        if self.cursor.mode == CursorMode.INFO and in_bounds:
+            info = board.cells[self.cursor.pos].info()
+
+        overlay = (
+            self.cursor.pos, self.cursor.mode, self.toolbar.cell_type, info,
+            self.toolbar.selected, self.toolbar.offset, self.toolbar.selected_name_timer,
+            tuple(self.profile_lines)
+        )
+
+        if not rects and overlay == self.overlay:
+            return []
+
+        # The previous cursor and toolbar are erased by drawing the back
+        # buffer over them
         w, h = self.window.get_size()
-        screen = pg.Surface((w - CELL_SIZE, h), pg.SRCALPHA).convert_alpha()
-        screen.fill((50, 50, 50))
-        self.board.draw(screen)
+        area = pg.Rect((CELL_SIZE, 0), (w - CELL_SIZE, h))
+        rects += self.overlay_rects
+
+        for rect in rects:
+            rect = rect.clip(area)
+            self.window.blit(self.buffer, rect, rect.move(-CELL_SIZE, 0))
+
+        screen = self.window.subsurface(area)
+        overlay_rects = []
 
-        if self.board.in_bounds(*self.cursor.pos):
+        if in_bounds:
             if self.cursor.mode in (CursorMode.NONE, CursorMode.CREATE):
                 for direction, (nx, ny) in Neighborhood.around(*self.cursor.pos):
-                    neighbors = self.board.get_neighbors(nx, ny)
-                    neighbors.cells[direction.opposite()] = self.toolbar.cell_type()
-                    if self.board.in_bounds(nx, ny):
-                        self.board.cells[nx, ny].draw(screen.subsurface(to_rect(nx, ny)), neighbors)
+                    neighbors = board.get_neighbors(nx, ny)
+                    neighbors[direction.opposite()] = self.toolbar.cell_type()
+                    if board.in_bounds(nx, ny):
+                        draw_cell(board.cells[nx, ny], screen.subsurface(to_rect(nx, ny)), neighbors)
+                        overlay_rects.append(to_rect(nx, ny))
+
+            overlay_rects += self.cursor.draw(screen, board.get_neighbors(*self.cursor.pos), self.toolbar.cell_type, board.cells[self.cursor.pos])
+
+        if self.profile_lines:
+            overlay_rects.append(draw_panel(screen, self.profile_lines))
 
-            self.cursor.draw(screen, self.board.get_neighbors(*self.cursor.pos), self.toolbar.cell_type, self.pointed)
+        overlay_rects = [rect.move(CELL_SIZE, 0) for rect in overlay_rects]
+        overlay_rects += self.toolbar.draw(self.window)
 
-        self.window.fill((0, 0, 0))
-        self.window.blit(screen, (CELL_SIZE, 0))
+        self.overlay = overlay
+        self.overlay_rects = overlay_rects
 
-        self.toolbar.draw(self.window)
+        return rects + overlay_rects
 
     def quit(self):
         self.running = False
@@ -293,16 +587,23 @@ class Editor:
     def run(self):
         self.running = True
 
-        pg.display.set_caption(f"ton — {str(self.path)}")
+        self.update_caption()
+        self.simulation.start()
 
-        while self.running:
-            dt = self.clock.tick(MAX_FPS) / 1000
+        try:
+            while self.running:
+                dt = self.clock.tick(MAX_FPS) / 1000
 
-            for event in pg.event.get():
-                self.handle(event)
+                for event in pg.event.get():
+                    self.handle(event)
 
-            self.update(dt)
-            self.draw()
+                self.update(dt)
+                rects = self.draw()
 
-            pg.display.update()
+                if rects:
+                    pg.display.update(rects)
+        finally:
+            self.simulation.stop()
 
+            if self.profiler is not None:
+                self.profiler.uninstall()
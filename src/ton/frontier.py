@@ -0,0 +1,118 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Frontier']
+
+import copy
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.neighborhood import *
+from ton.rng import draws
+
+
+def snapshot(cell: Cell) -> Tuple[type, Any]:
+    # Cells which are always active may be stepped in place, so the slots are
+    # copied to be compared afterwards, and boards of chips, which are not
+    # comparable, by the hash of their content
+    if isinstance(cell, Chip):
+        return type(cell), cell.direction, cell.digest or cell.board.digest()
+    return type(cell), {slot: copy.copy(value) for slot, value in cell.__getstate__().items()}
+
+
+class Frontier:
+    """
+    Steps a program by only evaluating the cells that changed during the
+    previous step, their neighbors and the cells that are always active
+
+    Empty cells never change and are not stepped. Since cells only read the
+    state of their neighbors before the step, the other cells can be stepped
+    in any order, and are visited in `Program.all_coords` order so that their
+    effects are applied in the same order as `Program.step` does. Cells
+    edited from outside of the frontier must be reported with `touch`.
+
+    If `columns` is given, only the cells within these columns are stepped,
+    the other ones being left as they are.
+    """
+
+    def __init__(self, program: Program, columns: Optional[range] = None):
+        self.program = program
+        w, h = program.size
+        self.columns = range(w) if columns is None else columns
+        self.rows = range(h)
+        self.active = {
+            pos for pos in program.all_coords()
+            if not isinstance(program.cells[pos], Empty)
+        }
+        self.volatile = {
+            pos for pos in self.active
+            if program.cells[pos].always_active
+        }
+        self.changed = set()
+
+    @property
+    def active_size(self) -> int:
+        return len(self.active | self.volatile)
+
+    def in_region(self, x: int, y: int) -> bool:
+        return x in self.columns and y in self.rows
+
+    def touch(self, x: int, y: int):
+        self.active.add((x, y))
+        self.active.update(pos for _, pos in Neighborhood.around(x, y))
+
+        if self.program.cells[x, y].always_active:
+            self.volatile.add((x, y))
+        else:
+            self.volatile.discard((x, y))
+
+    def step(self):
+        program = self.program
+        next_cells = {}
+        changed = set()
+        effects = []
+
+        with draws.stepping(program), step_outputs.stepping():
+            for x, y in sorted(pos for pos in self.active | self.volatile if self.in_region(*pos)):
+                cell = program.cells[x, y]
+                if isinstance(cell, Empty):
+                    continue
+
+                draws.position = x, y
+
+                before = snapshot(cell) if cell.always_active else None
+                next_cell = cell.step(program.get_neighbors(x, y))
+
+                if type(next_cell) is Outcome:
+                    next_cell, cell_effects = next_cell
+                    effects.append((x, y, cell_effects))
+
+                if before is None:
+                    changed_state = next_cell is not cell
+                else:
+                    changed_state = snapshot(next_cell) != before
+
+                if changed_state:
+                    changed.add((x, y))
+
+                next_cells[x, y] = next_cell
+
+        for pos, cell in next_cells.items():
+            program.cells[pos] = cell
+
+        changed |= commit(program.cells, effects)
+
+        if program.recorder is not None:
+            program.recorder.record(changed)
+
+        self.changed = changed
+        self.active = set(changed)
+
+        for x, y in changed:
+            self.active.update(pos for _, pos in Neighborhood.around(x, y))
+
+            if program.cells[x, y].always_active:
+                self.volatile.add((x, y))
+            else:
+                self.volatile.discard((x, y))
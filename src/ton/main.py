@@ -6,17 +6,33 @@ import fire
 from pathlib import Path
 
 from ton.constants import *
+from ton.cell import *
+from ton.program import *
 
-import pygame as pg
 
-pg.init()
-window = pg.display.set_mode(SCREEN_SIZE)
+def open_editor(path: Path):
+    """
+    Opens the editor window on the given program, pygame is only imported
+    here so that the interpreter can run without a display
+    """
 
-pg.display.set_icon(pg.transform.scale2x(pg.image.load(str(ASSETS_DIR / 'jam.png'))))
-pg.display.set_caption('ton')
+    import pygame as pg
 
-from ton.program import *
-from ton.editor import *
+    pg.init()
+    window = pg.display.set_mode(SCREEN_SIZE)
+
+    pg.display.set_icon(pg.transform.scale2x(pg.image.load(str(ASSETS_DIR / 'jam.png'))))
+    pg.display.set_caption('ton')
+
+    from ton.render import load_textures
+    from ton.editor import Editor
+
+    load_textures()
+
+    editor = Editor(path, window)
+    editor.run()
+
+    pg.quit()
 
 
 class CLI:
@@ -24,39 +40,274 @@ class CLI:
     ton-lang editor and interpreter
     """
 
-    def __init__(self, pwd):
+    def __init__(self, pwd: Path = '.'):
         os.chdir(pwd)
 
-    def edit(path):
+    def edit(self, path: Path):
         """
         Edit a program
         """
 
-        editor = Editor(path, window)
-        editor.run()
+        open_editor(path)
 
-        pg.quit()
-
-    def new(path: Path):
+    def new(self, path: Path, width: int = BOARD_SIZE, height: int = BOARD_SIZE):
         """
         Creates a new empty program
         """
 
-        program = Program.empty(16, 16)
+        program = Program.empty(width, height)
         program.save(path)
-        editor = Editor(path, window)
-        editor.run()
+        open_editor(path)
+
+    def convert(self, path: Path, output: Path = None):
+        """
+        Converts a pickled program to the binary format, in place unless an
+        output path is given
+        """
+
+        from ton.binary import convert
 
-        pg.quit()
+        convert(path, output)
 
-    def run(path: Path, x: int, y: int):
+    def run(self,
+            path: Path,
+            x: int = None,
+            y: int = None,
+            max_steps: int = 10000,
+            max_period: int = 16,
+            compiled: bool = False,
+            trace: Path = None,
+            keyframe_interval: int = 64,
+            gif: Path = None,
+            fps: int = MAX_FPS,
+            processes: int = None,
+            tiles: int = None,
+            profile: Path = None,
+            profile_memory: bool = False,
+            seed: int = 0,
+            sparse: bool = False):
         """
-        Executes a program and returns the final state of the cell
-        at the given position
+        Executes a program until it reaches a fixed point or a short cycle,
+        and returns the final state of the cell at the given position
+
+        With --compiled, the program is evaluated as a dataflow graph instead
+        of being stepped, which only supports programs without tubes or chips.
+        With --trace, every step is recorded to the given file, which can be
+        read with `ton replay`. With --gif, every step is rendered to the given
+        animated GIF, or animated PNG if it ends with .png, without opening a
+        window. With --tiles, the columns of the program are split in up to
+        the given number of stripes, stepped in parallel by as many processes.
+        With --profile, the calls and time spent stepping each class of cell
+        in this process are saved to the given JSON file, along with the
+        memory they allocated if --profile-memory is set. The choices between
+        several values are drawn from --seed, so runs with the same seed give
+        the same result whichever engine evaluates them. With --sparse, the
+        program is loaded straight into chunks on an unbounded board, only
+        the chunks holding cells being stepped, so cells at the edges of the
+        file are no longer connected to them.
+
+        --compiled, --tiles, --gif, --trace and --sparse each evaluate the
+        program their own way, so at most one of them can be given, and
+        --profile cannot be combined with --tiles.
         """
 
-        program = Program.load(path)
-        return program.get_cell(x, y)
+        modes = [
+            option for option, given in (
+                ('--compiled', compiled),
+                ('--tiles', tiles is not None),
+                ('--gif', gif is not None),
+                ('--trace', trace is not None),
+                ('--sparse', sparse)
+            )
+            if given
+        ]
+
+        if len(modes) > 1:
+            raise ValueError(f"{' and '.join(modes)} cannot be combined")
+        if processes is not None and gif is None:
+            raise ValueError("--processes only applies to --gif, use --tiles to step in parallel")
+        if profile is not None and tiles is not None:
+            raise ValueError("--profile cannot be combined with --tiles, whose workers are not profiled")
+
+        if profile is not None:
+            import json
+            from ton.profiler import Profiler
+
+            with Profiler(profile_memory) as profiler:
+                result = self.run(
+                    path, x, y, max_steps, max_period, compiled, trace,
+                    keyframe_interval, gif, fps, processes, tiles, seed=seed, sparse=sparse
+                )
+
+            Path(profile).write_text(json.dumps(profiler.report(), indent=2))
+            result['profile'] = profiler.summary()
+            return result
+
+        if sparse:
+            from ton.sparse import SparseProgram
+            program = SparseProgram.load(path)
+        else:
+            program = Program.load(path)
+        program.seed = seed
+        # The statistics of the caches only count the steps of this run
+        clear_caches()
+
+        if compiled:
+            from ton.dataflow import Dataflow
+            program = Dataflow.compile(program).evaluate()
+            result = {'stable': True}
+        else:
+            if tiles is not None:
+                from ton.tiled import TiledEngine
+                with TiledEngine(program, tiles) as engine:
+                    evaluation = engine.run_until_stable(max_steps, max_period)
+                    statistics = engine.statistics()
+                program = evaluation.program
+            elif gif is not None:
+                from ton.animation import render_animation
+                evaluation = render_animation(program, gif, max_steps, max_period, fps, processes)
+            elif sparse:
+                evaluation = program.run_until_stable(max_steps, max_period)
+            elif trace is not None:
+                from ton.trace import TraceRecorder
+                with TraceRecorder(trace, program, keyframe_interval):
+                    evaluation = program.run_until_stable(max_steps, max_period)
+            else:
+                evaluation = program.run_until_stable(max_steps, max_period)
+
+            if tiles is None:
+                statistics = cache_statistics()
+
+            result = {
+                'steps': evaluation.steps,
+                'stable': evaluation.stable,
+                'period': evaluation.period
+            }
+
+            result.update(statistics)
+
+        if x is not None and y is not None:
+            result['cell'] = program.cells[x, y].debug()
+
+        return result
+
+    def batch(self,
+              path: Path,
+              rows: Path,
+              inputs: dict,
+              outputs: dict,
+              output: Path = None,
+              max_steps: int = 10000,
+              max_period: int = 16,
+              processes: int = None,
+              ordered: bool = False):
+        """
+        Runs a program once per row of a JSONL or CSV file, placing the values
+        of the row at the given input positions, and writes the values at the
+        given output positions as JSONL, as the runs finish
+
+        Inputs and outputs map names to positions, e.g. --inputs
+        '{"a": [3, 11], "b": "12,11"}'.
+        """
+
+        import sys
+        import json
+        from ton.batch import read_rows, run_batch
+
+        file = sys.stdout if output is None else open(output, 'w')
+
+        try:
+            for result in run_batch(path, read_rows(rows), inputs, outputs, max_steps, max_period, processes, ordered):
+                file.write(json.dumps(result, default=str) + '\n')
+                file.flush()
+        finally:
+            if output is not None:
+                file.close()
+
+    def bench(self,
+              output: Path = None,
+              baseline: Path = None,
+              sizes: tuple = (16, 32, 64),
+              steps: int = 32,
+              workloads: tuple = None,
+              frames: int = 10,
+              render: bool = True,
+              tolerance: float = .1):
+        """
+        Measures the steps per second, cell updates per second and peak memory
+        of both engines, and the frames per second of the renderer, on the
+        examples and on synthetic programs of the given sizes
+
+        The results are saved as JSON to the given output. With --baseline,
+        they are compared to previously saved results, exiting with an error if
+        any metric is worse by more than the tolerance.
+        """
+
+        import sys
+        import json
+        from ton.bench import run_bench, compare, environment
+
+        if isinstance(sizes, int):
+            sizes = sizes,
+        if isinstance(workloads, str):
+            workloads = workloads.split(',')
+
+        print(f"{'workload':<16}{'size':>8}{'engine':>10}{'steps/s':>10}{'updates/s':>12}{'peak KiB':>10}{'fps':>8}")
+
+        results = []
+        for result in run_bench(sizes, steps, workloads, frames, render):
+            results.append(result)
+            size = 'x'.join(map(str, result['size']))
+            fps = result['render_fps']
+
+            for engine, values in result['engines'].items():
+                print(
+                    f"{result['workload']:<16}{size:>8}{engine:>10}"
+                    f"{values['steps_per_second']:>10.1f}"
+                    f"{values['cell_updates_per_second']:>12.0f}"
+                    f"{values['peak_memory_kib']:>10.0f}"
+                    f"{'-' if fps is None else format(fps, '.1f'):>8}"
+                )
+
+        if output is not None:
+            document = {'environment': environment(), 'results': results}
+            Path(output).write_text(json.dumps(document, indent=2))
+
+        if baseline is not None:
+            previous = json.loads(Path(baseline).read_text())['results']
+            changes = list(compare(results, previous, tolerance))
+
+            print(f"\n{'workload':<16}{'size':>8}  {'metric':<34}{'ratio':>8}")
+            for change in changes:
+                size = 'x'.join(map(str, change['size']))
+                flag = '  regression' if change['regression'] else ''
+                print(f"{change['workload']:<16}{size:>8}  {change['metric']:<34}{change['ratio']:>8.2f}{flag}")
+
+            if any(change['regression'] for change in changes):
+                sys.exit(1)
+
+    def replay(self, trace: Path, step: int = None, x: int = None, y: int = None):
+        """
+        Reads a trace recorded with `ton run --trace`, and returns the cells
+        which changed during the given step and the state of the cell at the
+        given position after it
+        """
+
+        from ton.trace import TraceReader
+
+        with TraceReader(trace) as reader:
+            result = {'steps': reader.steps}
+
+            if step is not None:
+                result['changes'] = [
+                    {'x': x_, 'y': y_, 'before': before.debug(), 'after': after.debug()}
+                    for (x_, y_), before, after in reader.changes(step)
+                ]
+
+                if x is not None and y is not None:
+                    result['cell'] = reader.program(step).cells[x, y].debug()
+
+        return result
 
 
 def main():
@@ -1,66 +1,83 @@
 #!/usr/bin/env python3.8
 # coding: utf-8
 
-__all__ = ['Neighborhood']
+__all__ = ['Neighborhood', 'NeighborTable']
 
-import operator as op
-from functools import reduce
+import numpy as np
+
+from functools import lru_cache
 from typing import *
 
-from ton.types import *
+from ton.type import *
+
+
+DIRECTIONS = tuple(Direction)
 
 
 class Neighborhood:
-    def __init__(self, cells: Dict[Direction, 'Cell'] = None):
-        cells = cells or {}
-        self.cells = {
-            direction: cells.get(direction, None)
-            for direction in Direction
-        }
+    """
+    Cells surrounding a cell, stored in `Direction` order with None standing
+    for the edges of the board, along with a mask of the present cells which
+    matches `Connex`
+    """
+
+    __slots__ = ['cells', 'mask']
+
+    def __init__(self, cells: Sequence[Optional['Cell']] = (None, None, None, None), mask: Optional[int] = None):
+        self.cells = tuple(cells)
+
+        if mask is None:
+            mask = 0
+            for i, cell in enumerate(self.cells):
+                if cell is not None:
+                    mask |= 1 << i
+
+        self.mask = mask
 
     def filter(self, predicate: Callable[[Direction, 'Cell'], bool]):
-        cells = {}
-        for direction, cell in self.cells.items():
-            if cell is not None and predicate(direction, cell):
-                cells[direction] = cell
-            else:
-                cells[direction] = None
+        return Neighborhood(tuple(
+            cell if cell is not None and predicate(direction, cell) else None
+            for direction, cell in zip(DIRECTIONS, self.cells)
+        ))
 
-        return Neighborhood(cells)
+    def items(self) -> Iterable[Tuple[Direction, Optional['Cell']]]:
+        return zip(DIRECTIONS, self.cells)
 
     def __iter__(self) -> Iterable[Tuple[Direction, 'Cell']]:
-        for direction, cell in self.cells.items():
+        for direction, cell in zip(DIRECTIONS, self.cells):
             if cell is not None:
                 yield direction, cell
 
     def __len__(self) -> int:
-        return len(list(filter(lambda x: x is not None, self.cells.values())))
+        return bin(self.mask).count('1')
 
     def __bool__(self) -> bool:
-        return bool(list(self))
+        return self.mask != 0
 
     def get_cells(self) -> Iterable['Cell']:
-        for cell in self.cells.values():
+        for cell in self.cells:
             if cell is not None:
                 yield cell
 
     def directions(self) -> Iterable[Direction]:
         for direction, cell in self:
-            if cell is not None:
-                yield direction
+            yield direction
 
     def get_connex(self) -> Connex:
-        return reduce(
-            op.or_,
-            map(Connex.from_direction, self.directions()),
-            Connex(0)
-        )
+        return Connex(self.mask)
 
     def __getitem__(self, direction: Direction) -> 'Cell':
-        return self.cells[direction]
+        return self.cells[direction - 1]
 
     def __setitem__(self, direction: Direction, cell: 'Cell'):
-        self.cells[direction] = cell
+        cells = list(self.cells)
+        cells[direction - 1] = cell
+        self.cells = tuple(cells)
+
+        if cell is None:
+            self.mask &= ~(1 << direction - 1)
+        else:
+            self.mask |= 1 << direction - 1
 
     @staticmethod
     def around(x, y):
@@ -68,3 +85,84 @@ class Neighborhood:
         yield Direction.S, (x, y+1)
         yield Direction.E, (x+1, y)
         yield Direction.W, (x-1, y)
+
+
+class NeighborTable:
+    """
+    Neighbor offsets of a board of a given size once padded with an empty
+    border, and the neighborhood masks of each of its cells
+
+    The padded boards are kept between steps, only their interior being
+    written, and a board of the same size is stepped while another is being
+    iterated, such as the board of a chip, takes a buffer of its own.
+    """
+
+    __slots__ = ['width', 'height', 'offsets', 'masks', 'buffers']
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+
+        stride = height + 2
+        self.offsets = (-1, 1, stride, -stride)
+
+        masks = np.zeros((width, height), np.uint8)
+        masks[:, 1:] |= int(Connex.N)
+        masks[:, :-1] |= int(Connex.S)
+        masks[:-1, :] |= int(Connex.E)
+        masks[1:, :] |= int(Connex.W)
+        self.masks = masks.tobytes()
+
+        # Padded boards which are not being iterated
+        self.buffers: List[List[Optional['Cell']]] = []
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def of(width: int, height: int) -> 'NeighborTable':
+        return NeighborTable(width, height)
+
+    def pad(self, cells: np.ndarray, padded: Optional[List[Optional['Cell']]] = None) -> List[Optional['Cell']]:
+        """
+        Cells flattened column by column with an empty border, written to the
+        interior of the given padded board if there is one
+        """
+
+        stride = self.height + 2
+
+        if padded is None:
+            padded = [None] * ((self.width + 2) * stride)
+
+        for x in range(self.width):
+            start = (x + 1) * stride + 1
+            padded[start:start + self.height] = cells[x].tolist()
+
+        return padded
+
+    def neighborhoods(self, cells: np.ndarray) -> Iterable[Tuple[int, int, 'Cell', Neighborhood]]:
+        """
+        Iterates over the cells of a board of the table's size in
+        `Program.all_coords` order, along with their neighborhood
+        """
+
+        # Popping and appending are atomic, so that boards can be iterated by
+        # several threads
+        try:
+            padded = self.pad(cells, self.buffers.pop())
+        except IndexError:
+            padded = self.pad(cells)
+
+        n, s, e, w = self.offsets
+        masks = self.masks
+        stride = self.height + 2
+        i = 0
+
+        try:
+            for x in range(self.width):
+                j = (x + 1) * stride + 1
+                for y in range(self.height):
+                    neighbors = Neighborhood((padded[j+n], padded[j+s], padded[j+e], padded[j+w]), masks[i])
+                    yield x, y, padded[j], neighbors
+                    i += 1
+                    j += 1
+        finally:
+            self.buffers.append(padded)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Vector']
+
+from collections.abc import Sequence
+from typing import *
+
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+def new_path(level: int, node: tuple) -> tuple:
+    for _ in range(0, level, BITS):
+        node = node,
+    return node
+
+
+class Vector(Sequence):
+    """
+    Immutable sequence sharing its structure with the vectors it was derived
+    from, as a trie of tuples of `WIDTH` values followed by a tail of at most
+    `WIDTH` values
+
+    Appending only copies the tail, or the path to the last leaf once the tail
+    is full, and popping the first value only advances the start of the
+    vector, which is rebuilt without the popped values once they make up more
+    than half of it, so both are constant time when amortized.
+    """
+
+    __slots__ = ['count', 'shift', 'root', 'tail', 'start']
+
+    def __init__(self, values: Iterable = ()):
+        values = tuple(values)
+        tailoff = (len(values) - 1) // WIDTH * WIDTH if values else 0
+
+        nodes = [values[i:i + WIDTH] for i in range(0, tailoff, WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [tuple(nodes[i:i + WIDTH]) for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+
+        self.count = len(values)
+        self.shift = shift
+        self.root = tuple(nodes)
+        self.tail = values[tailoff:]
+        self.start = 0
+
+    @staticmethod
+    def of(count: int, shift: int, root: tuple, tail: tuple, start: int) -> 'Vector':
+        vector = Vector.__new__(Vector)
+        vector.count = count
+        vector.shift = shift
+        vector.root = root
+        vector.tail = tail
+        vector.start = start
+        return vector
+
+    @property
+    def tailoff(self) -> int:
+        return self.count - len(self.tail)
+
+    def __len__(self) -> int:
+        return self.count - self.start
+
+    def leaf(self, i: int) -> tuple:
+        if i >= self.tailoff:
+            return self.tail
+
+        node = self.root
+        for level in range(self.shift, 0, -BITS):
+            node = node[i >> level & MASK]
+        return node
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("vector index out of range")
+
+        i = self.start + index
+        if i >= self.tailoff:
+            return self.tail[i - self.tailoff]
+        return self.leaf(i)[i & MASK]
+
+    def __iter__(self) -> Iterator:
+        tailoff = self.tailoff
+        i = self.start
+
+        while i < tailoff:
+            yield from self.leaf(i)[i & MASK:]
+            i = (i | MASK) + 1
+
+        yield from self.tail[i - tailoff:]
+
+    def push_tail(self, level: int, node: tuple) -> tuple:
+        i = (self.count - 1) >> level & MASK
+
+        if level == BITS:
+            child = self.tail
+        elif i < len(node):
+            child = self.push_tail(level - BITS, node[i])
+        else:
+            child = new_path(level - BITS, self.tail)
+
+        return node[:i] + (child,) + node[i + 1:]
+
+    def append(self, value: Any) -> 'Vector':
+        """
+        Vector with the value appended
+        """
+
+        if len(self.tail) < WIDTH:
+            return Vector.of(self.count + 1, self.shift, self.root, self.tail + (value,), self.start)
+
+        shift = self.shift
+        if self.count >> BITS > 1 << shift:
+            root = self.root, new_path(shift, self.tail)
+            shift += BITS
+        else:
+            root = self.push_tail(shift, self.root)
+
+        return Vector.of(self.count + 1, shift, root, (value,), self.start)
+
+    def popleft(self) -> Tuple[Any, 'Vector']:
+        """
+        First value and the vector of the following ones
+        """
+
+        if not len(self):
+            raise IndexError("pop from an empty vector")
+
+        value = self[0]
+        rest = Vector.of(self.count, self.shift, self.root, self.tail, self.start + 1)
+
+        # Releases the popped values once they take more space than the others
+        if rest.start > rest.count // 2:
+            rest = Vector(rest)
+
+        return value, rest
+
+    def __repr__(self) -> str:
+        return f"Vector({list(self)!r})"
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Stats', 'Profiler']
+
+import sys
+import time
+import functools
+import tracemalloc
+from collections import defaultdict, deque
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+
+
+class Stats:
+    """
+    Number of calls, cumulative time, cells created and memory allocated by
+    the calls of a method on a cell class
+    """
+
+    __slots__ = ['calls', 'seconds', 'allocations', 'bytes']
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.
+        self.allocations = 0
+        self.bytes = 0
+
+    def add(self, seconds: float, allocations: int = 0, bytes_: int = 0):
+        self.calls += 1
+        self.seconds += seconds
+        self.allocations += allocations
+        self.bytes += bytes_
+
+    def merge(self, other: 'Stats'):
+        self.calls += other.calls
+        self.seconds += other.seconds
+        self.allocations += other.allocations
+        self.bytes += other.bytes
+
+    def info(self) -> Dict[str, float]:
+        return {
+            'calls': self.calls,
+            'seconds': self.seconds,
+            'allocations': self.allocations,
+            'bytes': self.bytes
+        }
+
+
+def subclasses(cls: type) -> Iterator[type]:
+    yield cls
+    for subclass in cls.__subclasses__():
+        yield from subclasses(subclass)
+
+
+class Profiler:
+    """
+    Counts the calls and time spent stepping and drawing each class of cell,
+    in total and per step of the outermost program, along with the calls to
+    `Processor.process`
+
+    The methods are only wrapped while the profiler is used as a context
+    manager, so that the interpreter runs unchanged otherwise. Times include
+    the nested calls, such as the steps of the boards of chips. Allocations
+    count the cells returned by a step which were neither the cell itself nor
+    one of its neighbors, and with `memory`, the bytes still allocated after
+    each step are traced as well, which is much slower. Only the last
+    `history` steps are kept, if given.
+    """
+
+    def __init__(self, memory: bool = False, history: Optional[int] = None):
+        self.memory = memory
+        self.cells: Dict[str, Stats] = defaultdict(Stats)
+        self.draws: Dict[str, Stats] = defaultdict(Stats)
+        self.processes: Dict[str, Stats] = defaultdict(Stats)
+        # Time and statistics of the steps of the outermost program
+        self.steps: Deque[Dict[str, Any]] = deque(maxlen=history)
+
+        self.current = None
+        self.depth = 0
+        self.stepped = []
+        self.drawn = []
+        self.patches = []
+        self.started_tracing = False
+
+    def __enter__(self) -> 'Profiler':
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+
+    def install(self):
+        from ton.frontier import Frontier
+        from ton.sparse import SparseProgram
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+        for cls in subclasses(Cell):
+            if 'step' in cls.__dict__:
+                self.patch(cls, 'step', self.wrap_step(cls.__dict__['step']))
+            if 'process' in cls.__dict__ and issubclass(cls, Processor):
+                self.patch(cls, 'process', self.wrap_process(cls.__dict__['process']))
+
+        for cls in (Program, Frontier, SparseProgram):
+            self.patch(cls, 'step', self.wrap_program_step(cls.__dict__['step']))
+
+        # Only profiles the drawing if the renderer is already used, so that
+        # pygame is not imported otherwise
+        render = sys.modules.get('ton.render')
+        if render is not None:
+            draw_cell = render.draw_cell
+            for cls, function in list(draw_cell.registry.items()):
+                if cls is not object:
+                    draw_cell.register(cls, self.wrap_draw(function))
+                    self.patches.append((draw_cell, cls, function))
+
+    def uninstall(self):
+        for target, name, value in reversed(self.patches):
+            if isinstance(name, type):
+                target.register(name, value)
+            else:
+                setattr(target, name, value)
+        self.patches.clear()
+
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def patch(self, target: type, name: str, value: Callable):
+        self.patches.append((target, name, getattr(target, name)))
+        setattr(target, name, value)
+
+    def traced(self) -> int:
+        return tracemalloc.get_traced_memory()[0] if self.memory else 0
+
+    def wrap_step(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def step(cell: Cell, neighbors: 'Neighborhood') -> Union[Cell, Outcome]:
+            # Steps calling the step of their base class are counted once
+            if self.stepped and self.stepped[-1] is cell:
+                return function(cell, neighbors)
+
+            self.stepped.append(cell)
+            before = self.traced()
+            start = time.perf_counter()
+            try:
+                result = function(cell, neighbors)
+            finally:
+                self.stepped.pop()
+            duration = time.perf_counter() - start
+
+            state = result.cell if type(result) is Outcome else result
+            new = state is not cell and not isinstance(state, Empty) \
+                and all(state is not neighbor for neighbor in neighbors.cells)
+            name = type(cell).__name__
+            allocated = self.traced() - before
+
+            self.cells[name].add(duration, new, allocated)
+            if self.current is not None:
+                self.current['cells'][name].add(duration, new, allocated)
+            return result
+
+        return step
+
+    def wrap_process(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def process(processor: Processor, arguments: Dict) -> Dict:
+            start = time.perf_counter()
+            result = function(processor, arguments)
+            duration = time.perf_counter() - start
+
+            name = type(processor).__name__
+            self.processes[name].add(duration)
+            if self.current is not None:
+                self.current['processes'][name].add(duration)
+            return result
+
+        return process
+
+    def wrap_program_step(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def step(program):
+            if self.depth:
+                return function(program)
+
+            self.current = {
+                'cells': defaultdict(Stats),
+                'processes': defaultdict(Stats)
+            }
+            self.depth += 1
+            start = time.perf_counter()
+            try:
+                return function(program)
+            finally:
+                self.current['seconds'] = time.perf_counter() - start
+                self.steps.append(self.current)
+                self.current = None
+                self.depth -= 1
+
+        return step
+
+    def wrap_draw(self, function: Callable) -> Callable:
+        @functools.wraps(function)
+        def draw(cell: Cell, *args, **kwargs):
+            if self.drawn and self.drawn[-1] is cell:
+                return function(cell, *args, **kwargs)
+
+            self.drawn.append(cell)
+            start = time.perf_counter()
+            try:
+                return function(cell, *args, **kwargs)
+            finally:
+                self.drawn.pop()
+                self.draws[type(cell).__name__].add(time.perf_counter() - start)
+
+        return draw
+
+    def summary(self, last: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Statistics of each class of cell summed over the last steps, or over
+        every step, sorted by decreasing time
+        """
+
+        steps = list(self.steps)
+        if last is not None:
+            steps = steps[-last:]
+        cells = defaultdict(Stats)
+        processes = defaultdict(Stats)
+
+        for step in steps:
+            for name, stats in step['cells'].items():
+                cells[name].merge(stats)
+            for name, stats in step['processes'].items():
+                processes[name].merge(stats)
+
+        by_time = lambda item: -item[1].seconds
+
+        return {
+            'steps': len(steps),
+            'seconds': sum(step['seconds'] for step in steps),
+            'cells': {name: stats.info() for name, stats in sorted(cells.items(), key=by_time)},
+            'processes': {name: stats.info() for name, stats in sorted(processes.items(), key=by_time)}
+        }
+
+    def report(self) -> Dict[str, Any]:
+        """
+        Every statistic recorded, as JSON serializable values
+        """
+
+        info = lambda stats: {name: value.info() for name, value in stats.items()}
+
+        return {
+            'total': {
+                'cells': info(self.cells),
+                'processes': info(self.processes),
+                'draws': info(self.draws)
+            },
+            'steps': [
+                {
+                    'seconds': step['seconds'],
+                    'cells': info(step['cells']),
+                    'processes': info(step['processes'])
+                }
+                for step in self.steps
+            ]
+        }
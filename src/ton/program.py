@@ -1,9 +1,8 @@
 #!/usr/bin/env python3.8
 # coding: utf-8
 
-__all__ = ['Program']
+__all__ = ['Program', 'Evaluation', 'freeze', 'cell_hash']
 
-import pygame as pg
 import numpy as np
 
 import operator as op
@@ -11,67 +10,247 @@ import itertools
 from functools import reduce
 from pathlib import Path
 import pickle
+from collections import deque
 from typing import *
 
 from ton.neighborhood import *
-from ton.types import *
-from ton.texture import *
-from ton.utils import *
-from ton.constants import *
+from ton.type import *
+from ton.persistent import *
+from ton.rng import draws
 
 
-class Program(Drawable):
+def freeze(value: Any) -> Hashable:
+    if isinstance(value, (Integer, Boolean)):
+        return type(value), value.value
+    elif isinstance(value, Cell):
+        return type(value), freeze(value.__getstate__())
+    elif isinstance(value, Program):
+        return value.cells.shape, tuple(map(freeze, value.cells.flat))
+    elif isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    elif isinstance(value, (list, tuple, Vector)):
+        return tuple(map(freeze, value))
+    elif isinstance(value, (set, frozenset)):
+        return frozenset(map(freeze, value))
+    else:
+        return value
+
+
+def cell_hash(pos: Tuple[int, int], cell: 'Cell') -> int:
+    """
+    Hash of a cell at a given position, the hash of a program being the xor
+    of the hashes of its non-empty cells
+    """
+
+    if isinstance(cell, Empty):
+        return 0
+    return hash((pos, freeze(cell)))
+
+
+class Evaluation(NamedTuple):
+    steps: int
+    # Length of the cycle the program ended in, 1 for a fixed point and None
+    # if it did not stabilize within the allowed number of steps
+    period: Optional[int]
+    program: 'Program'
+
+    @property
+    def stable(self) -> bool:
+        return self.period is not None
+
+
+class Program:
+    # Grid the next step is written into, swapped with the current one
+    buffer: Optional[np.ndarray] = None
+
+    # Trace recorder the steps are reported to
+    recorder: Optional['TraceRecorder'] = None
+
+    # Seed of the choices between several values, and number of steps made,
+    # which along with the position of a cell determine its choices
+    seed: int = 0
+    steps: int = 0
+
+    # Position of the top left cell in the drawn positions, for parts of a
+    # larger program
+    origin: Tuple[int, int] = 0, 0
+
     def __init__(self, cells: np.ndarray):
         self.cells = cells
 
+    def __getstate__(self):
+        return {'cells': self.cells}
+
     @staticmethod
     def empty(width: int, height: int) -> 'Program':
-        cells = [[Empty() for _ in range(width)] for _ in range(height)]
+        cells = [[Empty() for _ in range(height)] for _ in range(width)]
         return Program(np.array(cells, Cell))
 
     @staticmethod
-    def load(path: Path) -> 'Program':
-        with Path(path).open('rb') as file:
-            return pickle.load(file)
+    def load(path: Path, allow_pickle: bool = False) -> 'Program':
+        return Program.loads(Path(path).read_bytes(), allow_pickle)
+
+    @staticmethod
+    def loads(data: bytes, allow_pickle: bool = False) -> 'Program':
+        """
+        Decodes a program, pickled programs being only loaded when allowed
+        since unpickling can run arbitrary code
+        """
+
+        from ton import binary
+
+        if binary.is_binary(data):
+            return binary.loads(data)
+        elif allow_pickle:
+            return pickle.loads(data)
+        else:
+            raise ValueError("pickled programs are no longer loaded, convert them with `ton convert`")
 
     @property
-    def size(self):
-        h, w = self.cells.shape
-        return w, h
+    def size(self) -> Tuple[int, int]:
+        return self.cells.shape
 
     def save(self, path: Path):
-        with open(path, 'wb') as file:
-            pickle.dump(self, file)
+        Path(path).write_bytes(self.dumps())
+
+    def dumps(self) -> bytes:
+        from ton import binary
+
+        return binary.dumps(self)
+
+    def copy(self) -> 'Program':
+        """
+        Copy of the program which can be stepped independently of it, sharing
+        its cells since stepping a cell returns a new one
+        """
+
+        cells = self.cells.copy()
+
+        for pos, cell in np.ndenumerate(cells):
+            # Chips are not copied when stepped but copy their board on write
+            if isinstance(cell, Chip):
+                cells[pos] = cell.copy()
+
+        program = Program(cells)
+        program.seed = self.seed
+        program.steps = self.steps
+        program.origin = self.origin
+        return program
+
+    def snapshot(self) -> 'Program':
+        """
+        Copy of the program which is only to be read, sharing its cells and
+        chips without looking for them, the chips copying their board before
+        it is next stepped or edited in place
+        """
+
+        Chip.snapshot()
+        program = Program(self.cells.copy())
+        program.seed = self.seed
+        program.steps = self.steps
+        program.origin = self.origin
+        return program
+
+    def digest(self) -> int:
+        """
+        Hash of the content of the program
+        """
+
+        return reduce(
+            op.xor,
+            (cell_hash(pos, cell) for pos, cell in np.ndenumerate(self.cells)),
+            hash(self.size)
+        )
 
     def all_coords(self) -> Iterable[Tuple[int, int]]:
-        h, w = self.cells.shape
+        w, h = self.cells.shape
         yield from itertools.product(range(w), range(h))
 
     def in_bounds(self, x: int, y: int) -> bool:
-        h, w = self.cells.shape
-        return x in range(w) and y in range(h)
+        w, h = self.cells.shape
+        return 0 <= x < w and 0 <= y < h
 
     def get_neighbors(self, x: int, y: int) -> 'Neighborhood':
-        neighbors = Neighborhood()
-        for direction, (nx, ny) in Neighborhood.around(x, y):
-            if self.in_bounds(nx, ny):
-                neighbors[direction] = self.cells[nx, ny]
-        return neighbors
+        return Neighborhood(tuple(
+            self.cells[pos] if self.in_bounds(*pos) else None
+            for _, pos in Neighborhood.around(x, y)
+        ))
+
+    def neighborhoods(self) -> Iterable[Tuple[int, int, 'Cell', Neighborhood]]:
+        """
+        Iterates over every cell in `all_coords` order along with its
+        neighborhood, without looking up the neighbors one by one
+        """
+
+        return NeighborTable.of(*self.size).neighborhoods(self.cells)
 
     def step(self):
-        next_cells = self.cells.copy()
+        if self.buffer is None or self.buffer.shape != self.cells.shape:
+            self.buffer = np.empty_like(self.cells)
+
+        next_cells = self.buffer
+        effects = []
+
+        with draws.stepping(self), step_outputs.stepping():
+            for x, y, cell, neighbors in self.neighborhoods():
+                draws.position = x, y
+                next_cell = cell.step(neighbors)
+
+                if type(next_cell) is Outcome:
+                    next_cell, cell_effects = next_cell
+                    effects.append((x, y, cell_effects))
 
-        for x, y in self.all_coords():
-            neighbors = self.get_neighbors(x, y)
-            next_cells[x, y] = self.cells[x, y].copy().step(neighbors)
+                next_cells[x, y] = next_cell
 
+        self.buffer = self.cells
         self.cells = next_cells
+        commit(next_cells, effects)
+
+        if self.recorder is not None:
+            self.recorder.record()
+
+    def run_until_stable(self, max_steps: int, max_period: int = 16) -> Evaluation:
+        """
+        Steps the program until it reaches a fixed point or a cycle of at most
+        `max_period` steps, using an incrementally updated hash of the grid
+
+        A repeated grid only counts if no cell drew between several values
+        during the steps since its previous occurrence, as the program could
+        take another way the next time otherwise, such as a tube drawing the
+        same value twice in a row before drawing another one.
+        """
+
+        from ton.frontier import Frontier
+
+        frontier = Frontier(self)
+        hashes = {
+            pos: cell_hash(pos, self.cells[pos])
+            for pos in frontier.active
+        }
+        grid_hash = reduce(op.xor, hashes.values(), 0)
+        history = deque([grid_hash], maxlen=max_period)
+        # Number of steps since the last one which drew
+        undrawn = 0
+
+        for steps in range(1, max_steps + 1):
+            drawn = draws.drawn
+            frontier.step()
+            undrawn = undrawn + 1 if draws.drawn == drawn else 0
+
+            if not frontier.changed and undrawn:
+                return Evaluation(steps, 1, self)
+
+            for pos in frontier.changed:
+                grid_hash ^= hashes.pop(pos, 0)
+                hashes[pos] = cell_hash(pos, self.cells[pos])
+                grid_hash ^= hashes[pos]
+
+            for age, previous in enumerate(reversed(history), 1):
+                if previous == grid_hash and age <= undrawn:
+                    return Evaluation(steps, age, self)
+
+            history.append(grid_hash)
 
-    def draw(self, surface: pg.Surface):
-        for x, y in self.all_coords():
-            tile_rect = to_rect(x, y)
-            tile_surface = surface.subsurface(tile_rect)
-            neighbors = self.get_neighbors(x, y)
-            self.cells[x, y].draw(tile_surface, neighbors)
+        return Evaluation(max_steps, None, self)
 
 from .cell import *
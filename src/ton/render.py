@@ -0,0 +1,206 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = [
+    'load_textures',
+    'draw_cell',
+    'draw_icon',
+    'draw_program',
+    'draw_panel'
+]
+
+import pygame as pg
+
+from functools import singledispatch
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.neighborhood import *
+from ton.texture import *
+from ton.utils import *
+from ton.type import *
+from ton.constants import *
+
+
+textures: Dict[str, Texture] = {}
+fonts: Dict[str, pg.font.Font] = {}
+
+icons: Dict[Type[Cell], str] = {
+    Wire: 'wire',
+    Tube: 'tube',
+    Anchor: 'anchor',
+    Diode: 'diode',
+    Transistor: 'transistor',
+    Adder: 'adder',
+    Equals: 'equals',
+    Debug: 'console',
+    Boolean: 'true',
+    Chip: 'chip',
+    Import: 'file',
+    List_: 'list',
+    Append: 'append',
+    Pop: 'pop',
+    Mu: 'mu'
+}
+
+rotations: Dict[Direction, Rotation] = {
+    direction: direction.relative_rotation_to(Direction.N)
+    for direction in Direction
+}
+
+opposites: Dict[Direction, Direction] = {
+    direction: direction.opposite()
+    for direction in Direction
+}
+
+
+def load_textures():
+    """
+    Loads every texture used by the cells, requires the display to be
+    initialized beforehand
+    """
+
+    for name in ('wire', 'tube'):
+        textures[name] = ConnexTexture.load(name)
+
+    for name in ('anchor', 'console', 'value', 'true', 'false', 'list', 'mu'):
+        textures[name] = SimpleTexture.load(name)
+
+    for name in ('pin_input', 'pin_output', 'diode', 'transistor', 'adder',
+                 'equals', 'chip', 'file', 'append', 'pop'):
+        textures[name] = RotatableTexture.load(name)
+
+    fonts['value'] = pg.font.Font(str(ASSETS_DIR / 'Oxanium-ExtraBold.ttf'), CELL_SIZE)
+    fonts['panel'] = pg.font.Font(str(ASSETS_DIR / 'Oxanium-ExtraBold.ttf'), PROFILE_FONT_SIZE)
+    atlas.clear()
+
+
+def texture_of(cell_type: Type[Cell]) -> Texture:
+    for base in cell_type.__mro__:
+        if base in icons:
+            return textures[icons[base]]
+    raise KeyError(cell_type)
+
+
+def label_texture(label: str, opacity: float = 1.0) -> pg.Surface:
+    if opacity < 1:
+        return variant(('label', label, opacity), lambda: faded(label_texture(label), opacity))
+
+    def render() -> pg.Surface:
+        texture = fonts['value'].render(label, True, (0, 0, 0))
+        return pg.transform.scale(texture, (CELL_SIZE - 4, CELL_SIZE - 4))
+
+    return variant(('label', label), render)
+
+
+def draw_label(surface: pg.Surface, label: str, opacity: float = 1.0):
+    textures['value'].draw(surface, opacity)
+    surface.blit(label_texture(label, opacity), (2, 2))
+
+
+def draw_icon(cell_type: Type[Cell], surface: pg.Surface, opacity: float = 1.0):
+    if issubclass(cell_type, Integer):
+        draw_label(surface, 'x', opacity)
+    else:
+        texture_of(cell_type).draw(surface, opacity=opacity)
+
+
+@singledispatch
+def draw_cell(cell: Cell, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    texture_of(type(cell)).draw(surface, opacity=opacity)
+
+
+@draw_cell.register
+def _(cell: Empty, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    pass
+
+
+@draw_cell.register
+def _(cell: Link, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    has_pin = lambda direction, cell: opposites[direction] in cell.get_pins()
+    connex = Connex(0)
+    for direction, neighbor in neighbors.items():
+        if neighbor is None or has_pin(direction, neighbor):
+            connex |= Connex.from_direction(direction)
+    texture_of(type(cell)).draw(surface, connex, opacity)
+
+
+@draw_cell.register
+def _(cell: Tube, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    if cell.value is None:
+        draw_cell.dispatch(Link)(cell, surface, neighbors, opacity)
+    else:
+        draw_cell(cell.value, surface, neighbors, opacity)
+
+
+@draw_cell.register
+def _(cell: Directional, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    texture_of(type(cell)).draw(surface, rotations[cell.direction], opacity)
+
+
+@draw_cell.register
+def _(cell: Processor, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    draw_cell.dispatch(Directional)(cell, surface, neighbors, opacity)
+
+    def pins() -> List[pg.Surface]:
+        return [
+            textures[name].variant(rotations[cell.get_side_direction(side)])
+            for name, sides in (('pin_input', cell.inputs.keys()), ('pin_output', cell.outputs))
+            for side in sides
+        ]
+
+    for pin in variant(('pins', type(cell), cell.direction), pins):
+        surface.blit(pin, (0, 0))
+
+
+@draw_cell.register
+def _(cell: Integer, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    draw_label(surface, str(cell.value), opacity)
+
+
+@draw_cell.register
+def _(cell: Boolean, surface: pg.Surface, neighbors: Neighborhood, opacity: float = 1.0):
+    textures['true' if cell.value else 'false'].draw(surface, opacity)
+
+
+def draw_program(program: Program, surface: pg.Surface, origin: Tuple[int, int] = (0, 0)):
+    """
+    Draws the cells of a program, or of a sparse program, with the cell at
+    the given origin in the top left corner of the surface, skipping those
+    falling outside of it
+    """
+
+    ox, oy = origin
+    area = surface.get_rect()
+
+    for x, y, cell, neighbors in program.neighborhoods():
+        if isinstance(cell, Empty):
+            continue
+        rect = to_rect(x - ox, y - oy)
+        if area.contains(rect):
+            draw_cell(cell, surface.subsurface(rect), neighbors)
+
+
+def draw_panel(surface: pg.Surface, lines: List[str]) -> pg.Rect:
+    """
+    Draws lines of text over a translucent background in the bottom left
+    corner of the surface, and returns the rectangle drawn
+    """
+
+    font = fonts['panel']
+    texts = [font.render(line, True, (255, 255, 255)) for line in lines]
+    width = max((text.get_width() for text in texts), default=0) + 8
+    height = sum(text.get_height() for text in texts) + 8
+
+    rect = pg.Rect((0, surface.get_height() - height), (width, height)).clip(surface.get_rect())
+    background = pg.Surface(rect.size, pg.SRCALPHA)
+    background.fill((0, 0, 0, 192))
+    surface.blit(background, rect)
+
+    y = rect.top + 4
+    for text in texts:
+        surface.blit(text, (rect.left + 4, y))
+        y += text.get_height()
+
+    return rect
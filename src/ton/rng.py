@@ -0,0 +1,128 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Counter-based random numbers for the choices cells make between several
+values
+
+A choice is drawn from the Philox4x32-10 block cipher applied to the counter
+(step, x, y, scope) under a key made of the seed of the program, so that it
+only depends on which cell makes it and when, and not on the order in which
+cells are stepped nor on the process stepping them. Boards of chips draw in
+a scope derived from the position of the chip.
+"""
+
+__all__ = ['philox', 'draw', 'Draws', 'draws']
+
+import threading
+from contextlib import contextmanager
+from typing import *
+
+
+MASK = 0xFFFFFFFF
+
+# Multipliers and key increments of Philox4x32
+M0, M1 = 0xD2511F53, 0xCD9E8D57
+W0, W1 = 0x9E3779B9, 0xBB67AE85
+ROUNDS = 10
+
+
+def philox(counter: Tuple[Any, Any, Any, Any], key: Tuple[int, int]) -> Tuple[Any, Any, Any, Any]:
+    """
+    Encrypts a counter of four 32 bit words with a key of two, which may
+    also be arrays of unsigned 64 bit integers
+    """
+
+    c0, c1, c2, c3 = counter
+    k0, k1 = key
+
+    for _ in range(ROUNDS):
+        p0 = c0 * M0
+        p1 = c2 * M1
+        c0, c1, c2, c3 = (p1 >> 32) ^ c1 ^ k0, p1 & MASK, (p0 >> 32) ^ c3 ^ k1, p0 & MASK
+        k0 = (k0 + W0) & MASK
+        k1 = (k1 + W1) & MASK
+
+    return c0, c1, c2, c3
+
+
+def key_of(seed: int) -> Tuple[int, int]:
+    return seed & MASK, seed >> 32 & MASK
+
+
+def draw(seed: int, step: int, x: int, y: int, scope: int = 0) -> int:
+    """
+    Random 64 bit integer of the cell at the given position during the given
+    step
+    """
+
+    c0, c1, _, _ = philox((step & MASK, x & MASK, y & MASK, scope), key_of(seed))
+    return c0 << 32 | c1
+
+
+class Draws(threading.local):
+    """
+    Seed, step and position of the cell being stepped in the current thread,
+    set by the engines so that cells can draw their choices
+    """
+
+    def __init__(self):
+        self.seed = 0
+        self.step = 0
+        self.scope = 0
+        self.origin = 0, 0
+        self.position = 0, 0
+        self.depth = 0
+        # Number of choices drawn between several values, to tell whether a
+        # step depended on its draws
+        self.drawn = 0
+
+    @contextmanager
+    def stepping(self, program):
+        """
+        Draws the choices of the cells of a program during its next step, its
+        step counter being advanced afterwards unless it is the board of a
+        chip, whose cells draw within the scope of the chip
+        """
+
+        saved = self.seed, self.step, self.scope, self.origin, self.position
+
+        if self.depth:
+            self.scope = self.nested_scope()
+            self.origin = 0, 0
+        else:
+            self.seed = program.seed
+            self.step = program.steps
+            self.scope = 0
+            self.origin = program.origin
+
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            self.seed, self.step, self.scope, self.origin, self.position = saved
+
+        if not self.depth:
+            program.steps += 1
+
+    def nested_scope(self) -> int:
+        """
+        Scope the cells of the board of the chip being stepped draw in
+        """
+
+        x, y = self.position
+        ox, oy = self.origin
+        return draw(self.seed, self.step, x + ox, y + oy, self.scope) & MASK
+
+    def choice(self, values: Sequence) -> Any:
+        if len(values) == 1:
+            return values[0]
+
+        self.drawn += 1
+        x, y = self.position
+        ox, oy = self.origin
+        return values[draw(self.seed, self.step, x + ox, y + oy, self.scope) % len(values)]
+
+
+draws = Draws()
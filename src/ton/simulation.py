@@ -0,0 +1,153 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Snapshot', 'Simulation']
+
+import threading
+import time
+from typing import *
+
+from ton.program import *
+from ton.constants import *
+
+
+class Snapshot(NamedTuple):
+    step: int
+    program: Program
+
+
+class Simulation:
+    """
+    Steps a program in a background thread, `steps_per_frame` steps at a time
+    either at a given rate or as fast as possible, and publishes snapshots of
+    it at most `MAX_FPS` times per second
+
+    The program must only be accessed while holding `lock`. Snapshots are
+    never modified afterwards, so they can be read from any thread without it.
+    """
+
+    def __init__(self, program: Program, steps_per_second: float = 10, steps_per_frame: int = 1):
+        self.lock = threading.RLock()
+        self.wakeup = threading.Condition(self.lock)
+        self.thread = None
+        self.stopped = False
+
+        self.steps_per_second = steps_per_second
+        self.steps_per_frame = steps_per_frame
+        self.running = False
+        self.fast = False
+        # Steps requested while paused
+        self.pending = 0
+
+        self.steps = 0
+        self.published = 0.
+        self._program = program
+        self.snapshot = Snapshot(0, program.snapshot())
+
+    @property
+    def program(self) -> Program:
+        return self._program
+
+    @program.setter
+    def program(self, program: Program):
+        with self.lock:
+            self._program = program
+            self.steps = 0
+            self.publish()
+
+    def publish(self):
+        self.snapshot = Snapshot(self.steps, self._program.snapshot())
+        self.published = time.perf_counter()
+
+    def start(self):
+        self.stopped = False
+        self.thread = threading.Thread(target=self.loop, name='simulation', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.wakeup:
+            self.stopped = True
+            self.wakeup.notify()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def control(self, **state):
+        """
+        Updates the state of the simulation, waking up the worker
+        """
+
+        with self.wakeup:
+            for name, value in state.items():
+                setattr(self, name, value)
+
+            if not self.running:
+                self.publish()
+
+            self.wakeup.notify()
+
+    def pause(self):
+        self.control(running=False, pending=0)
+
+    def resume(self):
+        self.control(running=True)
+
+    def toggle(self):
+        self.control(running=not self.running, pending=0)
+
+    def step(self, steps: int = 1):
+        """
+        Steps a paused simulation
+        """
+
+        with self.wakeup:
+            if not self.running:
+                self.pending += steps
+                self.wakeup.notify()
+
+    def fast_forward(self, fast: bool = True):
+        """
+        Steps as fast as possible regardless of the rate
+        """
+
+        self.control(fast=fast, running=self.running or fast)
+
+    @property
+    def delay(self) -> float:
+        if self.fast or not self.steps_per_second:
+            return 0
+        return 1 / self.steps_per_second
+
+    def loop(self):
+        next_step = time.perf_counter()
+
+        while True:
+            with self.wakeup:
+                while not (self.stopped or self.running or self.pending):
+                    self.wakeup.wait()
+                    next_step = time.perf_counter()
+
+                if self.stopped:
+                    return
+
+                # Waits for the next step while letting the controls through
+                if self.running and time.perf_counter() < next_step:
+                    self.wakeup.wait(next_step - time.perf_counter())
+                    continue
+
+                if self.running:
+                    for _ in range(self.steps_per_frame):
+                        self._program.step()
+                    self.steps += self.steps_per_frame
+                    next_step = max(next_step + self.delay, time.perf_counter() - self.delay)
+                else:
+                    self._program.step()
+                    self.steps += 1
+                    self.pending -= 1
+
+                if not (self.running and time.perf_counter() - self.published < 1 / MAX_FPS):
+                    self.publish()
+
+            # Lets the editor take the lock between steps
+            time.sleep(0)
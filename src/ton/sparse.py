@@ -0,0 +1,340 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['SparseCells', 'SparseProgram']
+
+import operator as op
+from collections import deque, defaultdict
+from functools import reduce
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+from ton.neighborhood import *
+from ton.constants import *
+from ton.rng import draws
+
+
+Position = Tuple[int, int]
+
+# Neighborhood of a cell whose four neighbors are cells, as there are no edges
+FULL_MASK = 0b1111
+
+
+def chunk_of(x: int, y: int) -> Tuple[Position, Position]:
+    return (x // CHUNK_SIZE, y // CHUNK_SIZE), (x % CHUNK_SIZE, y % CHUNK_SIZE)
+
+
+def empty_chunk() -> np.ndarray:
+    return np.full((CHUNK_SIZE, CHUNK_SIZE), Empty(), object)
+
+
+class SparseCells:
+    """
+    Cells of a sparse program indexed by their coordinates, which may be any
+    integers, cells outside of the allocated chunks being empty
+    """
+
+    __slots__ = ['program']
+
+    def __init__(self, program: 'SparseProgram'):
+        self.program = program
+
+    def __getitem__(self, pos: Position) -> Cell:
+        key, (x, y) = chunk_of(*pos)
+        chunk = self.program.chunks.get(key)
+        return Empty() if chunk is None else chunk[x, y]
+
+    def __setitem__(self, pos: Position, cell: Cell):
+        program = self.program
+        key, (x, y) = chunk_of(*pos)
+        chunk = program.chunks.get(key)
+
+        if chunk is None:
+            if isinstance(cell, Empty):
+                return
+            chunk = program.chunks[key] = empty_chunk()
+            program.counts[key] = 0
+
+        program.counts[key] += (not isinstance(cell, Empty)) - (not isinstance(chunk[x, y], Empty))
+        chunk[x, y] = cell
+
+        if not program.counts[key]:
+            del program.chunks[key]
+            del program.counts[key]
+
+
+class SparseProgram:
+    """
+    Unbounded program stored as square chunks of `CHUNK_SIZE` cells, which
+    are allocated when a cell is written to them and freed once all of their
+    cells are empty, so that its memory and the cost of a step only depend on
+    the chunks which have cells
+
+    Since empty cells never change, the step only evaluates the cells of the
+    allocated chunks, in the same order as `Program.step` would on a program
+    covering them. The board has no edges: cells outside of the chunks are
+    empty rather than missing, so links at the edges of a program converted to
+    a sparse one are no longer connected to them.
+    """
+
+    # Seed and number of steps made, as for `Program`, the positions of the
+    # cells being drawn as they are
+    seed: int = 0
+    steps: int = 0
+    origin: Position = 0, 0
+
+    def __init__(self):
+        self.chunks: Dict[Position, np.ndarray] = {}
+        # Number of non-empty cells of each chunk
+        self.counts: Dict[Position, int] = {}
+        # Chunks whose cells may have changed during the last step
+        self.changed: Set[Position] = set()
+
+    @property
+    def cells(self) -> SparseCells:
+        return SparseCells(self)
+
+    @staticmethod
+    def from_program(program: Program, x: int = 0, y: int = 0) -> 'SparseProgram':
+        """
+        Sparse program holding the cells of a program, its top left corner
+        being placed at the given position
+        """
+
+        sparse = SparseProgram()
+        sparse.seed = program.seed
+        sparse.steps = program.steps
+        cells = sparse.cells
+
+        for (px, py), cell in np.ndenumerate(program.cells):
+            if not isinstance(cell, Empty):
+                cells[x + px, y + py] = cell
+
+        return sparse
+
+    @staticmethod
+    def load(path: Path, x: int = 0, y: int = 0) -> 'SparseProgram':
+        """
+        Sparse program holding the cells of a saved program, as `from_program`
+        does, without building the dense board of the program
+        """
+
+        from ton import binary
+
+        data = Path(path).read_bytes()
+        if not binary.is_binary(data):
+            raise ValueError("pickled programs are no longer loaded, convert them with `ton convert`")
+
+        sparse = SparseProgram()
+        cells = sparse.cells
+        for (px, py), cell in binary.loads_cells(data):
+            cells[x + px, y + py] = cell
+
+        return sparse
+
+    def to_program(self) -> Tuple[Program, Position]:
+        """
+        Dense program covering the cells, and the position of its top left
+        corner, which it draws its choices from
+        """
+
+        bounds = self.bounds()
+        x0, y0, x1, y1 = (0, 0, 1, 1) if bounds is None else bounds
+        program = Program.empty(x1 - x0, y1 - y0)
+        program.seed = self.seed
+        program.steps = self.steps
+        program.origin = x0, y0
+
+        for (x, y), cell in self.items():
+            program.cells[x - x0, y - y0] = cell
+
+        return program, (x0, y0)
+
+    def items(self) -> Iterator[Tuple[Position, Cell]]:
+        """
+        Non-empty cells along with their position
+        """
+
+        for (cx, cy), chunk in self.chunks.items():
+            for (x, y), cell in np.ndenumerate(chunk):
+                if not isinstance(cell, Empty):
+                    yield (cx * CHUNK_SIZE + x, cy * CHUNK_SIZE + y), cell
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Smallest rectangle containing the cells, as its left, top, right and
+        bottom coordinates, the last two being excluded
+        """
+
+        positions = [pos for pos, _ in self.items()]
+        if not positions:
+            return None
+
+        xs, ys = zip(*positions)
+        return min(xs), min(ys), max(xs) + 1, max(ys) + 1
+
+    def in_bounds(self, x: int, y: int) -> bool:
+        return True
+
+    def get_neighbors(self, x: int, y: int) -> Neighborhood:
+        cells = self.cells
+        return Neighborhood(tuple(cells[pos] for _, pos in Neighborhood.around(x, y)), FULL_MASK)
+
+    def copy(self) -> 'SparseProgram':
+        program = SparseProgram()
+        program.seed = self.seed
+        program.steps = self.steps
+        program.counts = dict(self.counts)
+
+        for key, chunk in self.chunks.items():
+            chunk = chunk.copy()
+            for pos, cell in np.ndenumerate(chunk):
+                if isinstance(cell, Chip):
+                    chunk[pos] = cell.copy()
+            program.chunks[key] = chunk
+
+        return program
+
+    def digest(self) -> int:
+        return reduce(op.xor, map(self.chunk_digest, self.chunks), 0)
+
+    def chunk_digest(self, key: Position) -> int:
+        """
+        Hash of the cells of a chunk, the hash of the program being the xor of
+        the hashes of its chunks
+        """
+
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            return 0
+
+        cx, cy = key
+        return reduce(op.xor, (
+            cell_hash((cx * CHUNK_SIZE + x, cy * CHUNK_SIZE + y), cell)
+            for (x, y), cell in np.ndenumerate(chunk)
+            if not isinstance(cell, Empty)
+        ), 0)
+
+    def pad(self, key: Position) -> List[Cell]:
+        """
+        Cells of a chunk surrounded by the bordering cells of its neighbors,
+        flattened in the same layout as `NeighborTable.pad`
+        """
+
+        cx, cy = key
+        chunks = self.chunks
+        padded = np.full((CHUNK_SIZE + 2, CHUNK_SIZE + 2), Empty(), object)
+        padded[1:-1, 1:-1] = chunks[key]
+
+        if (cx - 1, cy) in chunks:
+            padded[0, 1:-1] = chunks[cx - 1, cy][-1, :]
+        if (cx + 1, cy) in chunks:
+            padded[-1, 1:-1] = chunks[cx + 1, cy][0, :]
+        if (cx, cy - 1) in chunks:
+            padded[1:-1, 0] = chunks[cx, cy - 1][:, -1]
+        if (cx, cy + 1) in chunks:
+            padded[1:-1, -1] = chunks[cx, cy + 1][:, 0]
+
+        return padded.ravel().tolist()
+
+    def columns(self) -> List[Tuple[int, List[int]]]:
+        """
+        Rows of the allocated chunks of each column of chunks, from left to
+        right and top to bottom
+        """
+
+        columns = defaultdict(list)
+        for cx, cy in self.chunks:
+            columns[cx].append(cy)
+        return [(cx, sorted(columns[cx])) for cx in sorted(columns)]
+
+    def neighborhoods(self) -> Iterator[Tuple[int, int, Cell, Neighborhood]]:
+        """
+        Iterates over the non-empty cells, column by column from left to
+        right, along with their neighborhood
+        """
+
+        stride = CHUNK_SIZE + 2
+        n, s, e, w = -1, 1, stride, -stride
+        padded = {key: self.pad(key) for key in self.chunks}
+
+        for cx, rows in self.columns():
+            for x in range(CHUNK_SIZE):
+                for cy in rows:
+                    cells = padded[cx, cy]
+                    j = (x + 1) * stride + 1
+                    for y in range(CHUNK_SIZE):
+                        cell = cells[j]
+                        if not isinstance(cell, Empty):
+                            neighbors = Neighborhood((cells[j+n], cells[j+s], cells[j+e], cells[j+w]), FULL_MASK)
+                            yield cx * CHUNK_SIZE + x, cy * CHUNK_SIZE + y, cell, neighbors
+                        j += 1
+
+    def step(self):
+        next_chunks = {key: empty_chunk() for key in self.chunks}
+        effects = []
+        changed = set()
+
+        with draws.stepping(self), step_outputs.stepping():
+            for x, y, cell, neighbors in self.neighborhoods():
+                key, pos = chunk_of(x, y)
+                draws.position = x, y
+                next_cell = cell.step(neighbors)
+
+                if type(next_cell) is Outcome:
+                    next_cell, cell_effects = next_cell
+                    effects.append((x, y, cell_effects))
+
+                # Cells which are always active may have changed in place
+                if next_cell is not cell or cell.always_active:
+                    changed.add(key)
+
+                next_chunks[key][pos] = next_cell
+
+        self.chunks = {}
+        self.counts = {}
+
+        for key, chunk in next_chunks.items():
+            count = chunk.size - sum(isinstance(cell, Empty) for cell in chunk.flat)
+            if count:
+                self.chunks[key] = chunk
+                self.counts[key] = count
+
+        for pos in commit(self.cells, effects):
+            changed.add(chunk_of(*pos)[0])
+
+        self.changed = changed
+
+    def run_until_stable(self, max_steps: int, max_period: int = 16) -> Evaluation:
+        """
+        Steps the program until it reaches a fixed point or a cycle of at most
+        `max_period` steps, during which no cell drew, as
+        `Program.run_until_stable` does, only hashing the chunks which changed
+        """
+
+        hashes = {key: self.chunk_digest(key) for key in self.chunks}
+        digest = reduce(op.xor, hashes.values(), 0)
+        history = deque([digest], maxlen=max_period)
+        undrawn = 0
+
+        for steps in range(1, max_steps + 1):
+            drawn = draws.drawn
+            self.step()
+            undrawn = undrawn + 1 if draws.drawn == drawn else 0
+
+            for key in self.changed:
+                digest ^= hashes.pop(key, 0)
+                hashes[key] = self.chunk_digest(key)
+                digest ^= hashes[key]
+
+            for age, previous in enumerate(reversed(history), 1):
+                if previous == digest and age <= undrawn:
+                    return Evaluation(steps, age, self)
+
+            history.append(digest)
+
+        return Evaluation(max_steps, None, self)
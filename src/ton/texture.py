@@ -2,10 +2,14 @@
 # coding: utf-8
 
 __all__ = [
+    'Drawable',
     'Texture',
     'SimpleTexture',
     'RotatableTexture',
-    'ConnexTexture'
+    'ConnexTexture',
+    'atlas',
+    'variant',
+    'faded'
 ]
 
 import pygame as pg
@@ -14,11 +18,41 @@ from abc import *
 from typing import *
 from pathlib import Path
 
+from ton.cache import *
 from ton.type import *
 from ton.utils import *
 from ton.constants import *
 
 
+# Textures as they are drawn, rotated and faded, keyed by the texture and its
+# drawing arguments
+atlas = LRUCache(ATLAS_SIZE)
+
+
+def variant(key: Hashable, build: Callable[[], pg.Surface]) -> pg.Surface:
+    texture = atlas.get(key)
+    if texture is None:
+        texture = atlas[key] = build()
+    return texture
+
+
+def faded(texture: pg.Surface, opacity: float) -> pg.Surface:
+    """
+    Copy of a texture with its alpha scaled by the opacity, which blends the
+    same as `blit_alpha` when blitted
+    """
+
+    texture = texture.copy()
+    texture.fill((255, 255, 255, int(opacity * 255)), special_flags=pg.BLEND_RGBA_MULT)
+    return texture
+
+
+class Drawable(ABC):
+    @abstractmethod
+    def draw(self, surface: pg.Surface, *args, **kwargs):
+        raise NotImplementedError
+
+
 class Texture(Drawable):
     @abstractstaticmethod
     def load(name: str) -> 'Texture':
@@ -34,13 +68,25 @@ class SimpleTexture(Texture):
         path = str(ASSETS_DIR / (name + '.png'))
         return cls(load_tile_image(ASSETS_DIR / (name + '.png')))
 
+    def variant(self, opacity: float = 1.0) -> pg.Surface:
+        if opacity >= 1:
+            return self.texture
+        return variant((self, opacity), lambda: faded(self.texture, opacity))
+
     def draw(self, surface: pg.Surface, opacity: float = 1.0):
-        blit_alpha(surface, self.texture, (0, 0), opacity)
+        surface.blit(self.variant(opacity), (0, 0))
 
 
 class RotatableTexture(SimpleTexture):
+    def variant(self, rotation: Rotation = Rotation.R0, opacity: float = 1.0) -> pg.Surface:
+        if rotation == Rotation.R0:
+            return super().variant(opacity)
+        if opacity >= 1:
+            return variant((self, rotation), lambda: pg.transform.rotate(self.texture, rotation.value))
+        return variant((self, rotation, opacity), lambda: faded(self.variant(rotation), opacity))
+
     def draw(self, surface: pg.Surface, rotation: Rotation = Rotation.R0, opacity: float = 1.0):
-        blit_alpha(surface, pg.transform.rotate(self.texture, rotation.value), (0, 0), opacity)
+        surface.blit(self.variant(rotation, opacity), (0, 0))
 
 
 class ConnexTexture(Texture):
@@ -64,5 +110,10 @@ class ConnexTexture(Texture):
 
         return cls(textures)
 
+    def variant(self, connex: Connex = Connex(0), opacity: float = 1.0) -> pg.Surface:
+        if opacity >= 1:
+            return self.textures[connex]
+        return variant((self, connex, opacity), lambda: faded(self.textures[connex], opacity))
+
     def draw(self, surface: pg.Surface, connex: Connex = Connex(0), opacity: float = 1.0):
-        blit_alpha(surface, self.textures[connex], (0, 0), opacity)
+        surface.blit(self.variant(connex, opacity), (0, 0))
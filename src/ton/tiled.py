@@ -0,0 +1,459 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Parallel stepping of a program split into stripes of columns
+
+Each worker process owns a stripe of columns along with a copy of the
+columns bordering it, its halo, and steps its stripe with a `Frontier`.
+After every step, the workers write the edges of their stripe which changed
+to shared memory, wait for each other, and read the edges of their
+neighbors into their halo.
+
+Cells only read the state of their neighbors from before the step, but
+wires fire the processors around them, an effect each worker only applies
+to its own stripe. The stripes are therefore only cut between columns where
+no processor faces a non-empty cell: since an empty cell never becomes
+non-empty and processors are never created during an evaluation, no effect
+ever crosses such a cut. Since the choices of the cells are drawn from their
+position and the step, the workers then end up with the same program as the
+serial engine.
+"""
+
+__all__ = ['partition', 'TiledEngine']
+
+import numpy as np
+
+import os
+import struct
+import multiprocessing
+from multiprocessing import shared_memory
+from collections import deque
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton import binary
+from ton.rng import draws
+
+
+# Length and kind of the content of an edge slot
+SLOT = struct.Struct('<qq')
+
+UNCHANGED = 0
+INLINE = 1
+# The content did not fit in the slot and is in a segment whose name is
+# given instead
+OVERFLOW = 2
+
+# Number of changed cells, hash of a stripe and number of choices its cells
+# drew between several values during a step
+STATUS = np.dtype([('changed', '<i8'), ('hash', '<i8'), ('drawn', '<i8')])
+
+
+def partition(program: Program, parts: int) -> List[Tuple[int, int]]:
+    """
+    Splits the columns of a program in at most `parts` stripes of similar
+    widths, only cutting between columns which never interact during a step
+    """
+
+    w, h = program.size
+    kinds = np.frompyfunc(
+        lambda cell: 2 if isinstance(cell, Processor) else int(not isinstance(cell, Empty)),
+        1, 1
+    )(program.cells).astype(np.int8)
+
+    processors = kinds == 2
+    occupied = kinds != 0
+    # Whether the stripe can start at each column
+    safe = np.ones(w, bool)
+    safe[1:] = ~((processors[:-1] & occupied[1:]) | (occupied[:-1] & processors[1:])).any(axis=1)
+    cuts = np.flatnonzero(safe[1:]) + 1
+
+    starts = [0]
+
+    for i in range(1, parts):
+        candidates = cuts[cuts > starts[-1]]
+        if not len(candidates):
+            break
+        ideal = round(i * w / parts)
+        start = int(candidates[np.abs(candidates - ideal).argmin()])
+        if start not in starts:
+            starts.append(start)
+
+    return list(zip(starts, starts[1:] + [w]))
+
+
+class Slot:
+    """
+    Shared memory holding an edge of a stripe, double buffered so that an
+    edge can be written while the previous one is read
+    """
+
+    def __init__(self, name: Optional[str] = None, capacity: int = 0):
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=2 * (SLOT.size + capacity))
+        else:
+            self.memory = shared_memory.SharedMemory(name)
+        self.capacity = self.memory.size // 2 - SLOT.size
+
+    @property
+    def name(self) -> str:
+        return self.memory.name
+
+    def offset(self, parity: int) -> int:
+        return parity * (SLOT.size + self.capacity)
+
+    def write(self, parity: int, data: Optional[bytes]):
+        offset = self.offset(parity)
+        buffer = self.memory.buf
+
+        if data is None:
+            SLOT.pack_into(buffer, offset, 0, UNCHANGED)
+        elif len(data) <= self.capacity:
+            SLOT.pack_into(buffer, offset, len(data), INLINE)
+            buffer[offset + SLOT.size:offset + SLOT.size + len(data)] = data
+        else:
+            overflow = shared_memory.SharedMemory(create=True, size=len(data))
+            overflow.buf[:len(data)] = data
+            name = overflow.name.encode()
+            overflow.close()
+            SLOT.pack_into(buffer, offset, len(data), OVERFLOW)
+            buffer[offset + SLOT.size:offset + SLOT.size + len(name)] = name
+            buffer[offset + SLOT.size + len(name)] = 0
+
+    def read(self, parity: int) -> Optional[bytes]:
+        offset = self.offset(parity)
+        buffer = self.memory.buf
+        length, kind = SLOT.unpack_from(buffer, offset)
+        start = offset + SLOT.size
+
+        if kind == UNCHANGED:
+            return None
+        elif kind == INLINE:
+            return bytes(buffer[start:start + length])
+
+        name = bytes(buffer[start:start + 256]).split(b'\0', 1)[0].decode()
+        return read_segment(name, length)
+
+    def close(self):
+        self.memory.close()
+
+    def unlink(self):
+        self.memory.unlink()
+
+
+def write_segment(data: bytes) -> str:
+    """
+    Copies data to a new shared memory segment, which must be unlinked by
+    its reader
+    """
+
+    segment = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+    segment.buf[:len(data)] = data
+    segment.close()
+    return segment.name
+
+
+def read_segment(name: str, length: int) -> bytes:
+    segment = shared_memory.SharedMemory(name)
+    data = bytes(segment.buf[:length])
+    segment.close()
+    segment.unlink()
+    return data
+
+
+def encode_columns(program: Program, start: int, stop: int) -> bytes:
+    return binary.dumps(Program(program.cells[start:stop]), compressed=False)
+
+
+class Worker:
+    """
+    State of a worker process, stepping the columns `start` to `stop` of the
+    program, which are preceded by `west` columns of halo in its local copy
+    """
+
+    def __init__(self, index: int, stripes: List[Tuple[int, int]], program: Program,
+                 slots: Dict[str, Optional[Slot]], status: np.ndarray, barrier):
+        self.index = index
+        self.start, self.stop = stripes[index]
+        self.program = program
+        self.slots = slots
+        self.status = status
+        self.barrier = barrier
+
+        self.west = int(index > 0)
+        self.east = int(index < len(stripes) - 1)
+        self.columns = range(self.west, self.west + self.stop - self.start)
+
+        from ton.frontier import Frontier
+        self.frontier = Frontier(program, self.columns)
+
+        self.hashes = None
+        self.hash = 0
+
+    def rehash(self):
+        cells = self.program.cells
+        self.hashes = {
+            (x, y): cell_hash((x - self.west + self.start, y), cells[x, y])
+            for x in self.columns for y in range(cells.shape[1])
+            if not isinstance(cells[x, y], Empty)
+        }
+        self.hash = 0
+        for value in self.hashes.values():
+            self.hash ^= value
+
+    def step(self, parity: int, hashed: bool = True) -> Tuple[int, int, int]:
+        """
+        Steps the stripe and exchanges its edges, returning the number of
+        cells which changed, the hash of the whole program and the number of
+        choices drawn
+        """
+
+        program = self.program
+        drawn = draws.drawn
+        self.frontier.step()
+        drawn = draws.drawn - drawn
+        changed = self.frontier.changed
+
+        if hashed:
+            for x, y in changed:
+                self.hash ^= self.hashes.pop((x, y), 0)
+                self.hashes[x, y] = cell_hash((x - self.west + self.start, y), program.cells[x, y])
+                self.hash ^= self.hashes[x, y]
+        else:
+            # The hashes are computed again when needed
+            self.hashes = None
+
+        first, last = self.columns[0], self.columns[-1]
+        edges = {x for x, _ in changed if x in (first, last)}
+
+        if self.west:
+            self.slots['west'].write(parity, encode_columns(program, first, first + 1) if first in edges else None)
+        if self.east:
+            self.slots['east'].write(parity, encode_columns(program, last, last + 1) if last in edges else None)
+
+        self.status[parity, self.index] = len(changed), self.hash, drawn
+        self.barrier.wait()
+
+        if self.west:
+            self.receive(self.slots['west_halo'].read(parity), 0)
+        if self.east:
+            self.receive(self.slots['east_halo'].read(parity), self.columns[-1] + 1)
+
+        status = self.status[parity]
+        grid_hash = 0
+        for value in status['hash']:
+            grid_hash ^= int(value)
+
+        return int(status['changed'].sum()), grid_hash, int(status['drawn'].sum())
+
+    def receive(self, data: Optional[bytes], x: int):
+        if data is None:
+            return
+
+        cells = self.program.cells
+        column = binary.loads(data).cells[0]
+
+        for y, cell in enumerate(column):
+            if not (isinstance(cell, Empty) and isinstance(cells[x, y], Empty)):
+                cells[x, y] = cell
+                self.frontier.touch(x, y)
+
+    def run(self, max_steps: int, max_period: Optional[int]) -> Tuple[int, Optional[int]]:
+        """
+        Steps the program like `Program.run_until_stable` if a maximum period
+        is given, every worker reaching the same decision from the shared
+        status of the stripes
+        """
+
+        if self.hashes is None:
+            self.rehash()
+
+        self.status[0, self.index] = 0, self.hash, 0
+        self.barrier.wait()
+
+        grid_hash = 0
+        for value in self.status[0]['hash']:
+            grid_hash ^= int(value)
+        history = deque([grid_hash], maxlen=max_period or 1)
+        self.barrier.wait()
+
+        undrawn = 0
+
+        for steps in range(1, max_steps + 1):
+            changed, grid_hash, drawn = self.step(steps % 2, max_period is not None)
+            undrawn = 0 if drawn else undrawn + 1
+
+            if max_period is None:
+                continue
+
+            if not changed and undrawn:
+                return steps, 1
+
+            for age, previous in enumerate(reversed(history), 1):
+                if previous == grid_hash and age <= undrawn:
+                    return steps, age
+
+            history.append(grid_hash)
+
+        return max_steps, None
+
+    def gather(self) -> Tuple[str, int]:
+        data = encode_columns(self.program, self.columns[0], self.columns[-1] + 1)
+        return write_segment(data), len(data)
+
+
+def work(index: int, stripes: List[Tuple[int, int]], segment: Tuple[str, int], draws: Tuple[int, int, Tuple[int, int]],
+         slots: Dict[str, Optional[str]], status: str, barrier, connection):
+    program = binary.loads(read_segment(*segment))
+    # The cells of the stripe draw their choices at their position in the
+    # whole program, as the serial engine does
+    program.seed, program.steps, program.origin = draws
+    clear_caches()
+    slots = {key: Slot(name) for key, name in slots.items() if name is not None}
+    status_memory = shared_memory.SharedMemory(status)
+    status_array = np.ndarray((2, len(stripes)), STATUS, status_memory.buf)
+
+    worker = Worker(index, stripes, program, slots, status_array, barrier)
+    connection.send('ready')
+
+    try:
+        while True:
+            command, *args = connection.recv()
+
+            if command == 'run':
+                connection.send(worker.run(*args))
+            elif command == 'gather':
+                connection.send(worker.gather())
+            elif command == 'statistics':
+                connection.send(cache_statistics())
+            elif command == 'stop':
+                break
+    finally:
+        del status_array
+        status_memory.close()
+        for slot in slots.values():
+            slot.close()
+
+
+class TiledEngine:
+    """
+    Steps a program in several processes, each one stepping a stripe of its
+    columns, the program being only sent to the workers once
+    """
+
+    def __init__(self, program: Program, processes: Optional[int] = None, slot_capacity: int = None):
+        processes = processes or os.cpu_count() or 1
+        w, h = program.size
+        self.stripes = partition(program, processes)
+        self.size = program.size
+        self.seed = program.seed
+        self.steps = program.steps
+        self.origin = program.origin
+        n = len(self.stripes)
+
+        capacity = slot_capacity or 4096 + 64 * h
+        # Edges written by each stripe, towards its western and eastern
+        # neighbors
+        self.slots = {
+            (i, side): Slot(capacity=capacity)
+            for i in range(n) for side in ('west', 'east')
+            if (side == 'west' and i > 0) or (side == 'east' and i < n - 1)
+        }
+        self.status = shared_memory.SharedMemory(create=True, size=2 * n * STATUS.itemsize)
+
+        context = multiprocessing.get_context('spawn')
+        barrier = context.Barrier(n)
+        self.connections = []
+        self.processes = []
+
+        for i, (start, stop) in enumerate(self.stripes):
+            west, east = int(i > 0), int(i < n - 1)
+            data = encode_columns(program, start - west, stop + east)
+            draws = self.seed, self.steps, (self.origin[0] + start - west, self.origin[1])
+            names = {
+                'west': self.slot_name(i, 'west'),
+                'east': self.slot_name(i, 'east'),
+                'west_halo': self.slot_name(i - 1, 'east'),
+                'east_halo': self.slot_name(i + 1, 'west')
+            }
+
+            connection, child = context.Pipe()
+            process = context.Process(
+                target=work,
+                args=(i, self.stripes, (write_segment(data), len(data)), draws, names, self.status.name, barrier, child),
+                daemon=True
+            )
+            process.start()
+            self.connections.append(connection)
+            self.processes.append(process)
+
+        for connection in self.connections:
+            connection.recv()
+
+    def slot_name(self, index: int, side: str) -> Optional[str]:
+        slot = self.slots.get((index, side))
+        return None if slot is None else slot.name
+
+    def broadcast(self, *command) -> list:
+        for connection in self.connections:
+            connection.send(command)
+        return [connection.recv() for connection in self.connections]
+
+    def step(self, steps: int = 1):
+        self.broadcast('run', steps, None)
+        self.steps += steps
+
+    def run_until_stable(self, max_steps: int, max_period: int = 16) -> Evaluation:
+        steps, period = self.broadcast('run', max_steps, max_period)[0]
+        self.steps += steps
+        return Evaluation(steps, period, self.gather())
+
+    def gather(self) -> Program:
+        """
+        Copy of the program as it currently is
+        """
+
+        columns = [binary.loads(read_segment(*segment)).cells for segment in self.broadcast('gather')]
+        program = Program(np.concatenate(columns))
+        program.seed = self.seed
+        program.steps = self.steps
+        program.origin = self.origin
+        return program
+
+    def statistics(self) -> Dict[str, Dict[str, int]]:
+        """
+        Statistics of the caches of the workers, summed over all of them
+        """
+
+        total = {}
+        for result in self.broadcast('statistics'):
+            for name, counts in result.items():
+                for key, count in counts.items():
+                    total.setdefault(name, {}).setdefault(key, 0)
+                    total[name][key] += count
+        return total
+
+    def close(self):
+        if not self.processes:
+            return
+
+        for connection in self.connections:
+            connection.send(('stop',))
+        for process in self.processes:
+            process.join()
+
+        self.processes = []
+        self.status.close()
+        self.status.unlink()
+
+        for slot in self.slots.values():
+            slot.close()
+            slot.unlink()
+
+    def __enter__(self) -> 'TiledEngine':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Execution traces
+
+A trace file starts with a magic number and a version, followed by records
+which are only ever appended. Each record has a header giving its type, the
+step it describes and the length of its zlib compressed body.
+
+    delta        the cells which changed during the step, as their position
+                 and their state before and after the step
+    keyframe     the whole program after the step, in the binary program
+                 format, written after the delta of every few steps
+
+Cell states are encoded as single cell programs in the binary format, the
+empty string standing for an empty cell.
+"""
+
+__all__ = ['TraceRecorder', 'TraceReader']
+
+import numpy as np
+
+import struct
+import zlib
+from pathlib import Path
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton import binary
+
+
+MAGIC = b'\x89TRC'
+VERSION = 1
+
+HEADER = struct.Struct('<4sH')
+RECORD = struct.Struct('<BII')
+CHANGE = struct.Struct('<IIII')
+
+KEYFRAME = 0
+DELTA = 1
+
+Change = Tuple[Tuple[int, int], Cell, Cell]
+
+
+def encode_cell(cell: Cell) -> bytes:
+    if isinstance(cell, Empty):
+        return b''
+    return binary.dumps(Program(np.full((1, 1), cell, object)), compressed=False)
+
+
+def decode_cell(data: bytes) -> Cell:
+    if not data:
+        return Empty()
+    return binary.loads(data).cells[0, 0]
+
+
+class TraceRecorder:
+    """
+    Writes the steps of a program to a trace file, saving the cells which
+    changed on every step and the whole program every `keyframe_interval`
+    steps
+
+    Once attached to a program, it records the steps made with `Program.step`
+    or with a `Frontier`.
+    """
+
+    def __init__(self, path: Path, program: Program, keyframe_interval: int = 64):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION))
+        self.program = program
+        self.keyframe_interval = keyframe_interval
+        self.steps = 0
+
+        self.write(KEYFRAME, binary.dumps(program, compressed=False))
+        # Cells and encoded states of the last recorded step, to compare the
+        # next one against
+        self.cells = program.cells.copy()
+        self.states = {
+            pos: encode_cell(cell) for pos, cell in np.ndenumerate(program.cells)
+            if not isinstance(cell, Empty)
+        }
+
+    def attach(self) -> 'TraceRecorder':
+        self.program.recorder = self
+        return self
+
+    def detach(self):
+        if self.program.recorder is self:
+            del self.program.recorder
+
+    def close(self):
+        self.detach()
+        self.file.close()
+
+    def __enter__(self) -> 'TraceRecorder':
+        return self.attach()
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def write(self, kind: int, body: bytes):
+        body = zlib.compress(body)
+        self.file.write(RECORD.pack(kind, self.steps, len(body)))
+        self.file.write(body)
+
+    def record(self, positions: Optional[Iterable[Tuple[int, int]]] = None):
+        """
+        Records a step, only comparing the cells at the given positions if
+        the other ones are known not to have changed
+        """
+
+        self.steps += 1
+        cells = self.program.cells
+        previous = self.cells
+
+        if positions is None:
+            positions = self.program.all_coords()
+
+        chunks = []
+
+        for pos in positions:
+            cell = cells[pos]
+
+            # Unchanged cells are shared between steps, unless they may change
+            # in place like the boards of chips
+            if cell is previous[pos] and not cell.always_active:
+                continue
+
+            previous[pos] = cell
+            before = self.states.get(pos, b'')
+            after = encode_cell(cell)
+
+            if after != before:
+                chunks += [CHANGE.pack(*pos, len(before), len(after)), before, after]
+
+                if after:
+                    self.states[pos] = after
+                else:
+                    del self.states[pos]
+
+        self.write(DELTA, b''.join(chunks))
+
+        if self.steps % self.keyframe_interval == 0:
+            self.write(KEYFRAME, binary.dumps(self.program, compressed=False))
+
+
+class TraceReader:
+    """
+    Reads a trace file, rebuilding the program at any step from the keyframe
+    preceding it, so that only one program is held in memory
+    """
+
+    def __init__(self, path: Path):
+        size = Path(path).stat().st_size
+        self.file = open(path, 'rb')
+        magic, version = HEADER.unpack(self.file.read(HEADER.size))
+
+        if magic != MAGIC:
+            raise ValueError("not a ton trace")
+        if version > VERSION:
+            raise ValueError(f"unsupported trace version {version}")
+
+        # Offsets of the bodies of the records, indexed by their step
+        self.keyframes: Dict[int, Tuple[int, int]] = {}
+        self.deltas: Dict[int, Tuple[int, int]] = {}
+        self.steps = 0
+
+        while True:
+            header = self.file.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+
+            kind, step, length = RECORD.unpack(header)
+            offset = self.file.seek(length, 1) - length
+
+            # The last record may have been cut short if the recording stopped
+            if offset + length > size:
+                break
+
+            (self.keyframes if kind == KEYFRAME else self.deltas)[step] = offset, length
+            self.steps = max(self.steps, step)
+
+        self.starts = sorted(self.keyframes)
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self) -> 'TraceReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read(self, offset: int, length: int) -> bytes:
+        self.file.seek(offset)
+        return zlib.decompress(self.file.read(length))
+
+    def changes(self, step: int) -> List[Change]:
+        """
+        Cells which changed during the given step, with their state before
+        and after it
+        """
+
+        if step not in self.deltas:
+            return []
+
+        data = self.read(*self.deltas[step])
+        changes = []
+        offset = 0
+
+        while offset < len(data):
+            x, y, before, after = CHANGE.unpack_from(data, offset)
+            offset += CHANGE.size
+            changes.append((
+                (x, y),
+                decode_cell(data[offset:offset + before]),
+                decode_cell(data[offset + before:offset + before + after])
+            ))
+            offset += before + after
+
+        return changes
+
+    def program(self, step: int) -> Program:
+        if not 0 <= step <= self.steps:
+            raise IndexError(f"step {step} is not in the trace")
+
+        start = self.starts[np.searchsorted(self.starts, step, 'right') - 1]
+        program = Program.loads(self.read(*self.keyframes[start]))
+
+        for delta in range(start + 1, step + 1):
+            for pos, _, cell in self.changes(delta):
+                program.cells[pos] = cell
+
+        return program
+
+    def programs(self, start: int = 0, stop: Optional[int] = None) -> Iterable[Tuple[int, Program]]:
+        """
+        Iterates over the program at each step, updating a single program in
+        place
+        """
+
+        stop = self.steps + 1 if stop is None else stop
+        program = self.program(start)
+        yield start, program
+
+        for step in range(start + 1, stop):
+            for pos, _, cell in self.changes(step):
+                program.cells[pos] = cell
+            yield step, program
@@ -1,10 +1,7 @@
 #!/usr/bin/env python3.8
 # coding: utf-8
 
-import pygame as pg
-
 from enum import *
-from abc import *
 
 
 class Rotation(IntEnum):
@@ -94,9 +91,3 @@ class Connex(IntFlag):
     def from_direction(direction: Direction) -> 'Connex':
         return Connex[direction.name]
 
-
-class Drawable(ABC):
-    @abstractmethod
-    def draw(self, surface: pg.Surface, *args, **kwargs):
-        raise NotImplementedError
-
@@ -0,0 +1,367 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+__all__ = ['Kind', 'VectorizedProgram']
+
+import numpy as np
+
+from enum import IntEnum
+from typing import *
+
+from ton.cell import *
+from ton.program import *
+from ton.type import *
+from ton.rng import draw
+
+
+class Kind(IntEnum):
+    EDGE = -1
+    EMPTY = 0
+    WIRE = 1
+    ANCHOR = 2
+    INTEGER = 3
+    BOOLEAN = 4
+    DIODE = 5
+    TRANSISTOR = 6
+    ADDER = 7
+    EQUALS = 8
+
+
+KINDS = {
+    Empty: Kind.EMPTY,
+    Wire: Kind.WIRE,
+    Anchor: Kind.ANCHOR,
+    Integer: Kind.INTEGER,
+    Boolean: Kind.BOOLEAN,
+    Diode: Kind.DIODE,
+    Transistor: Kind.TRANSISTOR,
+    Adder: Kind.ADDER,
+    Equals: Kind.EQUALS
+}
+
+CLASSES = {kind: cls for cls, kind in KINDS.items()}
+
+PROCESSORS = [Kind.DIODE, Kind.TRANSISTOR, Kind.ADDER, Kind.EQUALS]
+
+# Parameter types of the processor inputs, ANY standing for `Value`
+ANY = len(Kind)
+PARAMETERS = {Value: ANY, Integer: Kind.INTEGER, Boolean: Kind.BOOLEAN}
+
+# Per-kind input parameter of each side, indexed by `Side`, the supported
+# processors all have a single output on their front side
+INPUTS = np.zeros((len(Kind), len(Side) + 1), np.int8)
+
+for kind in PROCESSORS:
+    processor = CLASSES[kind]()
+    for side, type_ in processor.inputs.items():
+        INPUTS[kind, side] = PARAMETERS[type_]
+    assert processor.outputs == {Side.FRONT}
+
+# Side of a processor facing each direction, indexed by (`Direction`, `Direction`)
+SIDES = np.zeros((len(Direction) + 1, len(Direction) + 1), np.int8)
+
+for facing in Direction:
+    for direction in Direction:
+        SIDES[facing, direction] = direction.side_relative_to(facing)
+
+OFFSETS = {
+    Direction.N: (0, -1),
+    Direction.S: (0, 1),
+    Direction.E: (1, 0),
+    Direction.W: (-1, 0)
+}
+
+
+def around(padded: np.ndarray) -> Dict[Direction, np.ndarray]:
+    """
+    Returns views of an array padded by one cell on each side, holding at
+    each position the element of the neighbor in every direction
+    """
+
+    w, h = padded.shape[0] - 2, padded.shape[1] - 2
+    return {
+        d: padded[1 + dx:w + 1 + dx, 1 + dy:h + 1 + dy]
+        for d, (dx, dy) in OFFSETS.items()
+    }
+
+
+def is_value(kind: np.ndarray) -> np.ndarray:
+    return (kind == Kind.INTEGER) | (kind == Kind.BOOLEAN)
+
+
+def is_processor(kind: np.ndarray) -> np.ndarray:
+    return kind >= Kind.DIODE
+
+
+class VectorizedProgram:
+    """
+    Array encoding of a program, stepped with whole-grid operations
+
+    Only the wire, anchor, integer, boolean, diode, transistor, adder and
+    equals cells can be encoded. Stepping gives the same grids as
+    `Program.step`, the choices between several values being drawn from the
+    same seed, step and positions. Integers are stored on 64 bits.
+    """
+
+    def __init__(self,
+                 kind: np.ndarray,
+                 direction: np.ndarray,
+                 value: np.ndarray,
+                 argument_kind: np.ndarray,
+                 argument_value: np.ndarray,
+                 fired: np.ndarray,
+                 seed: int = 0,
+                 steps: int = 0,
+                 origin: Tuple[int, int] = (0, 0)):
+        self.kind = kind
+        self.direction = direction
+        self.value = value
+        self.argument_kind = argument_kind
+        self.argument_value = argument_value
+        self.fired = fired
+        self.seed = seed
+        self.steps = steps
+        self.origin = origin
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self.kind.shape
+
+    @staticmethod
+    def supports(program: Program) -> bool:
+        for cell in program.cells.flat:
+            if type(cell) not in KINDS:
+                return False
+            if isinstance(cell, Processor):
+                if any(type(arg) not in (Integer, Boolean) for arg in cell.arguments.values()):
+                    return False
+        return True
+
+    @staticmethod
+    def from_program(program: Program) -> 'VectorizedProgram':
+        if not VectorizedProgram.supports(program):
+            raise ValueError("program contains cells that cannot be vectorized")
+
+        shape = program.cells.shape
+        kind = np.zeros(shape, np.int8)
+        direction = np.zeros(shape, np.int8)
+        value = np.zeros(shape, np.int64)
+        argument_kind = np.zeros((len(Side) + 1, *shape), np.int8)
+        argument_value = np.zeros((len(Side) + 1, *shape), np.int64)
+        fired = np.zeros(shape, bool)
+
+        for pos, cell in np.ndenumerate(program.cells):
+            kind[pos] = KINDS[type(cell)]
+            if isinstance(cell, (Integer, Boolean)):
+                value[pos] = cell.value
+            elif isinstance(cell, Processor):
+                direction[pos] = cell.direction
+                fired[pos] = cell.fired
+                for side, arg in cell.arguments.items():
+                    argument_kind[(side, *pos)] = KINDS[type(arg)]
+                    argument_value[(side, *pos)] = arg.value
+
+        return VectorizedProgram(
+            kind, direction, value, argument_kind, argument_value, fired,
+            program.seed, program.steps, program.origin
+        )
+
+    def to_program(self) -> Program:
+        cells = np.empty(self.kind.shape, Cell)
+
+        for pos, kind in np.ndenumerate(self.kind):
+            cls = CLASSES[Kind(kind)]
+            if cls is Integer:
+                cell = Integer.of(int(self.value[pos]))
+            elif cls is Boolean:
+                cell = Boolean.of(bool(self.value[pos]))
+            elif issubclass(cls, Processor):
+                cell = cls(Direction(self.direction[pos]))
+                cell.fired = bool(self.fired[pos])
+                for side in cell.inputs:
+                    arg_kind = self.argument_kind[(side, *pos)]
+                    if arg_kind != Kind.EMPTY:
+                        arg_value = self.argument_value[(side, *pos)]
+                        if arg_kind == Kind.BOOLEAN:
+                            cell.arguments[side] = Boolean.of(bool(arg_value))
+                        else:
+                            cell.arguments[side] = Integer.of(int(arg_value))
+            else:
+                cell = cls()
+            cells[pos] = cell
+
+        program = Program(cells)
+        program.seed = self.seed
+        program.steps = self.steps
+        program.origin = self.origin
+        return program
+
+    def draws(self, x: np.ndarray, y: np.ndarray) -> np.ndarray:
+        """
+        Random integers the cells at the given coordinates draw their choices
+        from during the next step
+        """
+
+        ox, oy = self.origin
+        return draw(self.seed, self.steps, (x + ox).astype(np.uint64), (y + oy).astype(np.uint64))
+
+    @staticmethod
+    def is_fed(kind: np.ndarray, argument_kind: np.ndarray) -> np.ndarray:
+        required = INPUTS[kind] != 0
+        return np.all(~required | (argument_kind.T != Kind.EMPTY), axis=1)
+
+    @staticmethod
+    def process(kind: np.ndarray, argument_kind: np.ndarray, argument_value: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectorized `Processor.process` over a list of processors, returns the
+        kind and value of their front output, which is the only output of the
+        supported processors
+        """
+
+        output_kind = np.zeros_like(kind)
+        output_value = np.zeros(kind.shape, np.int64)
+
+        diode = kind == Kind.DIODE
+        output_kind[diode] = argument_kind[Side.BACK, diode]
+        output_value[diode] = argument_value[Side.BACK, diode]
+
+        transistor = (kind == Kind.TRANSISTOR) & (argument_value[Side.LEFT] != 0)
+        output_kind[transistor] = argument_kind[Side.BACK, transistor]
+        output_value[transistor] = argument_value[Side.BACK, transistor]
+
+        adder = kind == Kind.ADDER
+        output_kind[adder] = Kind.INTEGER
+        output_value[adder] = argument_value[Side.LEFT, adder] + argument_value[Side.RIGHT, adder]
+
+        equals = kind == Kind.EQUALS
+        output_kind[equals] = Kind.BOOLEAN
+        output_value[equals] = (
+            (argument_kind[Side.LEFT, equals] == argument_kind[Side.RIGHT, equals])
+            & (argument_value[Side.LEFT, equals] == argument_value[Side.RIGHT, equals])
+        )
+
+        return output_kind, output_value
+
+    def step(self):
+        kind, direction, value = self.kind, self.direction, self.value
+        shape = kind.shape
+
+        neighbor_kind = around(np.pad(kind, 1, constant_values=Kind.EDGE))
+        neighbor_value = around(np.pad(value, 1))
+        neighbor_direction = around(np.pad(direction, 1))
+
+        # Processors are handled as a list of coordinates
+        px, py = np.nonzero(is_processor(kind))
+        pkind = kind[px, py]
+        pdirection = direction[px, py]
+
+        # Processors collect the values facing their inputs
+        before_kind = self.argument_kind[:, px, py]
+        before_value = self.argument_value[:, px, py]
+        after_kind = before_kind.copy()
+        after_value = before_value.copy()
+        indices = np.arange(len(px))
+
+        for d in Direction:
+            nkind = neighbor_kind[d][px, py]
+            side = SIDES[pdirection, d]
+            param = INPUTS[pkind, side]
+            accepted = ((param == ANY) & is_value(nkind)) | ((param != ANY) & (param != 0) & (nkind == param))
+            after_kind[side[accepted], indices[accepted]] = nkind[accepted]
+            after_value[side[accepted], indices[accepted]] = neighbor_value[d][px, py][accepted]
+
+        # Cells only see the arguments of the processors from before the step
+        fed = np.zeros(shape, bool)
+        fed[px, py] = self.is_fed(pkind, before_kind)
+        neighbor_fed = around(np.pad(fed, 1))
+
+        # Wires pick a neighboring value, or else the output of a fed processor
+        wire = kind == Kind.WIRE
+        value_candidates = {d: wire & is_value(neighbor_kind[d]) for d in Direction}
+        has_value = np.logical_or.reduce(list(value_candidates.values()))
+        wire_waiting = wire & ~has_value
+
+        candidates = {}
+        for d in Direction:
+            nkind = neighbor_kind[d]
+            candidates[d] = value_candidates[d] | (
+                wire_waiting
+                & is_processor(nkind)
+                & (SIDES[neighbor_direction[d], d.opposite()] == Side.FRONT)
+                & neighbor_fed[d]
+            )
+
+        count = sum(c.astype(np.int8) for c in candidates.values())
+
+        # Only the wires choosing between several candidates draw, as in
+        # `Draws.choice`, which are usually few
+        pick = np.zeros(shape, np.int8)
+        dx, dy = np.nonzero(count > 1)
+        if len(dx):
+            pick[dx, dy] = self.draws(dx, dy) % count[dx, dy].astype(np.uint64)
+
+        chosen = {}
+        seen = np.zeros(shape, np.int8)
+        for d in Direction:
+            chosen[d] = candidates[d] & (seen == pick)
+            seen += candidates[d]
+
+        # Wires fire the processors they picked the output of
+        fired = np.pad(self.fired, 1)
+        fired_around = around(fired)
+        for d in Direction:
+            fired_around[d] |= chosen[d] & wire_waiting
+        pfired = fired[1:-1, 1:-1][px, py]
+
+        output_kind = np.zeros(shape, np.int8)
+        output_value = np.zeros(shape, np.int64)
+        output_kind[px, py], output_value[px, py] = self.process(pkind, before_kind, before_value)
+        output_kind, output_value = around(np.pad(output_kind, 1)), around(np.pad(output_value, 1))
+
+        next_kind = kind.copy()
+        next_direction = direction.copy()
+        next_value = value.copy()
+
+        # Wires with no candidate only survive when connected on two sides
+        connections = sum(
+            ((nkind == Kind.EDGE) | (nkind == Kind.WIRE) | (nkind == Kind.ANCHOR) | is_processor(nkind)).astype(np.int8)
+            for nkind in neighbor_kind.values()
+        )
+        next_kind[wire & (count == 0) & (connections < 2)] = Kind.EMPTY
+
+        for d in Direction:
+            picked = chosen[d] & has_value
+            next_kind[picked] = neighbor_kind[d][picked]
+            next_value[picked] = neighbor_value[d][picked]
+
+            picked = chosen[d] & wire_waiting
+            next_kind[picked] = output_kind[d][picked]
+            next_value[picked] = output_value[d][picked]
+
+        # Values stay next to a waiting processor or an anchor
+        held = np.zeros(shape, bool)
+        for d in Direction:
+            nkind = neighbor_kind[d]
+            held |= (is_processor(nkind) & ~neighbor_fed[d]) | (nkind == Kind.ANCHOR)
+        next_kind[is_value(kind) & ~held] = Kind.EMPTY
+
+        argument_kind = self.argument_kind.copy()
+        argument_value = self.argument_value.copy()
+        argument_kind[:, px, py] = after_kind
+        argument_value[:, px, py] = after_value
+
+        # Fired processors vanish along with their arguments
+        vanished = px[pfired], py[pfired]
+        next_kind[vanished] = Kind.EMPTY
+        next_direction[vanished] = 0
+        argument_kind[:, vanished[0], vanished[1]] = 0
+        argument_value[:, vanished[0], vanished[1]] = 0
+        next_value[~is_value(next_kind)] = 0
+
+        self.kind = next_kind
+        self.direction = next_direction
+        self.value = next_value
+        self.argument_kind = argument_kind
+        self.argument_value = argument_value
+        self.fired = np.zeros(shape, bool)
+        self.steps += 1
@@ -0,0 +1,24 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from programs import *
+
+PROGRAMS = sample_programs()
+
+
+@pytest.fixture(params=list(PROGRAMS))
+def program(request):
+    """
+    Copy of each of the sample programs, drawing its choices from seed 7
+    """
+
+    program = PROGRAMS[request.param].copy()
+    program.seed = 7
+    return program
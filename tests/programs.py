@@ -0,0 +1,83 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+"""
+Programs shared by the tests
+"""
+
+__all__ = ['EXAMPLES_DIR', 'examples', 'random_program', 'sample_programs', 'serial', 'same']
+
+import random
+from pathlib import Path
+from typing import *
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+from ton.type import *
+from ton.bench import generators
+
+EXAMPLES_DIR = Path(__file__).parent.parent / 'examples'
+
+
+def examples() -> List[Path]:
+    return sorted(EXAMPLES_DIR.glob('*.ton'))
+
+
+def random_program(size: int, seed: int = 0) -> Program:
+    """
+    Program of random wires, values, anchors and processors, surrounded by
+    empty cells so that it steps the same on an unbounded board
+    """
+
+    rng = random.Random(seed)
+    processors = [Diode, Transistor, Adder, Equals]
+
+    def cell():
+        r = rng.random()
+        if r < 0.4:
+            return Empty()
+        elif r < 0.75:
+            return Wire()
+        elif r < 0.85:
+            return Integer.of(rng.randrange(100))
+        elif r < 0.9:
+            return Anchor()
+        else:
+            return rng.choice(processors)(rng.choice(list(Direction)))
+
+    program = Program.empty(size + 2, size + 2)
+    for x, y in np.ndindex(size, size):
+        program.cells[x + 1, y + 1] = cell()
+    return program
+
+
+def same(a: Program, b: Program) -> bool:
+    return freeze(a) == freeze(b)
+
+
+def sample_programs() -> Dict[str, Program]:
+    """
+    Random programs, the bench workloads and the examples, by name
+    """
+
+    programs = {}
+    for seed in range(4):
+        programs[f'random-{seed}'] = random_program(20, seed)
+    for name, generate in generators.items():
+        programs[name] = generate(8)
+    for path in examples():
+        programs[path.stem] = Program.load(path)
+    return programs
+
+
+def serial(program: Program, steps: int) -> Program:
+    """
+    Copy of the program stepped with `Program.step`
+    """
+
+    program = program.copy()
+    for _ in range(steps):
+        program.step()
+    return program
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import os
+import struct
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+from ton.cell import *
+from ton.program import *
+from ton.constants import *
+from ton.animation import render_animation
+
+from programs import *
+
+pytest.importorskip('pygame')
+
+
+@pytest.fixture(scope='module')
+def rendered(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('animation')
+    results = {}
+
+    for suffix in ('.gif', '.png'):
+        program = Program.load(EXAMPLES_DIR / 'addition.ton')
+        path = directory / f'addition{suffix}'
+        evaluation = render_animation(program, path, fps=10, processes=1, chunk_size=4)
+        results[suffix] = path, evaluation, program.size
+
+    return results
+
+
+def test_gif(rendered):
+    path, evaluation, (w, h) = rendered['.gif']
+    data = path.read_bytes()
+
+    assert data[:6] == b'GIF89a'
+    assert struct.unpack('<HH', data[6:10]) == (w * CELL_SIZE, h * CELL_SIZE)
+    assert data[-1:] == b';'
+
+
+def test_apng(rendered):
+    path, evaluation, _ = rendered['.png']
+    data = path.read_bytes()
+
+    assert data[:8] == b'\x89PNG\r\n\x1a\n'
+    offset = data.index(b'acTL')
+    frames, _ = struct.unpack('>II', data[offset + 4:offset + 12])
+    assert frames == evaluation.steps + 1
+
+
+@pytest.mark.parametrize('suffix', ['.gif', '.png'])
+def test_frames(rendered, suffix):
+    Image = pytest.importorskip('PIL.Image')
+    path, evaluation, (w, h) = rendered[suffix]
+
+    with Image.open(path) as image:
+        assert image.size == (w * CELL_SIZE, h * CELL_SIZE)
+        assert image.n_frames == evaluation.steps + 1
+
+        image.seek(0)
+        first = image.convert('RGB').tobytes()
+        image.seek(image.n_frames - 1)
+        assert image.convert('RGB').tobytes() != first
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pickle
+
+import pytest
+
+from ton import binary
+from ton.cell import *
+from ton.program import *
+from ton.bench import generators
+
+from programs import *
+
+
+@pytest.mark.parametrize('path', examples(), ids=lambda path: path.stem)
+def test_examples(path):
+    data = path.read_bytes()
+    assert binary.is_binary(data)
+
+    # The examples were saved with the first version of the format
+    program = Program.loads(data)
+    assert data[4] == 1
+    assert same(Program.loads(program.dumps()), program)
+    assert binary.dumps(Program.loads(program.dumps())) == program.dumps()
+
+
+@pytest.mark.parametrize('name', list(generators))
+def test_generated(name):
+    program = generators[name](8)
+    program.step()
+    assert same(Program.loads(program.dumps()), program)
+
+
+@pytest.mark.parametrize('compressed', [True, False])
+def test_random(compressed):
+    program = random_program(32)
+    data = binary.dumps(program, compressed)
+    assert same(binary.loads(data), program)
+
+
+def test_compressed():
+    program = random_program(64)
+    compressed = binary.dumps(program)
+    assert len(compressed) < len(binary.dumps(program, compressed=False)) / 4
+    assert len(compressed) < len(pickle.dumps(program))
+
+
+def test_pickle():
+    program = random_program(8)
+    data = pickle.dumps(program)
+
+    with pytest.raises(ValueError):
+        Program.loads(data)
+    assert same(Program.loads(data, allow_pickle=True), program)
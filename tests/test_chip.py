@@ -0,0 +1,146 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cache import LRUCache
+from ton.cell import *
+from ton.program import *
+from ton.bench import generators
+from ton.type import *
+
+from programs import *
+
+
+def wire_board() -> Program:
+    # Wire from the southern side of the board to its northern side
+    board = Program.empty(5, 5)
+    for y in range(5):
+        board.cells[2, y] = Wire()
+    return board
+
+
+def chips(count: int, board: Program) -> Program:
+    program = Program.empty(count, 2)
+    for x in range(count):
+        program.cells[x, 0] = Chip(Direction.N, board.copy())
+        program.cells[x, 1] = Integer.of(3)
+    return program
+
+
+@pytest.fixture
+def uncached():
+    cache = Chip.cache
+    Chip.cache = None
+    yield
+    Chip.cache = cache
+
+
+def test_lru_cache():
+    cache = LRUCache(2)
+    cache['a'] = 1
+    cache['b'] = 2
+    assert cache.get('a') == 1
+    cache['c'] = 3
+
+    # The least recently used entry is evicted
+    assert 'b' not in cache and 'a' in cache and 'c' in cache
+    assert cache.get('b') is None
+    assert cache.info() == {'hits': 1, 'misses': 1, 'size': 2, 'maxsize': 2}
+
+    cache.clear()
+    assert cache.info() == {'hits': 0, 'misses': 0, 'size': 0, 'maxsize': 2}
+
+
+def test_hits(monkeypatch):
+    program = chips(8, wire_board())
+    stepped = []
+    step = Program.step
+
+    def counting_step(board):
+        stepped.append(board)
+        step(board)
+
+    monkeypatch.setattr(Program, 'step', counting_step)
+    clear_caches()
+    program.step()
+
+    # Only the first chip steps its board, the others reuse it
+    assert len(stepped) == 2
+    assert Chip.cache.misses == 1 and Chip.cache.hits == 7
+
+
+@pytest.mark.parametrize('program', [
+    pytest.param(generators['nested_chips'](16), id='nested_chips'),
+    pytest.param(Program.load(EXAMPLES_DIR / 'recursion.ton'), id='recursion')
+])
+def test_memoized(program, uncached):
+    expected = serial(program, 30)
+
+    Chip.cache = LRUCache(1024)
+    assert same(serial(program, 30), expected)
+    # Stepped again with the boards in the cache
+    assert same(serial(program, 30), expected)
+    assert Chip.cache.hits
+
+
+def test_impure():
+    board = wire_board()
+    board.cells[0, 0] = Debug()
+    assert Chip(Direction.N, board).get_digest() is False
+    assert Chip(Direction.N, wire_board()).get_digest() == Chip(Direction.N, wire_board()).get_digest()
+
+
+def test_clear_caches():
+    serial(chips(4, wire_board()), 3)
+    assert Chip.cache.misses
+    clear_caches()
+    assert not len(Chip.cache) and not Chip.cache.hits and not Chip.cache.misses
+    assert not any(Processor.counts.values())
+
+
+def drawing_board() -> Program:
+    # A wire between two values, leading out of the top of the board
+    board = Program.empty(5, 3)
+    board.cells[1, 1] = Integer.of(1)
+    board.cells[2, 1] = Wire()
+    board.cells[3, 1] = Integer.of(2)
+    board.cells[2, 0] = Wire()
+    return board
+
+
+def outputs(seed: int, chips: int = 8):
+    program = Program.empty(chips, 1)
+    for x in range(chips):
+        program.cells[x, 0] = Chip(board=drawing_board())
+    program.seed = seed
+
+    outputs = [None] * chips
+    for _ in range(4):
+        program.step()
+        for x, cell in enumerate(program.cells[:, 0]):
+            if isinstance(cell, Value) and outputs[x] is None:
+                outputs[x] = cell.value
+    return outputs
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_drawing_boards(seed):
+    clear_caches()
+    cached = outputs(seed)
+    # Stepped again with the boards in the cache
+    assert outputs(seed) == cached
+    assert Chip.cache.hits
+
+    cache, Chip.cache = Chip.cache, None
+    try:
+        assert outputs(seed) == cached
+    finally:
+        Chip.cache = cache
+
+
+def test_seeds(uncached):
+    results = {tuple(outputs(seed)) for seed in range(4)}
+    assert len(results) > 1
+    # The chips of a program draw their choices independently
+    assert any(len(set(result)) > 1 for result in results)
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.bench import generators
+from ton.dataflow import Dataflow
+
+from programs import *
+
+
+def programs():
+    for name in ('addition', 'list', 'subroutines', 'sum', 'test'):
+        yield pytest.param(Program.load(EXAMPLES_DIR / f'{name}.ton'), id=name)
+    for name in ('wire_chain', 'adder_tree', 'list_pipeline'):
+        yield pytest.param(generators[name](8), id=name)
+
+
+@pytest.mark.parametrize('program', list(programs()))
+def test_evaluate(program):
+    expected = program.copy().run_until_stable(1000)
+    assert expected.stable
+    assert same(Dataflow.compile(program).evaluate(), expected.program)
+
+
+def test_chips():
+    with pytest.raises(ValueError):
+        Dataflow.compile(Program.load(EXAMPLES_DIR / 'recursion.ton'))
+
+
+def test_several_sources():
+    with pytest.raises(ValueError):
+        Dataflow.compile(generators['processor_grid'](8))
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+pg = pytest.importorskip('pygame')
+
+from ton.cell import *
+from ton.program import *
+from ton.constants import *
+
+from programs import *
+
+
+@pytest.fixture(scope='module')
+def window():
+    from ton.render import load_textures
+
+    pg.init()
+    window = pg.display.set_mode(SCREEN_SIZE)
+    load_textures()
+    yield window
+    pg.quit()
+
+
+@pytest.fixture
+def editor(window, tmp_path):
+    from ton.editor import Editor
+
+    # Two chips sharing the same board
+    board = Program.empty(5, 5)
+    board.cells[2, 2] = Integer.of(1)
+    board.cells[2, 3] = Anchor()
+    program = Program.empty(4, 4)
+    program.cells[0, 0] = Chip(board=board)
+    program.cells[2, 0] = program.cells[0, 0].copy()
+
+    path = tmp_path / 'chips.ton'
+    program.save(path)
+    return Editor(path, window)
+
+
+def test_shared_board(editor):
+    program = editor.program
+    chip = program.cells[0, 0]
+    assert chip.board is program.cells[2, 0].board
+
+    editor.nesting = [(0, 0)]
+    editor.cursor.pos = 1, 1
+
+    # Reading leaves the chips as they are
+    assert editor.board is chip.board
+    assert isinstance(editor.pointed, Empty)
+    assert editor.view is chip.board
+    assert program.cells[0, 0] is chip
+
+    editor.pointed = Integer.of(5)
+    assert program.cells[0, 0] is not chip
+    assert program.cells[0, 0].board.cells[1, 1] == Integer.of(5)
+    assert isinstance(program.cells[2, 0].board.cells[1, 1], Empty)
+    assert editor.board is program.cells[0, 0].board
+
+
+def test_nesting(editor):
+    # Positions which no longer hold a chip are only dropped when editing
+    editor.nesting = [(1, 1)]
+    assert editor.board is editor.program
+    assert editor.nesting == [(1, 1)]
+    assert editor.editable_board() is editor.program
+    assert editor.nesting == []
+
+
+def test_dirty_rects(editor):
+    full = editor.draw()
+    assert full
+    # Nothing changed since the last frame
+    assert editor.draw() == []
+
+    editor.cursor.pos = 1, 1
+    editor.pointed = Integer.of(3)
+    editor.touch(1, 1)
+    rects = editor.draw()
+    assert rects
+    # Only the edited tile, its neighbors and the overlay are redrawn
+    area = sum(rect.w * rect.h for rect in rects)
+    assert area < sum(rect.w * rect.h for rect in full)
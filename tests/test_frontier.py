@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.frontier import Frontier
+
+from programs import *
+
+STEPS = 30
+
+
+def test_step(program):
+    expected = serial(program, STEPS)
+    frontier = Frontier(program)
+    for _ in range(STEPS):
+        frontier.step()
+    assert same(program, expected)
+
+
+def test_quiescent():
+    program = Program.load(EXAMPLES_DIR / 'sum.ton')
+    frontier = Frontier(program)
+
+    for _ in range(100):
+        frontier.step()
+        if not frontier.changed:
+            break
+
+    # Once nothing changes, only the cells which are always active are left
+    assert not frontier.changed
+    frontier.step()
+    assert not frontier.changed
+    assert frontier.active_size == len(frontier.volatile)
+
+
+def test_touch():
+    program = Program.empty(3, 1)
+    frontier = Frontier(program)
+    frontier.step()
+    assert not frontier.active_size
+
+    program.cells[0, 0] = Integer.of(1)
+    program.cells[1, 0] = Wire()
+    frontier.touch(0, 0)
+    frontier.touch(1, 0)
+    frontier.step()
+    assert program.cells[1, 0] == Integer.of(1)
+
+
+@pytest.mark.parametrize('cached', [True, False])
+def test_static_chip(cached, monkeypatch):
+    # A chip whose board holds still is not reported as changed
+    board = Program.empty(5, 5)
+    board.cells[2, 2] = Integer.of(1)
+    board.cells[2, 3] = Anchor()
+    program = Program.empty(3, 3)
+    program.cells[1, 1] = Chip(board=board)
+
+    if not cached:
+        monkeypatch.setattr(Chip, 'cache', None)
+    clear_caches()
+    frontier = Frontier(program)
+    for _ in range(3):
+        frontier.step()
+        assert not frontier.changed
+    assert program.copy().run_until_stable(10).steps == 1
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).parent.parent / 'src'
+
+MODULES = [
+    'ton.cell',
+    'ton.program',
+    'ton.frontier',
+    'ton.sparse',
+    'ton.vectorized',
+    'ton.tiled',
+    'ton.batch',
+    'ton.dataflow',
+    'ton.binary',
+    'ton.trace',
+    'ton.main'
+]
+
+
+def run(code: str) -> subprocess.CompletedProcess:
+    # Importing pygame fails in the child, as it would on a machine without it
+    return subprocess.run(
+        [sys.executable, '-c', "import sys; sys.modules['pygame'] = None\n" + code],
+        cwd=SRC_DIR, capture_output=True, text=True
+    )
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_import(module):
+    result = run(f"import {module}")
+    assert result.returncode == 0, result.stderr
+
+
+def test_run():
+    result = run(
+        "from ton.program import Program\n"
+        "program = Program.load('../examples/recursion.ton')\n"
+        "print(program.run_until_stable(1000).stable)"
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == 'True'
+
+
+def test_render_needs_pygame():
+    assert run("import ton.render").returncode != 0
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+from ton.cell import *
+from ton.type import *
+from ton.program import *
+from ton.constants import INTERN_LIST_LENGTH, INTERN_SIZE
+
+from programs import *
+
+
+def test_scalars():
+    assert Integer.of(3) is Integer.of(3)
+    assert Integer.of(3) is not Integer.of(4)
+    assert Boolean.of(True) is Boolean.of(True)
+    assert Boolean.of(True) is not Boolean.of(False)
+    # Equal values of different classes are not merged
+    assert Integer.of(1) is not Boolean.of(True)
+    assert Integer.of(1) == Integer(1) and hash(Integer.of(1)) == hash(Integer(1))
+
+
+def test_lists():
+    short = [Integer.of(i) for i in range(INTERN_LIST_LENGTH)]
+    assert List_.of(short) is List_.of(list(short))
+    assert List_.of(short) is not List_.of(short[1:])
+
+    # Long lists are not interned, but still compare and hash by value
+    long = short + [Integer.of(INTERN_LIST_LENGTH)]
+    assert List_.of(long) is not List_.of(long)
+    assert List_.of(long) == List_.of(long)
+    assert hash(List_.of(long)) == hash(List_.of(long))
+
+
+def test_cached_hash():
+    lst = List_([Integer.of(1), Integer.of(2)])
+    assert lst.hash is None
+    value = hash(lst)
+    assert lst.hash == value and hash(lst) == value
+
+
+def test_bounded():
+    for i in range(2 * INTERN_SIZE):
+        Integer.of(10 ** 6 + i)
+    assert len(interned) <= INTERN_SIZE
+    # Evicted values are rebuilt, equal to the previous ones
+    assert Integer.of(10 ** 6) == Integer(10 ** 6)
+
+
+def test_processors():
+    inputs = {Side.LEFT: Integer.of(2), Side.RIGHT: Integer.of(3)}
+    assert Adder().process(inputs)[Side.FRONT] is Integer.of(5)
+    assert Equals().process(inputs)[Side.FRONT] is Boolean.of(False)
+    inputs[Side.RIGHT] = Integer.of(2)
+    assert Equals().process(inputs)[Side.FRONT] is Boolean.of(True)
+
+
+def test_step_shares_values():
+    program = Program.empty(3, 1)
+    program.cells[0, 0] = Integer.of(7)
+    program.cells[1, 0] = Anchor()
+    value = program.cells[0, 0]
+    program.step()
+    # Values held in place are kept rather than copied
+    assert program.cells[0, 0] is value
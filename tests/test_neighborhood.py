@@ -0,0 +1,73 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import copy
+import tracemalloc
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+from ton.neighborhood import *
+
+from programs import *
+
+
+def tiled(program: Program, times: int) -> Program:
+    return Program(np.block([[copy.deepcopy(program.cells) for _ in range(times)] for _ in range(times)]))
+
+
+def peak_allocation(program: Program, steps: int = 5) -> float:
+    # The first steps fill the buffers and the caches, whose misses allocate
+    # the boards of chips
+    clear_caches()
+    for _ in range(3):
+        program.step()
+
+    peak = 0
+    for _ in range(steps):
+        tracemalloc.start()
+        program.step()
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return peak
+
+
+def test_neighborhoods():
+    program = random_program(6, 3)
+    table = NeighborTable.of(*program.size)
+
+    for x, y, cell, neighbors in table.neighborhoods(program.cells):
+        assert cell is program.cells[x, y]
+        for direction, pos in Neighborhood.around(x, y):
+            expected = program.cells[pos] if program.in_bounds(*pos) else None
+            assert neighbors[direction] is expected
+
+
+def test_buffers():
+    program = random_program(6, 4)
+    table = NeighborTable.of(*program.size)
+    program.step()
+    buffers = list(table.buffers)
+
+    program.step()
+    assert table.buffers == buffers and all(a is b for a, b in zip(table.buffers, buffers))
+
+    # A board of the same size iterated while another one is takes a buffer
+    # of its own
+    outer = table.neighborhoods(program.cells)
+    next(outer)
+    inner = list(table.neighborhoods(program.cells))
+    assert [cell for _, _, cell, _ in inner] == list(program.cells.flat)
+    assert len(list(outer)) == program.cells.size - 1
+
+
+def test_step_allocations():
+    # Peak memory allocated by a step, padding a copy of the 64x64 grid on
+    # each step allocating 70 KiB, and the steps allocating about 20 KiB
+    # otherwise, depending on the tuples Python keeps for reuse
+    program = tiled(Program.load(EXAMPLES_DIR / 'recursion.ton'), 4)
+    assert peak_allocation(program) < 32 * 1024
+
+    program = Program.load(EXAMPLES_DIR / 'recursion.ton')
+    assert peak_allocation(program) < 12 * 1024
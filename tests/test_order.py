@@ -0,0 +1,51 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import random
+
+from ton.cell import *
+from ton.program import *
+from ton.rng import draws
+
+from programs import *
+
+STEPS = 20
+
+
+def shuffled_step(program: Program, rng: random.Random):
+    """
+    Steps the cells of a program in a random order, checking that stepping
+    them leaves the board untouched until the effects are committed
+    """
+
+    stepped = list(program.neighborhoods())
+    rng.shuffle(stepped)
+    before = freeze(program)
+    next_cells = program.cells.copy()
+    effects = []
+
+    with draws.stepping(program), step_outputs.stepping():
+        for x, y, cell, neighbors in stepped:
+            draws.position = x, y
+            next_cell = cell.step(neighbors)
+
+            if type(next_cell) is Outcome:
+                next_cell, cell_effects = next_cell
+                effects.append((x, y, cell_effects))
+
+            next_cells[x, y] = next_cell
+
+    assert freeze(program) == before
+    program.cells = next_cells
+    commit(next_cells, effects)
+
+
+def test_shuffled(program):
+    rng = random.Random(0)
+    clear_caches()
+    shuffled = program.copy()
+    for _ in range(STEPS):
+        shuffled_step(shuffled, rng)
+
+    clear_caches()
+    assert same(shuffled, serial(program, STEPS))
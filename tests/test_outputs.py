@@ -0,0 +1,89 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+from ton.cell import *
+from ton.type import *
+from ton.program import *
+
+from programs import *
+
+
+def fed(processor: Processor, **arguments) -> Processor:
+    processor.arguments = {Side[side]: value for side, value in arguments.items()}
+    return processor
+
+
+def pop() -> Program:
+    # Pop feeding the wires in front and on the left of it
+    program = Program.empty(3, 3)
+    program.cells[1, 1] = fed(Pop(Direction.N), BACK=List_.of([Integer.of(1), Integer.of(2)]))
+    for pos in (1, 0), (0, 1), (2, 1), (1, 2):
+        program.cells[pos] = Wire()
+    return program
+
+
+def test_reused():
+    program = pop()
+    clear_caches()
+    program.step()
+
+    assert Processor.counts == {'computed': 1, 'reused': 1, 'skipped': 0}
+    assert program.cells[1, 0] == List_.of([Integer.of(2)])
+    assert program.cells[0, 1] == Integer.of(1)
+    assert cache_statistics()['outputs']['saved'] == 1
+
+
+def test_skipped():
+    # Wire between two adders, only the one it picks computing its sum
+    program = Program.empty(3, 1)
+    program.cells[0, 0] = fed(Adder(Direction.E), LEFT=Integer.of(1), RIGHT=Integer.of(2))
+    program.cells[1, 0] = Wire()
+    program.cells[2, 0] = fed(Adder(Direction.W), LEFT=Integer.of(3), RIGHT=Integer.of(4))
+    clear_caches()
+    program.step()
+
+    assert Processor.counts == {'computed': 1, 'reused': 0, 'skipped': 1}
+    assert program.cells[1, 0] in (Integer.of(3), Integer.of(7))
+
+
+def test_per_step():
+    # Outputs are not kept from one step to the next, nor outside of steps
+    processor = fed(Adder(), LEFT=Integer.of(1), RIGHT=Integer.of(2))
+    clear_caches()
+    assert processor.get_outputs()[Side.FRONT] is Integer.of(3)
+    processor.arguments[Side.RIGHT] = Integer.of(5)
+    assert processor.get_outputs()[Side.FRONT] is Integer.of(6)
+    assert Processor.counts['computed'] == 2
+
+    for _ in range(2):
+        program = pop()
+        program.step()
+    assert Processor.counts['computed'] == 4
+
+    clear_caches()
+    assert not any(Processor.counts.values())
+    assert 'outputs' not in cache_statistics()
+
+
+def test_context():
+    processor = fed(Adder(), LEFT=Integer.of(1), RIGHT=Integer.of(2))
+    clear_caches()
+
+    with step_outputs.stepping():
+        with step_outputs.stepping():
+            processor.get_outputs()
+        # Nested boards share the memo of the outermost step
+        assert id(processor) in step_outputs.outputs
+        processor.get_outputs()
+
+    assert not step_outputs.outputs
+    assert Processor.counts == {'computed': 1, 'reused': 1, 'skipped': 0}
+
+
+def test_same_result(program, monkeypatch):
+    # Programs step the same whether outputs are memoized or not
+    clear_caches()
+    expected = serial(program, 30)
+    clear_caches()
+    monkeypatch.setattr(Processor, 'get_outputs', lambda processor: processor.process(processor.arguments))
+    assert same(serial(program, 30), expected)
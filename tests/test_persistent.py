@@ -0,0 +1,77 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.type import *
+from ton.persistent import *
+
+
+@pytest.mark.parametrize('length', [0, 1, 31, 32, 33, 1024, 1025, 40000])
+def test_construct(length):
+    vector = Vector(range(length))
+    assert len(vector) == length
+    assert list(vector) == list(range(length))
+    assert [vector[i] for i in range(length)] == list(range(length))
+    if length:
+        assert vector[-1] == length - 1
+
+
+def test_append():
+    vectors = [Vector()]
+    for i in range(2000):
+        vectors.append(vectors[-1].append(i))
+
+    # Appending leaves the previous vectors untouched
+    for length in (0, 1, 32, 33, 1056, 2000):
+        assert list(vectors[length]) == list(range(length))
+
+
+def test_popleft():
+    vector = Vector(range(100)).append(100)
+    popped = []
+    rest = vector
+
+    while rest:
+        value, rest = rest.popleft()
+        popped.append(value)
+
+    assert popped == list(range(101))
+    assert list(vector) == list(range(101))
+
+    with pytest.raises(IndexError):
+        rest.popleft()
+
+
+def test_mixed():
+    vector = Vector()
+    expected = []
+
+    for i in range(3000):
+        vector = vector.append(i)
+        expected.append(i)
+        if i % 3 == 0:
+            value, vector = vector.popleft()
+            assert value == expected.pop(0)
+
+    assert list(vector) == expected
+    assert vector[5:10] == expected[5:10]
+
+
+def test_index_error():
+    with pytest.raises(IndexError):
+        Vector(range(3))[3]
+
+
+def test_processors():
+    lst = List_(Integer.of(i) for i in range(100))
+    appended = Append().process({Side.LEFT: Integer.of(100), Side.BACK: lst})[Side.FRONT]
+    popped = Pop().process({Side.BACK: lst})
+
+    # The processors leave their input untouched and the copy shares it
+    assert list(lst.values) == [Integer.of(i) for i in range(100)]
+    assert list(appended.values) == [Integer.of(i) for i in range(101)]
+    assert popped[Side.LEFT] == Integer.of(0)
+    assert list(popped[Side.FRONT].values) == [Integer.of(i) for i in range(1, 100)]
+    assert lst.copy().values is lst.values
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+from ton.cell import *
+from ton.program import *
+from ton.profiler import Profiler
+
+from programs import *
+
+STEPS = 30
+
+
+def load(name: str) -> Program:
+    clear_caches()
+    return Program.load(EXAMPLES_DIR / f'{name}.ton')
+
+
+def test_counts():
+    program = load('addition')
+    w, h = program.size
+    with Profiler() as profiler:
+        for _ in range(STEPS):
+            program.step()
+
+    report = profiler.report()
+    cells = report['total']['cells']
+    assert len(report['steps']) == STEPS
+    # Every cell of the board is stepped once per step of the program
+    assert sum(stats['calls'] for stats in cells.values()) == w * h * STEPS
+    assert 'Adder' in report['total']['processes']
+
+
+def test_program_unchanged():
+    step = Program.step
+    with Profiler():
+        assert Program.step is not step
+    assert Program.step is step
+
+    # The profiled run steps like an unprofiled one
+    program = load('list')
+    with Profiler():
+        profiled = serial(program, STEPS)
+    assert same(profiled, serial(program, STEPS))
+
+
+def test_history():
+    program = load('list')
+    with Profiler(history=3) as profiler:
+        for _ in range(STEPS):
+            program.step()
+
+    assert len(profiler.report()['steps']) == 3
+    summary = profiler.summary()
+    assert summary['steps'] == 3
+    assert profiler.summary(last=2)['steps'] == 2
+    assert set(summary['processes']) <= {'Append', 'Pop'}
+    # The totals still cover every step
+    w, h = program.size
+    total = sum(stats['calls'] for stats in profiler.report()['total']['cells'].values())
+    assert total == w * h * STEPS
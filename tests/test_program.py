@@ -0,0 +1,108 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.bench import generators
+from ton.neighborhood import Connex
+from ton.main import CLI
+
+from programs import *
+
+
+def oscillator() -> Program:
+    # The value goes back and forth between the tubes
+    program = Program.empty(2, 1)
+    program.cells[0, 0] = Tube(None, Connex.S)
+    program.cells[1, 0] = Tube(Integer.of(1), Connex(15))
+    return program
+
+
+def test_fixed_point():
+    program = Program.load(EXAMPLES_DIR / 'sum.ton')
+    evaluation = program.run_until_stable(1000)
+    assert evaluation.stable and evaluation.period == 1
+
+    digest = program.digest()
+    program.step()
+    assert program.digest() == digest
+
+
+def test_cycle():
+    program = oscillator()
+    evaluation = program.run_until_stable(100)
+    assert evaluation.stable and evaluation.period == 2
+
+    digest = program.digest()
+    program.step()
+    assert program.digest() != digest
+    program.step()
+    assert program.digest() == digest
+
+
+def test_max_steps():
+    program = generators['wire_chain'](8)
+    evaluation = program.run_until_stable(3)
+    assert evaluation.steps == 3
+    assert not evaluation.stable and evaluation.period is None
+
+
+def test_max_period():
+    assert oscillator().run_until_stable(100, max_period=1).period is None
+
+
+def test_steps(program):
+    evaluation = program.copy().run_until_stable(200)
+    assert same(evaluation.program, serial(program, evaluation.steps))
+
+
+@pytest.mark.parametrize('options', [
+    {'compiled': True, 'tiles': 2},
+    {'gif': 'out.gif', 'trace': 'out.trace'},
+    {'tiles': 2, 'sparse': True},
+    {'processes': 2},
+    {'tiles': 2, 'profile': 'profile.json'}
+])
+def test_incompatible_options(options):
+    with pytest.raises(ValueError):
+        CLI().run(EXAMPLES_DIR / 'sum.ton', **options)
+
+
+def test_caches_kept():
+    # Evaluating a program leaves the caches to the caller
+    program = generators['nested_chips'](8)
+    clear_caches()
+    program.copy().run_until_stable(20)
+    statistics = cache_statistics()
+    program.copy().run_until_stable(20)
+    assert cache_statistics()['chip_cache']['hits'] > statistics['chip_cache']['hits']
+
+
+def test_run_statistics():
+    # Each run of the CLI counts its own statistics
+    first = CLI().run(EXAMPLES_DIR / 'recursion.ton', max_steps=50)
+    assert CLI().run(EXAMPLES_DIR / 'recursion.ton', max_steps=50) == first
+
+
+def coin() -> Program:
+    # Tube drawing one of two values every step, the same one at times
+    program = Program.empty(3, 2)
+    program.cells[0, 0] = Integer.of(1)
+    program.cells[1, 0] = Tube()
+    program.cells[2, 0] = Integer.of(2)
+    program.cells[0, 1] = Anchor()
+    program.cells[2, 1] = Anchor()
+    return program
+
+
+@pytest.mark.parametrize('seed', range(8))
+def test_random_cycle(seed):
+    from ton.sparse import SparseProgram
+
+    # Repeated grids do not count as cycles when they were drawn
+    program = coin()
+    program.seed = seed
+    assert not program.copy().run_until_stable(40).stable
+    assert not SparseProgram.from_program(program).run_until_stable(40).stable
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+pg = pytest.importorskip('pygame')
+
+from ton.cell import *
+from ton.program import *
+from ton.type import *
+from ton.constants import *
+
+from programs import *
+
+
+@pytest.fixture(scope='module', autouse=True)
+def display():
+    from ton.render import load_textures
+
+    pg.init()
+    if pg.display.get_surface() is None:
+        pg.display.set_mode((1, 1))
+    load_textures()
+    yield
+    pg.quit()
+
+
+def draw(program: Program) -> bytes:
+    from ton.render import draw_program
+
+    w, h = program.size
+    surface = pg.Surface((w * CELL_SIZE, h * CELL_SIZE), pg.SRCALPHA)
+    draw_program(program, surface)
+    return pg.image.tostring(surface, 'RGBA')
+
+
+def test_variants():
+    from ton.render import textures
+
+    adder = textures['adder']
+    rotated = adder.variant(Rotation.R90)
+    assert adder.variant(Rotation.R90) is rotated
+    assert adder.variant(Rotation.R90, 0.5) is adder.variant(Rotation.R90, 0.5)
+    # Unrotated opaque textures are drawn as they were loaded
+    assert adder.variant() is adder.texture
+
+
+def test_labels():
+    from ton.render import label_texture
+
+    assert label_texture('42') is label_texture('42')
+    assert label_texture('42') is not label_texture('43')
+
+
+@pytest.mark.parametrize('name', ['addition', 'list', 'recursion'])
+def test_cached_drawing(name):
+    from ton.texture import atlas
+
+    program = Program.load(EXAMPLES_DIR / f'{name}.ton')
+    for _ in range(3):
+        program.step()
+
+    atlas.clear()
+    uncached = draw(program)
+    size = len(atlas)
+    # Drawing again only uses the variants built the first time
+    assert draw(program) == uncached
+    assert len(atlas) == size
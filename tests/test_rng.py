@@ -0,0 +1,91 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import numpy as np
+import pytest
+
+from ton.rng import *
+from ton.cell import *
+from ton.program import *
+
+from programs import *
+
+
+# Known answers of Philox4x32-10 from Random123
+VECTORS = [
+    (
+        (0, 0, 0, 0), (0, 0),
+        (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)
+    ),
+    (
+        (0xffffffff,) * 4, (0xffffffff,) * 2,
+        (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)
+    ),
+    (
+        (0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+        (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1)
+    )
+]
+
+
+@pytest.mark.parametrize('counter,key,expected', VECTORS)
+def test_philox(counter, key, expected):
+    assert philox(counter, key) == expected
+
+
+@pytest.mark.parametrize('counter,key,expected', VECTORS)
+def test_philox_arrays(counter, key, expected):
+    arrays = tuple(np.full(3, word, np.uint64) for word in counter)
+    for words, word in zip(philox(arrays, key), expected):
+        assert (words == word).all()
+
+
+def test_draw():
+    assert draw(3, 10, 4, 5) == draw(3, 10, 4, 5)
+    assert len({draw(3, 10, 4, 5), draw(4, 10, 4, 5), draw(3, 11, 4, 5), draw(3, 10, 5, 4), draw(3, 10, 4, 5, 1)}) == 5
+    # Negative positions, which sparse programs have, are drawn as well
+    assert draw(3, 10, -1, -2) != draw(3, 10, 1, 2)
+
+
+def test_choice():
+    program = Program.empty(1, 1)
+    program.seed = 5
+    values = list(range(10))
+
+    with draws.stepping(program):
+        draws.position = 3, 4
+        first = draws.choice(values)
+        assert draws.choice(values) == first
+        assert draws.choice(['only']) == 'only'
+
+    assert program.steps == 1
+    assert first == values[draw(5, 0, 3, 4) % len(values)]
+
+
+def test_nested_scope():
+    program = Program.empty(8, 8)
+    inner = Program.empty(1, 1)
+
+    with draws.stepping(program):
+        draws.position = 2, 3
+        scope = draws.nested_scope()
+        with draws.stepping(inner):
+            assert draws.scope == scope
+            assert draws.origin == (0, 0)
+        assert draws.scope == 0
+
+    # Only the outermost program counts its steps
+    assert (program.steps, inner.steps) == (1, 0)
+
+
+def test_seeds():
+    def run(seed):
+        results = []
+        for index in range(4):
+            program = random_program(20, index)
+            program.seed = seed
+            results.append(freeze(serial(program, 30)))
+        return results
+
+    assert run(7) == run(7)
+    assert run(7) != run(8)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import time
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.simulation import *
+
+from programs import *
+
+TIMEOUT = 5
+
+
+def impure_program() -> Program:
+    # Chip whose board is stepped in place, a value spreading along a ring of
+    # wires next to a debug cell
+    board = Program.empty(5, 5)
+    board.cells[1, 1] = Integer.of(1)
+    for x in (1, 2, 3):
+        for y in (1, 2, 3):
+            if (x, y) not in ((1, 1), (2, 2)):
+                board.cells[x, y] = Wire()
+    board.cells[4, 4] = Debug()
+
+    program = Program.empty(3, 3)
+    program.cells[1, 1] = Chip(board=board)
+    return program
+
+
+def wait_for(condition, timeout: float = TIMEOUT):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        assert time.perf_counter() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+@pytest.fixture
+def simulation():
+    simulation = Simulation(random_program(16), steps_per_second=1000)
+    simulation.start()
+    yield simulation
+    simulation.stop()
+
+
+def test_snapshot_shares_cells():
+    program = random_program(16)
+    snapshot = program.snapshot()
+    assert snapshot.cells is not program.cells
+    assert all(a is b for a, b in zip(snapshot.cells.flat, program.cells.flat))
+    assert same(snapshot, program)
+
+
+def test_snapshot_unchanged():
+    program = impure_program()
+    program.step()
+    snapshot = program.snapshot()
+    chip = snapshot.cells[1, 1]
+    before = freeze(snapshot)
+
+    for _ in range(4):
+        program.step()
+
+    # The chip copied its board before stepping it in place again
+    assert freeze(snapshot) == before
+    assert snapshot.cells[1, 1] is chip
+    assert program.cells[1, 1] is not chip
+    assert not same(program, snapshot)
+    assert same(program, serial(impure_program(), 5))
+
+
+def test_snapshot_copied_once():
+    program = impure_program()
+    program.snapshot()
+    program.step()
+    chip = program.cells[1, 1]
+    # Chips own their board again until the next snapshot
+    program.step()
+    assert program.cells[1, 1] is chip
+
+
+def test_step(simulation):
+    simulation.step(3)
+    wait_for(lambda: simulation.snapshot.step == 3)
+    assert not simulation.running
+    assert same(simulation.snapshot.program, serial(random_program(16), 3))
+
+
+def test_steps_per_frame(simulation):
+    simulation.control(steps_per_frame=4)
+    simulation.resume()
+    wait_for(lambda: simulation.snapshot.step >= 8)
+    simulation.pause()
+
+    with simulation.lock:
+        steps = simulation.steps
+    assert steps % 4 == 0
+    assert simulation.snapshot.step == steps
+    assert same(simulation.snapshot.program, serial(random_program(16), steps))
+
+    # Steps requested while paused are not multiplied
+    simulation.step()
+    wait_for(lambda: simulation.snapshot.step == steps + 1)
+
+
+def test_fast_forward(simulation):
+    simulation.control(steps_per_second=1)
+    simulation.fast_forward()
+    assert simulation.running and simulation.delay == 0
+    wait_for(lambda: simulation.snapshot.step >= 20)
+    simulation.fast_forward(False)
+    simulation.pause()
+    assert simulation.delay == 1
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import numpy as np
+
+from ton.cell import *
+from ton.program import *
+from ton.sparse import *
+from ton.constants import CHUNK_SIZE
+
+from programs import *
+
+STEPS = 30
+
+
+def padded(program: Program) -> Program:
+    # The sparse board has no edges, so the program is surrounded by empty
+    # cells for links at its edges to step the same
+    w, h = program.size
+    dense = Program.empty(w + 2, h + 2)
+    dense.cells[1:-1, 1:-1] = program.cells
+    dense.seed = program.seed
+    return dense
+
+
+def test_step(program):
+    dense = padded(program)
+    sparse = SparseProgram.from_program(dense, -40, 5)
+    dense.origin = -40, 5
+
+    for _ in range(STEPS):
+        sparse.step()
+
+    cells = {(x + 40, y - 5): freeze(cell) for (x, y), cell in sparse.items()}
+    expected = serial(dense, STEPS)
+    assert cells == {
+        pos: freeze(cell) for pos, cell in np.ndenumerate(expected.cells)
+        if not isinstance(cell, Empty)
+    }
+
+
+def test_chunks():
+    sparse = SparseProgram()
+    cells = sparse.cells
+    far = 1000 * CHUNK_SIZE, -1000 * CHUNK_SIZE
+
+    cells[far] = Integer.of(1)
+    cells[-1, -1] = Integer.of(2)
+    assert len(sparse.chunks) == 2
+    assert cells[far] == Integer.of(1)
+    assert isinstance(cells[0, 0], Empty)
+    assert sparse.bounds() == (-1, far[1], far[0] + 1, 0)
+
+    # Chunks are freed once their cells are all empty
+    cells[far] = Empty()
+    assert len(sparse.chunks) == 1
+    cells[-1, -1] = Empty()
+    assert not sparse.chunks and sparse.bounds() is None
+
+
+def test_round_trip(program):
+    sparse = SparseProgram.from_program(program, -3, 7)
+    dense, origin = sparse.to_program()
+    bounds = sparse.bounds()
+    assert origin == ((0, 0) if bounds is None else bounds[:2])
+    assert sorted(
+        ((x + origin[0], y + origin[1]), freeze(cell))
+        for (x, y), cell in np.ndenumerate(dense.cells) if not isinstance(cell, Empty)
+    ) == sorted((pos, freeze(cell)) for pos, cell in sparse.items())
+
+
+def test_run_until_stable(program):
+    dense = padded(program)
+    sparse = SparseProgram.from_program(dense)
+    evaluation = dense.copy().run_until_stable(200)
+    result = sparse.run_until_stable(200)
+    assert (result.steps, result.period) == (evaluation.steps, evaluation.period)
+
+
+def test_changed(program):
+    # The chunks reported as changed are the only ones whose hash changed
+    sparse = SparseProgram.from_program(padded(program))
+    for _ in range(STEPS):
+        hashes = {key: sparse.chunk_digest(key) for key in sparse.chunks}
+        sparse.step()
+        for key in set(hashes) | set(sparse.chunks):
+            if key not in sparse.changed:
+                assert sparse.chunk_digest(key) == hashes.get(key, 0)
+
+
+def test_load():
+    for path in examples():
+        sparse = SparseProgram.load(path, -20, 3)
+        expected = SparseProgram.from_program(Program.load(path), -20, 3)
+        assert sorted((pos, freeze(cell)) for pos, cell in sparse.items()) \
+            == sorted((pos, freeze(cell)) for pos, cell in expected.items())
+        assert sparse.digest() == expected.digest()
+
+
+def test_run():
+    from ton.main import CLI
+
+    path = EXAMPLES_DIR / 'addition.ton'
+    result = CLI().run(path, max_steps=1000, sparse=True)
+    expected = SparseProgram.from_program(Program.load(path)).run_until_stable(1000)
+    assert (result['steps'], result['period']) == (expected.steps, expected.period)
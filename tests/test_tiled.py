@@ -0,0 +1,69 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import numpy as np
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.tiled import *
+
+from programs import *
+
+STEPS = 30
+
+
+def test_step(program):
+    with TiledEngine(program, 3) as engine:
+        engine.step(STEPS)
+        tiled = engine.gather()
+    assert same(tiled, serial(program, STEPS))
+    assert tiled.steps == STEPS
+
+
+def test_run_until_stable(program):
+    evaluation = program.copy().run_until_stable(200)
+    with TiledEngine(program, 2) as engine:
+        tiled = engine.run_until_stable(200)
+    assert (tiled.steps, tiled.period) == (evaluation.steps, evaluation.period)
+    assert same(tiled.program, evaluation.program)
+
+
+@pytest.mark.parametrize('parts', [1, 2, 3, 8])
+def test_partition(parts):
+    program = random_program(20, 1)
+    stripes = partition(program, parts)
+    assert 1 <= len(stripes) <= parts
+    assert stripes[0][0] == 0 and stripes[-1][1] == program.size[0]
+    assert all(stop == start for (_, stop), (start, _) in zip(stripes, stripes[1:]))
+
+    # No processor faces a non-empty cell across a cut
+    cells = program.cells
+    for start, _ in stripes[1:]:
+        for y in range(program.size[1]):
+            west, east = cells[start - 1, y], cells[start, y]
+            assert not (isinstance(west, Processor) and not isinstance(east, Empty))
+            assert not (isinstance(east, Processor) and not isinstance(west, Empty))
+
+
+def test_statistics():
+    program = Program.load(EXAMPLES_DIR / 'recursion.ton')
+    with TiledEngine(program, 2) as engine:
+        engine.run_until_stable(200)
+        statistics = engine.statistics()
+    assert statistics['chip_cache']['misses']
+
+
+def test_random_cycle():
+    # Coins of tubes on either side of an empty column, drawing every step
+    program = Program.empty(7, 2)
+    for x in 0, 4:
+        program.cells[x, 0] = Integer.of(1)
+        program.cells[x + 1, 0] = Tube()
+        program.cells[x + 2, 0] = Integer.of(2)
+        program.cells[x, 1] = Anchor()
+        program.cells[x + 2, 1] = Anchor()
+
+    with TiledEngine(program, 2) as engine:
+        assert len(engine.stripes) == 2
+        assert not engine.run_until_stable(40).stable
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.frontier import Frontier
+from ton.trace import *
+
+from programs import *
+
+
+@pytest.mark.parametrize('frontier', [False, True])
+def test_replay(tmp_path, frontier):
+    path = tmp_path / 'run.trace'
+    program = random_program(16, 1)
+    states = [freeze(program)]
+
+    with TraceRecorder(path, program, keyframe_interval=4):
+        stepper = Frontier(program) if frontier else program
+        for _ in range(10):
+            stepper.step()
+            states.append(freeze(program))
+
+    with TraceReader(path) as reader:
+        assert reader.steps == 10
+        assert [freeze(reader.program(step)) for step in range(11)] == states
+        assert [freeze(program) for _, program in reader.programs()] == states
+
+        for step in range(1, 11):
+            for pos, before, after in reader.changes(step):
+                assert freeze(before) != freeze(after)
+
+        with pytest.raises(IndexError):
+            reader.program(11)
+
+
+def test_chips(tmp_path):
+    path = tmp_path / 'run.trace'
+    program = Program.load(EXAMPLES_DIR / 'recursion.ton')
+    states = [freeze(program)]
+
+    with TraceRecorder(path, program, keyframe_interval=8):
+        for _ in range(20):
+            program.step()
+            states.append(freeze(program))
+
+    with TraceReader(path) as reader:
+        assert [freeze(program) for _, program in reader.programs()] == states
+
+
+def test_truncated(tmp_path):
+    path = tmp_path / 'run.trace'
+    program = random_program(8, 2)
+
+    with TraceRecorder(path, program):
+        for _ in range(3):
+            program.step()
+
+    path.write_bytes(path.read_bytes()[:-1])
+
+    with TraceReader(path) as reader:
+        assert reader.steps == 2
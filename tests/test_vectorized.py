@@ -0,0 +1,63 @@
+#!/usr/bin/env python3.8
+# coding: utf-8
+
+import pytest
+
+from ton.cell import *
+from ton.program import *
+from ton.bench import generators
+from ton.vectorized import VectorizedProgram
+
+from programs import *
+
+STEPS = 30
+
+
+def test_step(program):
+    if not VectorizedProgram.supports(program):
+        pytest.skip("program not supported by the vectorized engine")
+
+    vectorized = VectorizedProgram.from_program(program)
+    for _ in range(STEPS):
+        vectorized.step()
+    assert same(vectorized.to_program(), serial(program, STEPS))
+
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_origin(seed):
+    program = random_program(20, seed)
+    program.origin = -7, 3
+    vectorized = VectorizedProgram.from_program(program)
+    for _ in range(STEPS):
+        vectorized.step()
+    assert same(vectorized.to_program(), serial(program, STEPS))
+
+
+def test_uncontested(monkeypatch):
+    # Nothing is drawn when no wire chooses between several candidates
+    drawn = []
+    draws = VectorizedProgram.draws
+    monkeypatch.setattr(VectorizedProgram, 'draws', lambda self, x, y: drawn.append(len(x)) or draws(self, x, y))
+
+    program = generators['wire_chain'](16)
+    vectorized = VectorizedProgram.from_program(program)
+    for _ in range(STEPS):
+        vectorized.step()
+    assert not drawn
+    assert same(vectorized.to_program(), serial(program, STEPS))
+
+    # Contested wires only draw for themselves
+    vectorized = VectorizedProgram.from_program(random_program(20, 0))
+    vectorized.step()
+    assert drawn and all(0 < count < 22 * 22 for count in drawn)
+
+
+def test_round_trip():
+    program = random_program(12, 5)
+    assert same(VectorizedProgram.from_program(program).to_program(), program)
+
+
+@pytest.mark.parametrize('name', ['recursion', 'list'])
+def test_supports(name):
+    assert not VectorizedProgram.supports(Program.load(EXAMPLES_DIR / f'{name}.ton'))